@@ -1,33 +1,381 @@
-import boto3
+import argparse
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from utils.aws_clients import configure_clients, get_client
 from utils.config_loader import load_config
+from utils.timestamps import parse_key_timestamp, to_key_timestamp
 import logging
 
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# delete_objects accepts at most this many keys per request
+DELETE_BATCH_SIZE = 1000
 
-def delete_prefix_objects(bucket, prefix):
-    s3 = boto3.client("s3")
-    paginator = s3.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
+# Per-key delete errors that another attempt will not fix
+PERMANENT_ERRORS = {"AccessDenied", "InvalidArgument"}
 
-    deleted_count = 0
-    for page in pages:
-        if "Contents" in page:
-            objects = [{"Key": obj["Key"]} for obj in page["Contents"]]
-            s3.delete_objects(Bucket=bucket, Delete={"Objects": objects})
-            deleted_count += len(objects)
-    logger.info(f"Deleted {deleted_count} objects under prefix '{prefix}'.")
+# Stored keys start their file name with an S3-key timestamp, in one of the
+# layouts the handler writes:
+#   {prefix}{device_id}/{timestamp}.json                      one object per reading
+#   {prefix}{device_id}/{YYYY-MM-DDTHH}/{first_ts}_{id}.ndjson  NDJSON sink chunks
+#   {prefix}date={date}/device_id={device_id}/{first_ts}_{id}.parquet
+# A chunk starts at its first reading and may hold readings up to the end
+# of its partition: the hour folder for NDJSON, the date for Parquet.
+KEY_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}(?:\.\d{1,6})?Z")
+
+# Length of the YYYY-MM-DDTHH hour that every layout sorts by
+HOUR_LENGTH = 13
+
+
+def parse_key(key, prefix):
+    """Return (device_id, start, end) of a stored key, with None for anything not found.
+
+    ``start`` is the time in the file name. ``end`` is the latest time a
+    reading in the object can have: ``start`` itself for a single reading,
+    the close of the hour or date partition for a chunk.
+    """
+    parts = key[len(prefix):].split("/")
+    if len(parts) == 3 and parts[0].startswith("date=") and parts[1].startswith("device_id="):
+        device_id = parts[1][len("device_id="):]
+        partition = (parts[0][len("date="):], timedelta(days=1), "%Y-%m-%d")
+    elif len(parts) == 3:
+        device_id = parts[0]
+        partition = (parts[1], timedelta(hours=1), "%Y-%m-%dT%H")
+    elif len(parts) == 2:
+        device_id = parts[0]
+        partition = None
+    else:
+        return None, None, None
+    match = KEY_TIMESTAMP.match(parts[-1])
+    if not match:
+        return device_id, None, None
+    try:
+        start = parse_key_timestamp(match.group(0))
+        if partition is None:
+            return device_id, start, start
+        name, length, layout = partition
+        opened = datetime.strptime(name, layout).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return device_id, None, None
+    return device_id, start, max(start, opened + length)
+
+
+class RetentionFilter:
+    """Selects stored objects by age and device using only their keys.
+
+    An object matches if it ends at or before ``before`` and starts at or
+    after ``after`` (either may be None), and its device is in ``devices``
+    (None for all). A chunk ends when its partition closes, so a chunk
+    that straddles ``before`` is kept whole. Objects whose time can't be
+    read from the key are kept when a time bound is set. Within a device
+    folder keys sort by time, so listing can start after the ``after`` hour
+    (StartAfter) and stop past the ``before`` hour, skipping both ranges
+    without listing them.
+    """
+
+    def __init__(self, before=None, after=None, devices=None):
+        self.before = before
+        self.after = after
+        self.devices = set(devices) if devices else None
+        self._before_hour = to_key_timestamp(before)[:HOUR_LENGTH] if before else None
+        self._after_hour = to_key_timestamp(after)[:HOUR_LENGTH] if after else None
+
+    def device_matches(self, device_id):
+        return self.devices is None or device_id in self.devices
+
+    def date_matches(self, date):
+        """Return False if no object in a date=YYYY-MM-DD partition can match."""
+        if self._before_hour and date > self._before_hour[:10]:
+            return False
+        if self._after_hour and date < self._after_hour[:10]:
+            return False
+        return True
+
+    def matches(self, key, prefix):
+        if self.devices is None and self.before is None and self.after is None:
+            # No filter: wipe everything, whatever its layout
+            return True
+        device_id, start, end = parse_key(key, prefix)
+        if device_id is None or not self.device_matches(device_id):
+            return False
+        if self.before is None and self.after is None:
+            return True
+        if start is None:
+            return False
+        if end == start:
+            # A single reading at exactly ``before`` is not older than it
+            return ((self.before is None or start < self.before)
+                    and (self.after is None or start >= self.after))
+        return ((self.before is None or end <= self.before)
+                and (self.after is None or start >= self.after))
+
+    def start_after(self, folder):
+        """StartAfter key for a device folder, skipping hours before ``after``."""
+        return folder + self._after_hour if self._after_hour else None
+
+    def past_range(self, folder, key):
+        """True once a device folder's listing has passed the ``before`` hour."""
+        if not self._before_hour:
+            return False
+        return key[len(folder):len(folder) + HOUR_LENGTH] > self._before_hour
+
+
+def list_pages(s3, bucket, prefix, delimiter=None, start_after=None):
+    """Yield list_objects_v2 pages under ``prefix``, optionally after a key."""
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+    if start_after:
+        kwargs["StartAfter"] = start_after
+    while True:
+        page = s3.list_objects_v2(**kwargs)
+        yield page
+        if not page.get("IsTruncated"):
+            return
+        kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+
+class DeleteProgress:
+    """Thread-safe counters with a throughput line every ``report_interval`` seconds."""
+
+    def __init__(self, report_interval=10.0):
+        self.report_interval = report_interval
+        self.deleted = 0
+        self.failed = 0
+        self.retried = 0
+        self.requests = 0
+        self.listed = 0
+        self.matched = 0
+        self.matched_bytes = 0
+        self.started = time.monotonic()
+        self._next_report = self.started + report_interval
+        self._lock = threading.Lock()
+
+    def record(self, deleted, failed, retried, requests):
+        with self._lock:
+            self.deleted += deleted
+            self.failed += failed
+            self.retried += retried
+            self.requests += requests
+            now = time.monotonic()
+            due = self.report_interval and now >= self._next_report
+            if due:
+                self._next_report = now + self.report_interval
+        if due:
+            logger.info(self.summary())
+
+    def record_listing(self, listed, matched, matched_bytes):
+        with self._lock:
+            self.listed += listed
+            self.matched += matched
+            self.matched_bytes += matched_bytes
+
+    def summary(self, dry_run=False):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        selected = (f"{self.matched} of {self.listed} listed objects "
+                    f"({self.matched_bytes / 1e6:.1f} MB)")
+        if dry_run:
+            return f"Dry run: would delete {selected}; listed in {elapsed:.1f}s."
+        return (f"Deleted {self.deleted} objects in {elapsed:.1f}s "
+                f"({self.deleted / elapsed:.0f} objects/s, {self.requests} requests, "
+                f"{self.retried} keys retried, {self.failed} failed); matched {selected}.")
+
+
+class PrefixCleaner:
+    """Deletes everything under a set of prefixes with listing and deletes pipelined.
+
+    Each prefix is split into its first-level subprefixes (one per device
+    under raw/{device}/), and those shards are listed in parallel by
+    ``list_workers`` threads. Every listed page goes straight to a pool of
+    ``workers`` delete threads, with at most ``max_pending`` batches queued
+    so listing never runs far ahead of deleting. Keys that come back in a
+    response's Errors list are retried with backoff up to ``max_retries``
+    times.
+
+    With a RetentionFilter only matching objects are deleted, and folders
+    or date partitions that cannot match are never listed. ``dry_run``
+    lists and counts what would be deleted without deleting it.
+    """
+
+    def __init__(self, bucket, s3=None, workers=16, list_workers=8, max_retries=5,
+                 max_pending=None, backoff=0.2, report_interval=10.0,
+                 key_filter=None, dry_run=False):
+        if s3 is None:
+            # Enough pooled connections for every listing and delete thread
+            configure_clients(max_pool_connections=max(25, workers + list_workers))
+            s3 = get_client("s3")
+        self.bucket = bucket
+        self.s3 = s3
+        self.workers = workers
+        self.list_workers = list_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress = DeleteProgress(report_interval)
+        self.key_filter = key_filter or RetentionFilter()
+        self.dry_run = dry_run
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 2)
+        self._deleters = None
+
+    def delete_keys(self, keys):
+        """Delete one batch of keys, retrying per-key errors. Returns the keys that failed."""
+        pending = list(keys)
+        deleted = retried = requests = 0
+        errors = {}
+        permanent = {}
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                retried += len(pending)
+                # Full jitter so throttled workers don't retry in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            requests += 1
+            try:
+                response = self.s3.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in pending], "Quiet": True}
+                )
+            except Exception as e:
+                errors = {key: type(e).__name__ for key in pending}
+                continue
+            errors = {error["Key"]: error.get("Code", "Unknown")
+                      for error in response.get("Errors", [])}
+            deleted += len(pending) - len(errors)
+            permanent.update((k, c) for k, c in errors.items() if c in PERMANENT_ERRORS)
+            errors = {k: c for k, c in errors.items() if c not in PERMANENT_ERRORS}
+            pending = list(errors)
+            if not pending:
+                break
+        errors.update(permanent)
+        for key, code in list(errors.items())[:5]:
+            logger.warning(f"Could not delete {key}: {code}")
+        self.progress.record(deleted, len(errors), retried, requests)
+        return list(errors)
+
+    def _submit(self, keys):
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            self._slots.acquire()
+            future = self._deleters.submit(self.delete_keys, keys[start:start + DELETE_BATCH_SIZE])
+            future.add_done_callback(lambda _: self._slots.release())
+
+    def _select(self, prefix, contents):
+        # Sizes come from the listing, so nothing is HEADed
+        selected = [obj for obj in contents if self.key_filter.matches(obj["Key"], prefix)]
+        self.progress.record_listing(len(contents), len(selected),
+                                     sum(obj.get("Size", 0) for obj in selected))
+        if selected and not self.dry_run:
+            self._submit([obj["Key"] for obj in selected])
+
+    def _shard(self, prefix):
+        # Loose keys directly under the prefix are handled here; each
+        # subprefix that can contain matches becomes a shard walked on its
+        # own. Returns (shard, is_device_folder) pairs.
+        shards = []
+        for page in list_pages(self.s3, self.bucket, prefix, delimiter="/"):
+            for common in page.get("CommonPrefixes", []):
+                name = common["Prefix"][len(prefix):-1]
+                if name.startswith("date="):
+                    if self.key_filter.date_matches(name[len("date="):]):
+                        shards.append((common["Prefix"], False))
+                elif self.key_filter.device_matches(name):
+                    shards.append((common["Prefix"], True))
+            self._select(prefix, page.get("Contents", []))
+        return shards
+
+    def _walk(self, prefix, shard, device_folder):
+        start_after = self.key_filter.start_after(shard) if device_folder else None
+        for page in list_pages(self.s3, self.bucket, shard, start_after=start_after):
+            contents = page.get("Contents", [])
+            if device_folder:
+                in_range = [obj for obj in contents
+                            if not self.key_filter.past_range(shard, obj["Key"])]
+                self._select(prefix, in_range)
+                if len(in_range) < len(contents):
+                    # Everything after this is newer than the cutoff
+                    return
+            else:
+                self._select(prefix, contents)
+
+    def clean(self, prefixes):
+        """Delete every matching object under ``prefixes``. Returns the DeleteProgress."""
+        with ThreadPoolExecutor(max_workers=self.workers) as deleters, \
+                ThreadPoolExecutor(max_workers=self.list_workers) as listers:
+            self._deleters = deleters
+            shard_lists = [(prefix, listers.submit(self._shard, prefix)) for prefix in prefixes]
+            walks = [listers.submit(self._walk, prefix, shard, device_folder)
+                     for prefix, shards in shard_lists
+                     for shard, device_folder in shards.result()]
+            for walk in walks:
+                walk.result()
+        logger.info(self.progress.summary(dry_run=self.dry_run))
+        return self.progress
+
+
+def delete_prefix_objects(bucket, prefix, s3=None, **kwargs):
+    """Delete all objects under one prefix. Returns the number deleted."""
+    progress = PrefixCleaner(bucket, s3=s3, **kwargs).clean([prefix])
+    logger.info(f"Deleted {progress.deleted} objects under prefix '{prefix}'.")
+    return progress.deleted
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Delete stored payloads from the S3 bucket")
+    parser.add_argument("--prefix", action="append",
+                        help="Prefix to clean (repeatable). Default: s3_prefixes from config.json")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="Concurrent delete_objects requests")
+    parser.add_argument("--list-workers", type=int, default=8,
+                        help="Device subprefixes listed in parallel")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries for keys returned in a delete response's Errors")
+    parser.add_argument("--older-than", type=float,
+                        help="Only delete objects older than this many days")
+    parser.add_argument("--before", type=str,
+                        help="Only delete objects from before this time (ISO-8601)")
+    parser.add_argument("--after", type=str,
+                        help="Only delete objects from this time on (ISO-8601)")
+    parser.add_argument("--device", action="append",
+                        help="Only delete objects of this device (repeatable)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report the objects and bytes that would be deleted, without deleting")
+    return parser.parse_args()
+
+
+def parse_time(value):
+    """Parse an ISO-8601 time argument; naive values are taken as UTC."""
+    when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc)
+
+
+def retention_filter(args):
+    """Build the RetentionFilter for the parsed arguments."""
+    before = parse_time(args.before) if args.before else None
+    if args.older_than is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than)
+        before = min(before, cutoff) if before else cutoff
+    after = parse_time(args.after) if args.after else None
+    return RetentionFilter(before=before, after=after, devices=args.device)
 
 
 def main():
+    args = parse_args()
     config = load_config()
     bucket = config["s3_bucket"]
-    prefixes = config.get("s3_prefixes", ["raw/", "alerts/", "invalid/"])
+    prefixes = args.prefix or config.get("s3_prefixes", ["raw/", "alerts/", "invalid/"])
 
-    for prefix in prefixes:
-        delete_prefix_objects(bucket, prefix)
+    cleaner = PrefixCleaner(bucket, workers=args.workers, list_workers=args.list_workers,
+                            max_retries=args.max_retries, key_filter=retention_filter(args),
+                            dry_run=args.dry_run)
+    progress = cleaner.clean(prefixes)
+    if progress.failed:
+        logger.warning(f"{progress.failed} objects could not be deleted.")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
+import base64
 import json
-import boto3
 import os
 import sys
+import time
 import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -12,21 +13,65 @@ if not logger.hasHandlers():
     # If no handlers are set, add the stream handler
     # to avoid duplicate logs in AWS Lambda
     logger.addHandler(handler)
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from datetime import datetime, timezone
-from utils.config_loader import load_config
-from dateutil.parser import parse as parse_datetime
+_handler_dir = os.path.dirname(os.path.abspath(__file__))
+if not os.path.isdir(os.path.join(_handler_dir, "utils")):
+    # Running from lambda/ in the repo, where utils/ lives one level up.
+    # The deploy bundle ships utils/ next to the handler, so nothing is
+    # added there and imports don't search an extra directory.
+    sys.path.insert(0, os.path.dirname(_handler_dir))
+from utils.config_loader import load_config, config_cache_stats
+from utils.aws_clients import get_client
+from utils.metrics import MetricsBuffer
+from utils.side_effects import run_side_effects
+from utils.s3_sink import put_chunk, sink_from_env
+from utils.device_state import load_snapshot, save_snapshot, state_from_env
+from utils.alert_coalescer import coalescer_from_env, notification_subject
+from utils.alert_digest import (
+    ALERT_SUBJECT, aggregator_from_env, group_calls, publish_batch_from_env, publish_call
+)
+from utils import classifier
+from utils.classifier import (
+    add_labels, classify_batch, classify_reading, in_expected_range, note_labels
+)
+from utils.rules import DEFAULT_INDEX, rules_from_config
+from utils.timestamps import key_timestamp_seconds, normalize_timestamp, now_key_timestamp
 
+# Batches at least this large are classified in one vectorized pass
+# when NumPy is available
+VECTORIZE_MIN_BATCH = int(os.getenv("VECTORIZE_MIN_BATCH", "16"))
 
-# Initialize the S3 client
-s3 = boto3.client('s3')
-cloudwatch = boto3.client("cloudwatch")
+# Custom metrics are buffered and sent once per invocation or batch
+metrics = MetricsBuffer(namespace="ServerRoomMonitor")
 
-# Constants for thresholds
-TEMP_THRESHOLD_F = 85   # Above this, cooling may be needed
-HUMIDITY_LOW = 20       # Below this, risk of static
-HUMIDITY_HIGH = 60      # Above this, risk of condensation
-VIBRATION_THRESHOLD = 0.5  # Above this, potential mechanical issue
+# Side effects whose failure means the reading was not persisted
+STORAGE_EFFECTS = {"raw", "alerts", "invalid", "sink"}
+
+# Optional chunked NDJSON sink (S3_SINK_MODE=ndjson). When unset every
+# payload is written as its own object.
+sink = sink_from_env()
+
+# A Parquet file carries its schema and footer, so one per reading is
+# larger than the NDJSON it replaces. lambda_handler gets one reading per
+# invocation, so without S3_SINK_MAX_AGE_SECONDS parquet mode only pays
+# off through batch_handler. Checked on the first lambda_handler call.
+PARQUET_SINK_UNBATCHED = (os.getenv("S3_SINK_MODE") == "parquet"
+                          and sink is not None and not sink.max_age_seconds)
+
+# Optional per-device rolling state for trend rules (DEVICE_STATE_WINDOW).
+# With DEVICE_STATE_S3_KEY it is loaded from S3 on the first invocation
+# and saved at most every DEVICE_STATE_SAVE_SECONDS.
+device_state = state_from_env()
+DEVICE_STATE_S3_KEY = os.getenv("DEVICE_STATE_S3_KEY")
+DEVICE_STATE_SAVE_SECONDS = float(os.getenv("DEVICE_STATE_SAVE_SECONDS", "60"))
+
+# Optional alert coalescing (ALERT_COOLDOWN_SECONDS). When unset every
+# anomalous reading is published to SNS.
+coalescer = coalescer_from_env()
+
+# Optional SNS aggregation (ALERT_DIGEST, SNS_PUBLISH_BATCH). Alerts are
+# buffered and sent once per invocation or batch instead of per reading.
+alerts = aggregator_from_env()
+SNS_PUBLISH_BATCH = publish_batch_from_env()
 
 
 def lambda_handler(event, context):
@@ -34,200 +79,533 @@ def lambda_handler(event, context):
     try:
         # Load configuration and get bucket
         config = load_config()
-        logger.debug(f"Loaded config: {config}")
+        logger.debug(f"Loaded config: {config} (cache {config_cache_stats()})")
         bucket_name = config.get("s3_bucket", "sensor-data-bucket")
+        rules = rules_from_config(config)
+        prepare_device_state(bucket_name)
 
-        # Validate required fields
-        required_fields = ["device_id", "temperature", "humidity", "vibration", "timestamp"]
-        missing = [f for f in required_fields if f not in event]
-        if missing:
-            logger.error(f"Missing required fields: {missing}")
-            return {
-                "statusCode": 400,
-                "body": json.dumps(
-                    {"error": f"Missing fields: {', '.join(missing)}"}
-                    )
-            }
-        
-        # Validate data ranges
-        try:
-            device_id = event.get("device_id", "unknown")
-            temperature = float(event.get("temperature", 0))
-            humidity = float(event.get("humidity", 0))
-            vibration = float(event.get("vibration", 0))
-            emit_metric("LambdaExecutions", 1, device_id)
-
-        except (ValueError, TypeError):
-            logger.error("Invalid data types in payload.")
-            timestamp = (
-                datetime.now(timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z")
-                .replace(":", "-")
-            )
-            store_payload_to_s3(bucket_name, "invalid/",
-                                event, timestamp, device_id)
-            return {
-                "statusCode": 400,
-                "body": json.dumps({
-                    "error": "Invalid data types",
-                    "saved_as": (
-                        f"invalid/{device_id}/{timestamp}.json"
-                    )
-                })
-            }
+        warn_unbatched_sink()
 
-        try:
-            timestamp_raw = event.get("timestamp")
-            timestamp = (
-                parse_datetime(timestamp_raw)
-                .astimezone(timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z")
-                .replace(":", "-")
-            )
-        except Exception:
-            logger.warning("Invalid timestamp format, using current UTC time.")
-            timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z").replace(":", "-")
-
-        if not (0 <= humidity <= 100 and 0 <= temperature <= 200
-                and 0 <= vibration <= 5):
-            logger.warning(
-                "Data out of expected range",
-                extra={
-                    "temperature": temperature,
-                    "humidity": humidity,
-                    "vibration": vibration
-                }
-            )
-            store_payload_to_s3(bucket_name, "invalid/", event,
-                                timestamp, device_id)
-            return {
+        response, effects = plan_reading(event, bucket_name, rules=rules)
+        # S3 writes, the SNS publish and the metric flush are independent,
+        # so run them together and wait only for the slowest one
+        for chunk in drain_sink():
+            effects.append(("sink", put_chunk, (get_client("s3"), bucket_name, chunk)))
+        for call in drain_alerts():
+            effects.append(("sns", publish_call, (get_client("sns"), call)))
+        effects.extend(device_state_effects(bucket_name))
+        effects.append(("metrics", metrics.flush, ()))
+        errors = run_side_effects(effects)
+        if errors:
+            return with_effect_errors(response, errors)
+        return response
+
+    except Exception as e:
+        logger.error(f"Error during Lambda execution: {str(e)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
+    finally:
+        # Only does work if planning failed before the flush was scheduled
+        metrics.flush()
+
+
+def with_effect_errors(response, errors):
+    """Add failed side effects to a single-reading response.
+
+    As in batch_handler, a failed S3 write means the reading was not
+    persisted, so the invocation becomes a 500 and can be retried; other
+    failures (SNS, metrics) are only listed under ``errors``.
+    """
+    body = json.loads(response["body"])
+    body["errors"] = {name: str(error) for name, error in errors.items()}
+    status = response["statusCode"]
+    if STORAGE_EFFECTS.intersection(errors):
+        status = 500
+    return {"statusCode": status, "body": json.dumps(body)}
+
+
+def batch_handler(event, context):
+    """AWS Lambda function to process a batch of sensor readings.
+
+    Accepts a plain list of readings (IoT rule batching) or an SQS/Kinesis
+    ``Records`` envelope. Every reading goes through the same validation,
+    classification, storage and alerting as ``lambda_handler``, and the
+    response carries one result per record. Records that failed with a
+    server-side error are listed in ``batchItemFailures`` so SQS/Kinesis
+    only redeliver those.
+    """
+    records = list(unpack_batch(event))
+    try:
+        config = load_config()
+        logger.debug(f"Loaded config: {config} (cache {config_cache_stats()})")
+        bucket_name = config.get("s3_bucket", "sensor-data-bucket")
+        rules = rules_from_config(config)
+        prepare_device_state(bucket_name)
+    except Exception as e:
+        logger.error(f"Error during Lambda execution: {str(e)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+            "batchItemFailures": [
+                {"itemIdentifier": item_id} for item_id, _, _ in records
+            ]
+        }
+
+    decoded = [(item_id, reading) for item_id, reading, decode_error in records
+               if decode_error is None]
+    # Buffered chunks and alerts can outlive an invocation, and positional
+    # ids repeat between batches, so tags carry a token for this batch
+    batch = object()
+    planned = iter(plan_readings(
+        [reading for _, reading in decoded], bucket_name,
+        [(batch, item_id) for item_id, _ in decoded], rules
+    ))
+
+    responses = []
+    effects = []
+    for item_id, reading, decode_error in records:
+        if decode_error is not None:
+            logger.error(f"Malformed batch record {item_id}: {decode_error}")
+            response = {
                 "statusCode": 400,
-                "body": json.dumps({
-                    "error": "Values out of expected range",
-                    "saved_as": f"invalid/{device_id}/{timestamp}.json"
-                })
+                "body": json.dumps({"error": "Malformed record"})
             }
+        else:
+            outcome = next(planned)
+            if isinstance(outcome, Exception):
+                logger.error(f"Error processing batch record {item_id}: {str(outcome)}")
+                response = {
+                    "statusCode": 500,
+                    "body": json.dumps({"error": str(outcome)})
+                }
+            else:
+                response, record_effects = outcome
+                effects.extend(
+                    ((item_id, name), fn, args)
+                    for name, fn, args in record_effects
+                )
+        responses.append((item_id, response))
 
-        # Determine if the data is anomalous
-        note = []
-        num_anomalies = 0
-
-        if temperature > TEMP_THRESHOLD_F:
-            note.append("High temperature")
-            num_anomalies += 1
-        if humidity < HUMIDITY_LOW:
-            note.append("Low humidity")
-            num_anomalies += 1
-        elif humidity > HUMIDITY_HIGH:
-            note.append("High humidity")
-            num_anomalies += 1
-        if vibration > VIBRATION_THRESHOLD:
-            note.append("Excessive vibration")
-            num_anomalies += 1
-
-        is_anomaly = num_anomalies > 0
-
-        payload = {
-            "device_id": device_id,
-            "temperature": temperature,
-            "humidity": humidity,
-            "vibration": vibration,
-            "timestamp": timestamp,
-            "alert": is_anomaly,
-            "note": f"{num_anomalies} Anomalies Detected: {', '.join(note)}" if note else "Normal"
+    # Side effects of every record in the batch share the pool. Chunks and
+    # SNS calls carry several records, listed by their tags.
+    shared = []
+    for chunk in drain_sink():
+        effects.append(((None, len(shared)), put_chunk,
+                        (get_client("s3"), bucket_name, chunk)))
+        shared.append(("sink", chunk["tags"]))
+    for call in drain_alerts():
+        effects.append(((None, len(shared)), publish_call, (get_client("sns"), call)))
+        shared.append(("sns", [tag for message in call for tag in message["tags"]]))
+    effects.extend((("batch", name), fn, args)
+                   for name, fn, args in device_state_effects(bucket_name))
+    effects.append((("batch", "metrics"), metrics.flush, ()))
+    effect_errors = {}
+    for (item_id, name), error in run_side_effects(effects).items():
+        if item_id is None:
+            # A failed chunk or SNS call is reported on every record of
+            # this batch it carried; readings from earlier invocations
+            # have already been answered
+            effect_name, tags = shared[name]
+            for tag_batch, tag in tags:
+                if tag_batch is batch:
+                    effect_errors.setdefault(tag, {})[effect_name] = str(error)
+            continue
+        effect_errors.setdefault(item_id, {})[name] = str(error)
+
+    results = []
+    failures = []
+    for item_id, response in responses:
+        errors = effect_errors.get(item_id, {})
+        # Client errors (4xx) are permanent. Server errors and failed
+        # S3 writes are retried; the keys are deterministic so a retry
+        # overwrites rather than duplicates.
+        if (response["statusCode"] >= 500
+                or STORAGE_EFFECTS.intersection(errors)):
+            failures.append({"itemIdentifier": item_id})
+        result = {
+            "id": item_id,
+            "statusCode": response["statusCode"],
+            "body": json.loads(response["body"])
         }
+        if errors:
+            result["errors"] = errors
+        results.append(result)
 
-        if device_id == "unknown":
-            logger.warning("Device ID is unknown; using fallback ID.")
+    logger.info(
+        "Batch processed",
+        extra={"records": len(results), "failed": len(failures)}
+    )
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "processed": len(results),
+            "failed": len(failures),
+            "results": results
+        }),
+        "batchItemFailures": failures
+    }
 
-        # Upload to S3 raw data bucket
-        store_payload_to_s3(bucket_name, "raw/", payload, timestamp, device_id)
 
-        # Check if the data is anomalous. If so, store in alerts bucket
-        # and send SNS notification.
-        if is_anomaly:
-            emit_metric("AnomaliesDetected", num_anomalies, device_id)
-            store_payload_to_s3(bucket_name, "alerts/", payload,
-                                timestamp, device_id)
+def unpack_batch(event):
+    """Yield (item_id, reading, decode_error) for each record in a batch event.
 
+    SQS records are identified by ``messageId`` and Kinesis records by
+    ``sequenceNumber``, matching what partial batch responses expect.
+    Plain lists are identified by their position.
+    """
+    if isinstance(event, dict) and "Records" in event:
+        for index, record in enumerate(event["Records"]):
+            # Work out the id first so a record that fails to decode is
+            # still reported under the id SQS/Kinesis expect
+            kinesis = record.get("kinesis") if isinstance(record, dict) else None
+            if isinstance(kinesis, dict) and "sequenceNumber" in kinesis:
+                item_id = kinesis["sequenceNumber"]
+            elif isinstance(record, dict):
+                item_id = record.get("messageId", str(index))
+            else:
+                item_id = str(index)
             try:
-                sns_arn = os.environ.get("SNS_TOPIC_ARN")
-                if sns_arn:
-                    sns = boto3.client("sns")
-                    sns.publish(
-                        TopicArn=sns_arn,
-                        Subject="⚠️ Sensor Alert Detected",
-                        Message=json.dumps(payload, indent=2)
-                    )
-                    logger.info(
-                        "SNS alert published",
-                        extra={
-                            "device_id": device_id,
-                            "timestamp": timestamp
-                        }
-                    )
+                if kinesis is not None:
+                    reading = json.loads(base64.b64decode(kinesis["data"]))
                 else:
-                    logger.warning(
-                        "SNS_TOPIC_ARN not set in environment variables."
-                        )
-            except Exception as sns_err:
-                logger.error(f"Failed to publish to SNS: {str(sns_err)}")
-
-        logger.info(
-            "Payload processed and stored",
+                    reading = json.loads(record["body"])
+            except Exception as e:
+                yield item_id, None, e
+                continue
+            if not isinstance(reading, dict):
+                yield item_id, None, TypeError("Record is not a JSON object")
+                continue
+            yield item_id, reading, None
+    elif isinstance(event, list):
+        for index, reading in enumerate(event):
+            if not isinstance(reading, dict):
+                yield str(index), None, TypeError("Record is not a JSON object")
+                continue
+            yield str(index), reading, None
+    else:
+        yield "0", event, None
+
+
+def plan_reading(event, bucket_name, record_id=None, rules=None):
+    """Validate and classify a single sensor reading.
+
+    Returns the response and the list of (name, callable, args) side
+    effects (S3 writes, SNS publish) still to be run for it. ``record_id``
+    tags the reading in the chunked sink so batch failures can be traced
+    back to it. ``rules`` is the compiled RuleIndex from config.json; the
+    built-in thresholds are used without it.
+    """
+    reading, rejected = parse_reading(event, bucket_name, record_id)
+    if rejected is not None:
+        return rejected
+    device_id, temperature, humidity, vibration, timestamp = reading
+    in_range = in_expected_range(temperature, humidity, vibration)
+    rule_set = (rules or DEFAULT_INDEX).for_device(device_id)
+    num_anomalies, note = classify_reading(temperature, humidity, vibration, rule_set)
+    return finish_reading(event, reading, in_range, num_anomalies, note,
+                          bucket_name, record_id)
+
+
+def plan_readings(events, bucket_name, record_ids, rules=None):
+    """Plan a batch of readings, classifying them in one vectorized pass.
+
+    Returns one (response, effects) pair per event, identical to calling
+    plan_reading() on each. Falls back to the scalar path for small
+    batches or when NumPy is not installed. Exceptions are returned in
+    place of the pair so one bad record does not fail the batch.
+    """
+    if not classifier.HAS_NUMPY or len(events) < VECTORIZE_MIN_BATCH:
+        planned = []
+        for event, record_id in zip(events, record_ids):
+            try:
+                planned.append(plan_reading(event, bucket_name, record_id, rules))
+            except Exception as e:
+                planned.append(e)
+        return planned
+
+    planned = [None] * len(events)
+    parsed = []
+    for index, (event, record_id) in enumerate(zip(events, record_ids)):
+        try:
+            reading, rejected = parse_reading(event, bucket_name, record_id)
+        except Exception as e:
+            planned[index] = e
+            continue
+        if rejected is not None:
+            planned[index] = rejected
+        else:
+            parsed.append((index, reading))
+
+    if parsed:
+        classes = classify_batch(
+            [reading[1] for _, reading in parsed],
+            [reading[2] for _, reading in parsed],
+            [reading[3] for _, reading in parsed],
+            rules=rules or DEFAULT_INDEX,
+            device_ids=[reading[0] for _, reading in parsed],
+        )
+        in_range = classes["in_range"].tolist()
+        num_anomalies = classes["num_anomalies"].tolist()
+        notes = classes["note"].tolist()
+        for position, (index, reading) in enumerate(parsed):
+            try:
+                planned[index] = finish_reading(
+                    events[index], reading, in_range[position],
+                    num_anomalies[position], notes[position],
+                    bucket_name, record_ids[index]
+                )
+            except Exception as e:
+                planned[index] = e
+    return planned
+
+
+def parse_reading(event, bucket_name, record_id=None):
+    """Check required fields and types and normalize the timestamp.
+
+    Returns ((device_id, temperature, humidity, vibration, timestamp), None)
+    for a usable reading, or (None, (response, effects)) if it was rejected.
+    """
+    effects = []
+    # Validate required fields
+    required_fields = ["device_id", "temperature", "humidity", "vibration", "timestamp"]
+    missing = [f for f in required_fields if f not in event]
+    if missing:
+        logger.error(f"Missing required fields: {missing}")
+        return None, ({
+            "statusCode": 400,
+            "body": json.dumps(
+                {"error": f"Missing fields: {', '.join(missing)}"}
+                )
+        }, effects)
+
+    # Validate data types
+    try:
+        device_id = event.get("device_id", "unknown")
+        temperature = float(event.get("temperature", 0))
+        humidity = float(event.get("humidity", 0))
+        vibration = float(event.get("vibration", 0))
+        emit_metric("LambdaExecutions", 1, device_id)
+
+    except (ValueError, TypeError):
+        logger.error("Invalid data types in payload.")
+        timestamp = now_key_timestamp()
+        saved_as = queue_store(effects, "invalid", bucket_name, "invalid/",
+                               event, timestamp, device_id, record_id)
+        return None, ({
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": "Invalid data types",
+                "saved_as": saved_as
+            })
+        }, effects)
+
+    try:
+        timestamp = normalize_timestamp(event.get("timestamp"))
+    except Exception:
+        logger.warning("Invalid timestamp format, using current UTC time.")
+        timestamp = now_key_timestamp()
+
+    return (device_id, temperature, humidity, vibration, timestamp), None
+
+
+def finish_reading(event, reading, in_range, num_anomalies, note,
+                   bucket_name, record_id=None):
+    """Build the response and side effects for a parsed, classified reading."""
+    effects = []
+    device_id, temperature, humidity, vibration, timestamp = reading
+
+    # Validate data ranges
+    if not in_range:
+        logger.warning(
+            "Data out of expected range",
             extra={
-                "device_id": device_id,
-                "timestamp": timestamp
+                "temperature": temperature,
+                "humidity": humidity,
+                "vibration": vibration
             }
         )
+        saved_as = queue_store(effects, "invalid", bucket_name, "invalid/",
+                               event, timestamp, device_id, record_id)
         return {
-            "statusCode": 200,
-            "body": json.dumps(payload)
-        }
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": "Values out of expected range",
+                "saved_as": saved_as
+            })
+        }, effects
 
-    except Exception as e:
-        logger.error(f"Error during Lambda execution: {str(e)}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
+    when = None
+    if device_state is not None or coalescer is not None:
+        when = key_timestamp_seconds(timestamp)
+
+    # Trend rules see readings in arrival order, including in batches
+    if device_state is not None:
+        labels = device_state.observe(device_id, when, temperature, humidity, vibration)
+        if labels:
+            num_anomalies, note = add_labels(num_anomalies, note, labels)
+
+    # Determine if the data is anomalous
+    is_anomaly = num_anomalies > 0
+
+    payload = {
+        "device_id": device_id,
+        "temperature": temperature,
+        "humidity": humidity,
+        "vibration": vibration,
+        "timestamp": timestamp,
+        "alert": is_anomaly,
+        "note": note
+    }
+
+    if device_id == "unknown":
+        logger.warning("Device ID is unknown; using fallback ID.")
+
+    # Upload to S3 raw data bucket
+    queue_store(effects, "raw", bucket_name, "raw/", payload,
+                timestamp, device_id, record_id)
+
+    # Check if the data is anomalous. If so, store in alerts bucket
+    # and send SNS notification.
+    if is_anomaly:
+        emit_metric("AnomaliesDetected", num_anomalies, device_id)
+        queue_store(effects, "alerts", bucket_name, "alerts/", payload,
+                    timestamp, device_id, record_id)
+
+    if coalescer is not None:
+        # Normal readings can close incidents, so every reading goes in
+        events, suppressed = coalescer.observe(
+            device_id, note_labels(num_anomalies, note), when)
+        if suppressed:
+            emit_metric("AlertsSuppressed", suppressed, device_id)
+        if events:
+            queue_alert(effects, notification_subject(events),
+                        dict(payload, incidents=events), record_id)
+    elif is_anomaly:
+        queue_alert(effects, ALERT_SUBJECT, payload, record_id)
+
+    logger.info(
+        "Payload processed",
+        extra={
+            "device_id": device_id,
+            "timestamp": timestamp
         }
+    )
+    return {
+        "statusCode": 200,
+        "body": json.dumps(payload)
+    }, effects
 
 
-# Utility function to store the payload in S3
-# with a specific prefix and timestamp.
-def store_payload_to_s3(bucket, prefix, payload, timestamp, device_id):
-    key = f"{prefix}{device_id}/{timestamp}.json"
-    try:
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps(payload),
-            ContentType='application/json'
-        )
-        logger.info(
-            "S3 put_object success",
-            extra={"s3_key": key, "bucket": bucket}
+# Queue the S3 write for a payload, or buffer it in the chunked sink
+# when one is configured. Returns where the payload will be saved.
+def queue_store(effects, name, bucket, prefix, payload, timestamp,
+                device_id, record_id=None):
+    if sink is not None:
+        sink.add(prefix, payload, timestamp, device_id, tag=record_id)
+        return f"{prefix}{device_id}/{timestamp[:13]}/"
+    effects.append((name, put_payload_to_s3,
+                    (bucket, prefix, payload, timestamp, device_id)))
+    return f"{prefix}{device_id}/{timestamp}.json"
+
+
+# Load the device state snapshot on the first invocation, if configured.
+def prepare_device_state(bucket_name):
+    if device_state is None or not DEVICE_STATE_S3_KEY or device_state.loaded:
+        return
+    loaded = load_snapshot(device_state, get_client("s3"), bucket_name,
+                           DEVICE_STATE_S3_KEY)
+    logger.info(f"Loaded rolling state for {loaded} devices")
+
+
+# Return the device state snapshot write, when one is due, as side effects.
+def device_state_effects(bucket_name):
+    if device_state is None or not DEVICE_STATE_S3_KEY:
+        return []
+    now = time.monotonic()
+    if now - device_state.last_saved < DEVICE_STATE_SAVE_SECONDS:
+        return []
+    device_state.last_saved = now
+    return [("state", save_snapshot, (get_client("s3"), bucket_name,
+                                      DEVICE_STATE_S3_KEY, device_state.dumps()))]
+
+
+# Log once per container when parquet mode would write a file per reading.
+def warn_unbatched_sink():
+    global PARQUET_SINK_UNBATCHED
+    if PARQUET_SINK_UNBATCHED:
+        PARQUET_SINK_UNBATCHED = False
+        logger.warning(
+            "S3_SINK_MODE=parquet with lambda_handler and S3_SINK_MAX_AGE_SECONDS=0 "
+            "writes one Parquet object per reading. Use batch_handler or set "
+            "S3_SINK_MAX_AGE_SECONDS to buffer readings across invocations."
         )
-    except Exception as e:
-        logger.error(f"Failed to store payload in {key}: {e}")
 
 
-# Utility function to emit custom CloudWatch metrics
-# for monitoring Lambda execution and anomalies.
+# Take the chunks that are ready to be written out of the sink.
+def drain_sink():
+    if sink is None:
+        return []
+    return sink.drain()
+
+
+# Store one payload as its own object. Errors propagate so the
+# side-effect runner can report them per write.
+def put_payload_to_s3(bucket, prefix, payload, timestamp, device_id):
+    key = f"{prefix}{device_id}/{timestamp}.json"
+    get_client("s3").put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(payload),
+        ContentType='application/json'
+    )
+    logger.info(
+        "S3 put_object success",
+        extra={"s3_key": key, "bucket": bucket}
+    )
+
+
+# Queue an SNS alert for a reading, if a topic is configured. With
+# aggregation on it is buffered until the invocation or batch ends.
+def queue_alert(effects, subject, message, record_id=None):
+    sns_arn = os.environ.get("SNS_TOPIC_ARN")
+    if not sns_arn:
+        logger.warning(
+            "SNS_TOPIC_ARN not set in environment variables."
+            )
+    elif alerts is not None:
+        alerts.add(sns_arn, subject, message, tag=record_id)
+    else:
+        effects.append(("sns", publish_alert, (sns_arn, message, subject)))
+
+
+# Take the buffered alerts that are ready, grouped into SNS calls.
+def drain_alerts():
+    if alerts is None:
+        return []
+    return group_calls(alerts.drain(), SNS_PUBLISH_BATCH)
+
+
+# Utility function to publish an anomalous payload to SNS. Incident
+# notifications add an "incidents" list to the payload.
+def publish_alert(sns_arn, payload, subject=ALERT_SUBJECT):
+    get_client("sns").publish(
+        TopicArn=sns_arn,
+        Subject=subject,
+        Message=json.dumps(payload, indent=2)
+    )
+    logger.info(
+        "SNS alert published",
+        extra={
+            "device_id": payload["device_id"],
+            "timestamp": payload["timestamp"]
+        }
+    )
+
+
+# Utility function to record custom CloudWatch metrics
+# for monitoring Lambda execution and anomalies. Data points are
+# buffered and sent when the invocation or batch finishes.
 def emit_metric(name, value, device_id, unit="Count"):
-    try:
-        cloudwatch.put_metric_data(
-            Namespace="ServerRoomMonitor",
-            MetricData=[{
-                "MetricName": name,
-                "Value": value,
-                "Unit": unit,
-                "Dimensions": [{"Name": "DeviceId",
-                                "Value": device_id}]
-            }]
-        )
-        logger.info(f"Custom CloudWatch metric emitted: {name} = {value}")
-    except Exception as e:
-        logger.warning(f"Failed to emit CloudWatch metric {name}: {e}")
+    metrics.add(name, value, {"DeviceId": device_id}, unit)
@@ -1 +0,0 @@
-__version__ = "1.1.0"
@@ -0,0 +1,152 @@
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from utils.alert_digest import ALERT_SUBJECT
+
+# Turns a stream of anomalous readings into incidents, one per
+# (device_id, anomaly type). An incident sends one notification when it
+# opens, a digest at most once per cooldown while it stays open, and one
+# when the device has reported that anomaly clear for a few readings in a
+# row. Every anomalous reading in between is counted as suppressed.
+#
+# Incidents live in the container's memory. Concurrent containers each
+# keep their own, so a busy fleet can still send one entry per container.
+
+
+def _iso(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class Incident:
+    __slots__ = ("device_id", "anomaly", "opened_at", "last_seen", "last_notified",
+                 "readings", "since_notified", "suppressed", "clean")
+
+    def __init__(self, device_id, anomaly, when):
+        self.device_id = device_id
+        self.anomaly = anomaly
+        self.opened_at = when
+        self.last_seen = when
+        self.last_notified = when
+        self.readings = 1
+        self.since_notified = 0
+        self.suppressed = 0
+        self.clean = 0
+
+    def event(self, kind, when):
+        return {
+            "kind": kind,
+            "device_id": self.device_id,
+            "anomaly": self.anomaly,
+            "opened_at": _iso(self.opened_at),
+            "last_seen": _iso(self.last_seen),
+            "duration_seconds": round(when - self.opened_at, 3),
+            "readings": self.readings,
+            "since_last_notification": self.since_notified,
+            "suppressed": self.suppressed,
+        }
+
+
+class AlertCoalescer:
+    """Tracks open incidents and decides which readings notify.
+
+    ``cooldown_seconds`` is the least time between two notifications for
+    one incident, ``recovery_readings`` the clean readings in a row that
+    close it, and ``max_incidents`` bounds memory: past it the least
+    recently updated incident is dropped without a recovery notice. Times
+    are reading times in seconds, so replayed data coalesces the same way.
+    """
+
+    def __init__(self, cooldown_seconds=900.0, recovery_readings=3, max_incidents=10000):
+        self.cooldown_seconds = cooldown_seconds
+        self.recovery_readings = max(1, recovery_readings)
+        self.max_incidents = max_incidents
+        self.incidents = OrderedDict()
+        self._by_device = {}
+        self.stats = {"opened": 0, "updates": 0, "recovered": 0,
+                      "suppressed": 0, "evicted": 0}
+
+    def observe(self, device_id, labels, when):
+        """Feed one in-range reading and the labels of the rules it broke.
+
+        Returns (events, suppressed): the notifications to send, oldest
+        incident first, and how many of the reading's anomalies were
+        swallowed by a cooldown.
+        """
+        events = []
+        suppressed = 0
+        open_types = self._by_device.get(device_id)
+        if open_types:
+            for anomaly in list(open_types):
+                if anomaly in labels:
+                    continue
+                incident = self.incidents[(device_id, anomaly)]
+                incident.clean += 1
+                if incident.clean >= self.recovery_readings:
+                    self._close(incident)
+                    events.append(incident.event("recovery", when))
+                    self.stats["recovered"] += 1
+        for anomaly in labels:
+            key = (device_id, anomaly)
+            incident = self.incidents.get(key)
+            if incident is None:
+                self._open(Incident(device_id, anomaly, when))
+                events.append(self.incidents[key].event("entry", when))
+                self.stats["opened"] += 1
+                continue
+            self.incidents.move_to_end(key)
+            incident.readings += 1
+            incident.since_notified += 1
+            incident.clean = 0
+            incident.last_seen = max(incident.last_seen, when)
+            if when - incident.last_notified >= self.cooldown_seconds:
+                events.append(incident.event("update", when))
+                incident.last_notified = when
+                incident.since_notified = 0
+                incident.suppressed = 0
+                self.stats["updates"] += 1
+            else:
+                incident.suppressed += 1
+                suppressed += 1
+        self.stats["suppressed"] += suppressed
+        return events, suppressed
+
+    def _open(self, incident):
+        key = (incident.device_id, incident.anomaly)
+        self.incidents[key] = incident
+        self._by_device.setdefault(incident.device_id, set()).add(incident.anomaly)
+        if len(self.incidents) > self.max_incidents:
+            _, oldest = self.incidents.popitem(last=False)
+            self._forget(oldest)
+            self.stats["evicted"] += 1
+
+    def _close(self, incident):
+        del self.incidents[(incident.device_id, incident.anomaly)]
+        self._forget(incident)
+
+    def _forget(self, incident):
+        open_types = self._by_device[incident.device_id]
+        open_types.discard(incident.anomaly)
+        if not open_types:
+            del self._by_device[incident.device_id]
+
+
+def notification_subject(events):
+    """SNS subject for a reading's events: the most urgent kind wins."""
+    kinds = {event["kind"] for event in events}
+    if "entry" in kinds:
+        return ALERT_SUBJECT
+    if "update" in kinds:
+        return "⚠️ Sensor Alert Ongoing"
+    return "✅ Sensor Alert Resolved"
+
+
+def coalescer_from_env():
+    """Build the coalescer configured by ALERT_* variables, or None when disabled."""
+    cooldown = float(os.getenv("ALERT_COOLDOWN_SECONDS", "0") or 0)
+    if cooldown <= 0:
+        return None
+    return AlertCoalescer(
+        cooldown_seconds=cooldown,
+        recovery_readings=int(os.getenv("ALERT_RECOVERY_READINGS", "3")),
+        max_incidents=int(os.getenv("ALERT_MAX_INCIDENTS", "10000")),
+    )
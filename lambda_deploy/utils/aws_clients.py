@@ -0,0 +1,58 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+# One boto3 client per service, built on first use and reused for the life
+# of the process (the Lambda container), so warm invocations skip
+# credential resolution and reuse pooled connections.
+# AWS_MAX_POOL_CONNECTIONS and AWS_TCP_KEEPALIVE tune the shared pool.
+_clients = {}
+_client_lock = threading.Lock()
+_client_settings = {
+    "max_pool_connections": int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "25")),
+    "tcp_keepalive": os.getenv("AWS_TCP_KEEPALIVE", "1") in ("1", "true", "True"),
+}
+
+
+def client_config():
+    """Return the botocore Config shared by all cached clients."""
+    return Config(
+        max_pool_connections=_client_settings["max_pool_connections"],
+        tcp_keepalive=_client_settings["tcp_keepalive"],
+    )
+
+
+def get_client(service_name):
+    """Return the cached boto3 client for a service, creating it on first use."""
+    client = _clients.get(service_name)
+    if client is None:
+        # boto3's default session is not safe for concurrent client creation
+        with _client_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(service_name, config=client_config())
+                _clients[service_name] = client
+    return client
+
+
+def configure_clients(max_pool_connections=None, tcp_keepalive=None):
+    """Change connection pool settings and drop clients built with the old ones."""
+    with _client_lock:
+        if max_pool_connections is not None:
+            _client_settings["max_pool_connections"] = max_pool_connections
+        if tcp_keepalive is not None:
+            _client_settings["tcp_keepalive"] = tcp_keepalive
+        _clients.clear()
+
+
+def set_client(service_name, client):
+    """Use a pre-built client (e.g. a local stand-in) for a service."""
+    with _client_lock:
+        _clients[service_name] = client
+
+
+def reset_clients():
+    """Forget all cached clients."""
+    with _client_lock:
+        _clients.clear()
@@ -0,0 +1,136 @@
+import importlib.util
+from utils.rules import DEFAULT_INDEX, format_note, rule_key
+
+# NumPy is optional: without it every reading goes through
+# classify_reading(). It is only imported by the first classify_batch()
+# call so single-reading invocations don't pay for it at cold start.
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+_np = None
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        import numpy
+        _np = numpy
+    return _np
+
+
+# Thresholds live in utils.rules: DEFAULT_RULES, or "rules" and
+# "rule_overrides" in config.json compiled by rules_from_config().
+# classify_reading() and classify_batch() use the defaults unless given
+# compiled rules.
+
+
+def note_labels(num_anomalies, note):
+    """Return the labels in a note built by format_note()."""
+    return note.split(": ", 1)[1].split(", ") if num_anomalies else []
+
+
+def add_labels(num_anomalies, note, labels):
+    """Add the labels of rules outside this module to a classify_reading() result."""
+    return num_anomalies + len(labels), format_note(note_labels(num_anomalies, note) + labels)
+
+
+def in_expected_range(temperature, humidity, vibration):
+    """Return True if the reading is physically plausible."""
+    return (0 <= humidity <= 100 and 0 <= temperature <= 200
+            and 0 <= vibration <= 5)
+
+
+def classify_reading(temperature, humidity, vibration, rules=None):
+    """Classify one reading. Returns (num_anomalies, note).
+
+    ``rules`` is the RuleSet to apply, e.g. from RuleIndex.for_device();
+    the built-in rules by default.
+    """
+    if rules is None:
+        rules = DEFAULT_INDEX.default
+    return rules.classify(temperature, humidity, vibration)
+
+
+def _outcomes(np, rule_set, code):
+    table = rule_set.outcome_table()
+    if table is not None:
+        return (np.asarray(table[0], dtype=np.int64)[code],
+                np.asarray(table[1], dtype=object)[code])
+    codes, inverse = np.unique(code, return_inverse=True)
+    outcomes = [rule_set.outcome(int(c)) for c in codes]
+    return (np.asarray([num for num, _ in outcomes], dtype=np.int64)[inverse],
+            np.asarray([note for _, note in outcomes], dtype=object)[inverse])
+
+
+def classify_batch(temperature, humidity, vibration, rules=None, device_ids=None):
+    """Classify a batch of readings given as equal-length arrays.
+
+    ``rules`` is a RuleIndex (the built-in rules by default) and
+    ``device_ids`` selects each reading's rule set from it; without them
+    every reading uses the index's base rules.
+
+    Returns a dict of NumPy arrays: ``in_range`` and one boolean mask per
+    rule label, keyed like ``high_temperature``, ``num_anomalies`` as ints
+    and ``note`` as strings. Values match classify_reading() and
+    in_expected_range() element for element.
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("numpy is required for batch classification")
+    np = _numpy()
+    index = DEFAULT_INDEX if rules is None else rules
+    t = np.asarray(temperature, dtype=np.float64)
+    h = np.asarray(humidity, dtype=np.float64)
+    v = np.asarray(vibration, dtype=np.float64)
+    columns = {"temperature": t, "humidity": h, "vibration": v}
+
+    in_range = ((0 <= h) & (h <= 100) & (0 <= t) & (t <= 200)
+                & (0 <= v) & (v <= 5))
+
+    if device_ids is None:
+        rule_sets = [index.default]
+        selected = None
+    else:
+        # Number the distinct rule sets and note which one each reading uses
+        numbers = {}
+        rule_sets = []
+        selected = []
+        for device_id in device_ids:
+            rule_set = index.for_device(device_id)
+            number = numbers.get(id(rule_set))
+            if number is None:
+                number = numbers[id(rule_set)] = len(rule_sets)
+                rule_sets.append(rule_set)
+            selected.append(number)
+        selected = np.asarray(selected, dtype=np.intp)
+
+    result = {"in_range": in_range}
+    if len(rule_sets) == 1:
+        code, masks = rule_sets[0].masks(np, columns)
+        num_anomalies, note = _outcomes(np, rule_sets[0], code)
+        result.update((rule_key(label), mask) for label, mask in masks.items())
+    else:
+        # One vectorized pass per rule shape. Sets that only differ in
+        # their bounds share it, with each reading's bounds looked up from
+        # a (rule set x rule) table.
+        by_shape = {}
+        for number, rule_set in enumerate(rule_sets):
+            by_shape.setdefault(rule_set.shape, []).append(number)
+        num_anomalies = np.zeros(t.shape, dtype=np.int64)
+        note = np.empty(t.shape, dtype=object)
+        for numbers in by_shape.values():
+            template = rule_sets[numbers[0]]
+            positions = np.flatnonzero(np.isin(selected, numbers))
+            table = np.zeros((len(rule_sets), len(template.rules)), dtype=np.float64)
+            for number in numbers:
+                table[number] = rule_sets[number].bounds
+            code, masks = template.masks(
+                np, {metric: column[positions] for metric, column in columns.items()},
+                bounds=table[selected[positions]])
+            num_anomalies[positions], note[positions] = _outcomes(np, template, code)
+            for label, mask in masks.items():
+                key = rule_key(label)
+                if key not in result:
+                    result[key] = np.zeros(t.shape, dtype=bool)
+                result[key][positions] = mask
+
+    result["num_anomalies"] = num_anomalies
+    result["note"] = note
+    return result
@@ -0,0 +1,282 @@
+import json
+import os
+import time
+from array import array
+from collections import OrderedDict
+
+# Per-device rolling state for trend rules. Each device keeps the last few
+# readings of every metric in fixed-size ring buffers, with running sums
+# so mean, variance and least-squares slope are O(1) per reading. State
+# lives in the container's memory and survives warm invocations; it can
+# optionally be snapshotted to S3 so a new container starts warm.
+#
+# Rules, all off until DEVICE_STATE_WINDOW is set:
+#   - "Rapid temperature rise": the temperature slope over the window is
+#     above TEMP_RISE_F_PER_MIN, even if every reading is under the limit.
+#   - "Unusual <metric>": the reading is more than ZSCORE_THRESHOLD
+#     standard deviations from the device's recent mean.
+
+METRICS = ("temperature", "humidity", "vibration")
+
+SNAPSHOT_VERSION = 1
+
+# Standard deviations below these are treated as these, so a sensor that
+# has reported the same value for a while doesn't flag every small change
+MIN_STD = {"temperature": 0.5, "humidity": 1.0, "vibration": 0.05}
+
+
+class RollingWindow:
+    """Ring buffer of (time, value) samples with running sums.
+
+    Holds at most ``capacity`` samples and, with ``max_age``, drops samples
+    older than that many seconds before the newest one. Times and values
+    are stored relative to the oldest sample so the sums keep their
+    precision, and the sums are rebuilt from the buffer once per
+    ``capacity`` evictions so rounding errors don't accumulate; both keep
+    add() amortized O(1).
+    """
+
+    __slots__ = ("capacity", "max_age", "times", "values", "start", "count",
+                 "evictions", "t0", "v0", "st", "sv", "stt", "svv", "stv")
+
+    def __init__(self, capacity, max_age=None):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+        self.evictions = 0
+        self._reset(0.0, 0.0)
+
+    def _reset(self, t0, v0):
+        self.t0 = t0
+        self.v0 = v0
+        self.st = self.sv = self.stt = self.svv = self.stv = 0.0
+
+    def add(self, when, value):
+        self.expire(when)
+        if self.count == self.capacity:
+            self._pop()
+        if self.count == 0:
+            self._reset(when, value)
+        index = (self.start + self.count) % self.capacity
+        self.times[index] = when
+        self.values[index] = value
+        self.count += 1
+        self._accumulate(when - self.t0, value - self.v0, 1.0)
+
+    def _accumulate(self, t, v, sign):
+        self.st += sign * t
+        self.sv += sign * v
+        self.stt += sign * t * t
+        self.svv += sign * v * v
+        self.stv += sign * t * v
+
+    def _pop(self):
+        index = self.start
+        self._accumulate(self.times[index] - self.t0, self.values[index] - self.v0, -1.0)
+        self.start = (index + 1) % self.capacity
+        self.count -= 1
+        self.evictions += 1
+        if self.evictions >= self.capacity:
+            self._rebase()
+
+    def _rebase(self):
+        self.evictions = 0
+        if not self.count:
+            self._reset(0.0, 0.0)
+            return
+        self._reset(self.times[self.start], self.values[self.start])
+        for when, value in self.samples():
+            self._accumulate(when - self.t0, value - self.v0, 1.0)
+
+    def expire(self, now):
+        """Drop samples more than ``max_age`` seconds older than ``now``."""
+        if self.max_age:
+            while self.count and now - self.times[self.start] > self.max_age:
+                self._pop()
+
+    def samples(self):
+        """Return the samples as a list of (time, value), oldest first."""
+        return [(self.times[(self.start + i) % self.capacity],
+                 self.values[(self.start + i) % self.capacity])
+                for i in range(self.count)]
+
+    def span(self):
+        """Seconds between the oldest and newest sample."""
+        if not self.count:
+            return 0.0
+        newest = (self.start + self.count - 1) % self.capacity
+        return self.times[newest] - self.times[self.start]
+
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return self.v0 + self.sv / self.count
+
+    def variance(self):
+        """Sample variance, or 0.0 with fewer than two samples."""
+        n = self.count
+        if n < 2:
+            return 0.0
+        return max(0.0, (self.svv - self.sv * self.sv / n) / (n - 1))
+
+    def std(self):
+        return self.variance() ** 0.5
+
+    def slope(self):
+        """Least-squares slope in units per second, or 0.0 if undefined."""
+        n = self.count
+        denominator = n * self.stt - self.st * self.st
+        if n < 2 or denominator <= 0:
+            return 0.0
+        return (n * self.stv - self.st * self.sv) / denominator
+
+
+class DeviceState:
+    __slots__ = ("temperature", "humidity", "vibration", "last_seen")
+
+    def __init__(self, capacity, max_age=None):
+        self.temperature = RollingWindow(capacity, max_age)
+        self.humidity = RollingWindow(capacity, max_age)
+        self.vibration = RollingWindow(capacity, max_age)
+        self.last_seen = 0.0
+
+
+class DeviceStateStore:
+    """Rolling state for up to ``max_devices`` devices, least recently seen evicted first.
+
+    Not thread-safe: the handler plans readings on a single thread.
+    """
+
+    def __init__(self, window=32, max_age_seconds=600.0, max_devices=10000,
+                 min_samples=8, min_span_seconds=60.0, temp_rise_per_minute=4.0,
+                 zscore_threshold=5.0):
+        self.window = window
+        self.max_age_seconds = max_age_seconds
+        self.max_devices = max_devices
+        self.min_samples = min_samples
+        self.min_span_seconds = min_span_seconds
+        self.temp_rise_per_minute = temp_rise_per_minute
+        self.zscore_threshold = zscore_threshold
+        self.devices = OrderedDict()
+        self.loaded = False
+        self.last_saved = time.monotonic()
+
+    def get(self, device_id):
+        """Return the device's state, creating it (and evicting the oldest) if new."""
+        state = self.devices.get(device_id)
+        if state is None:
+            state = DeviceState(self.window, self.max_age_seconds)
+            self.devices[device_id] = state
+            if len(self.devices) > self.max_devices:
+                self.devices.popitem(last=False)
+        else:
+            self.devices.move_to_end(device_id)
+        return state
+
+    def observe(self, device_id, when, temperature, humidity, vibration):
+        """Check the trend rules for a reading, then add it to the device's windows.
+
+        ``when`` is in seconds since the epoch. Returns the labels of the
+        rules that fired, in a fixed order.
+        """
+        state = self.get(device_id)
+        state.last_seen = max(state.last_seen, when)
+        labels = []
+        values = (temperature, humidity, vibration)
+        if self.zscore_threshold:
+            for metric, value in zip(METRICS, values):
+                window = getattr(state, metric)
+                window.expire(when)
+                # Compared with the window before this reading is added,
+                # so an outlier doesn't dilute its own score
+                if window.count >= self.min_samples:
+                    std = max(window.std(), MIN_STD[metric])
+                    if abs(value - window.mean()) / std > self.zscore_threshold:
+                        labels.append(f"Unusual {metric}")
+        for metric, value in zip(METRICS, values):
+            getattr(state, metric).add(when, value)
+        if self.temp_rise_per_minute:
+            window = state.temperature
+            if (window.count >= self.min_samples
+                    and window.span() >= self.min_span_seconds
+                    and window.slope() * 60 > self.temp_rise_per_minute):
+                labels.insert(0, "Rapid temperature rise")
+        return labels
+
+    def to_dict(self):
+        devices = {}
+        for device_id, state in self.devices.items():
+            entry = {"last_seen": state.last_seen}
+            for metric in METRICS:
+                samples = getattr(state, metric).samples()
+                entry[metric] = [[when for when, _ in samples],
+                                 [value for _, value in samples]]
+            devices[device_id] = entry
+        return {"version": SNAPSHOT_VERSION, "devices": devices}
+
+    def load_dict(self, snapshot):
+        """Merge a to_dict() snapshot in; devices already in memory are kept."""
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return 0
+        loaded = 0
+        for device_id, entry in snapshot.get("devices", {}).items():
+            if device_id in self.devices:
+                continue
+            state = self.get(device_id)
+            state.last_seen = entry.get("last_seen", 0.0)
+            for metric in METRICS:
+                times, values = entry.get(metric, ([], []))
+                window = getattr(state, metric)
+                for when, value in zip(times, values):
+                    window.add(when, value)
+            loaded += 1
+        return loaded
+
+    def dumps(self):
+        return json.dumps(self.to_dict(), separators=(",", ":")).encode("utf-8")
+
+    def loads(self, body):
+        return self.load_dict(json.loads(body))
+
+
+def state_from_env():
+    """Build the store configured by DEVICE_STATE_* variables, or None when disabled."""
+    window = int(os.getenv("DEVICE_STATE_WINDOW", "0") or 0)
+    if window <= 0:
+        return None
+    return DeviceStateStore(
+        window=window,
+        max_age_seconds=float(os.getenv("DEVICE_STATE_MAX_AGE_SECONDS", "600")),
+        max_devices=int(os.getenv("DEVICE_STATE_MAX_DEVICES", "10000")),
+        min_samples=int(os.getenv("DEVICE_STATE_MIN_SAMPLES", "8")),
+        min_span_seconds=float(os.getenv("DEVICE_STATE_MIN_SPAN_SECONDS", "60")),
+        temp_rise_per_minute=float(os.getenv("TEMP_RISE_F_PER_MIN", "4")),
+        zscore_threshold=float(os.getenv("ZSCORE_THRESHOLD", "5")),
+    )
+
+
+def load_snapshot(store, s3_client, bucket, key):
+    """Merge the snapshot at s3://bucket/key into the store, if there is one.
+
+    Returns the number of devices loaded. A missing or unreadable snapshot
+    just means the store starts cold.
+    """
+    store.loaded = True
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        return store.loads(response["Body"].read())
+    except Exception:
+        return 0
+
+
+def save_snapshot(s3_client, bucket, key, body):
+    """Write a snapshot taken with DeviceStateStore.dumps() to S3."""
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
+        ContentType="application/json"
+    )
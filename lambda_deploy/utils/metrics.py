@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from utils.aws_clients import get_client
+
+logger = logging.getLogger()
+
+# PutMetricData accepts up to 1000 datums per call and 150 distinct
+# values per datum. Embedded Metric Format allows 100 metrics per document
+# and 100 values per metric.
+MAX_DATUMS_PER_CALL = 1000
+MAX_VALUES_PER_DATUM = 150
+EMF_MAX_METRICS = 100
+EMF_MAX_VALUES = 100
+
+
+class MetricsBuffer:
+    """In-process buffer of CloudWatch data points.
+
+    Data points are aggregated by (metric, unit, dimensions) and sent on
+    flush(). In "api" mode each metric becomes one Values/Counts datum (or a
+    StatisticValues datum when there are too many distinct values) and the
+    datums go out in as few PutMetricData calls as possible. In "emf" mode
+    the metrics are written to stdout in Embedded Metric Format and
+    CloudWatch extracts them from the log, so no API calls are made.
+    """
+
+    def __init__(self, namespace="ServerRoomMonitor", mode=None):
+        self.namespace = namespace
+        self.mode = mode or os.getenv("METRICS_MODE", "api")
+        self._points = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, value, dimensions=None, unit="Count"):
+        """Record one data point.
+
+        Dimension values are sent as strings. PutMetricData rejects any
+        other type, which would lose every datum in the same call.
+        """
+        dims = tuple(sorted((name, str(value)) for name, value in (dimensions or {}).items()))
+        key = (name, unit, dims)
+        with self._lock:
+            counts = self._points.setdefault(key, {})
+            counts[value] = counts.get(value, 0) + 1
+
+    def __len__(self):
+        with self._lock:
+            return sum(sum(c.values()) for c in self._points.values())
+
+    def flush(self):
+        """Send all buffered data points and clear the buffer.
+
+        Returns the number of PutMetricData calls made.
+        """
+        with self._lock:
+            points, self._points = self._points, {}
+        if not points:
+            return 0
+        if self.mode == "emf":
+            self._write_emf(points)
+            return 0
+        return self._put_metric_data(points)
+
+    def _put_metric_data(self, points):
+        datums = []
+        for (name, unit, dims), counts in points.items():
+            datum = {
+                "MetricName": name,
+                "Unit": unit,
+                "Dimensions": [{"Name": k, "Value": v} for k, v in dims],
+            }
+            if len(counts) <= MAX_VALUES_PER_DATUM:
+                datum["Values"] = list(counts.keys())
+                datum["Counts"] = list(counts.values())
+            else:
+                datum["StatisticValues"] = {
+                    "SampleCount": sum(counts.values()),
+                    "Sum": sum(v * c for v, c in counts.items()),
+                    "Minimum": min(counts),
+                    "Maximum": max(counts),
+                }
+            datums.append(datum)
+
+        calls = 0
+        for start in range(0, len(datums), MAX_DATUMS_PER_CALL):
+            chunk = datums[start:start + MAX_DATUMS_PER_CALL]
+            try:
+                get_client("cloudwatch").put_metric_data(
+                    Namespace=self.namespace,
+                    MetricData=chunk
+                )
+                calls += 1
+            except Exception as e:
+                logger.warning(f"Failed to emit CloudWatch metrics ({len(chunk)} datums): {e}")
+        if calls:
+            logger.info(f"Custom CloudWatch metrics flushed: {len(datums)} datums in {calls} call(s)")
+        return calls
+
+    def _write_emf(self, points):
+        # EMF puts dimension values at the top level, so group metrics
+        # that share a dimension set into one document.
+        by_dims = {}
+        for (name, unit, dims), counts in points.items():
+            values = []
+            for value, count in counts.items():
+                values.extend([value] * count)
+            by_dims.setdefault(dims, []).append((name, unit, values))
+
+        timestamp = int(time.time() * 1000)
+        lines = []
+        for dims, metrics in by_dims.items():
+            documents = [{}]
+            definitions = [[]]
+            for name, unit, values in metrics:
+                for start in range(0, len(values), EMF_MAX_VALUES):
+                    chunk = values[start:start + EMF_MAX_VALUES]
+                    if name in documents[-1] or len(definitions[-1]) >= EMF_MAX_METRICS:
+                        documents.append({})
+                        definitions.append([])
+                    documents[-1][name] = chunk if len(chunk) > 1 else chunk[0]
+                    definitions[-1].append({"Name": name, "Unit": unit})
+            for document, definition in zip(documents, definitions):
+                document.update(dict(dims))
+                document["_aws"] = {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [[k for k, _ in dims]],
+                        "Metrics": definition,
+                    }],
+                }
+                lines.append(json.dumps(document))
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
@@ -0,0 +1,266 @@
+import math
+import operator
+
+# Declarative anomaly rules. config.json can define them as
+#
+#   "rules": [
+#     {"label": "High temperature", "metric": "temperature", "comparator": ">", "bound": 85},
+#     {"label": "Low humidity", "metric": "humidity", "comparator": "<", "bound": 20,
+#      "group": "humidity"},
+#     ...
+#   ],
+#   "rule_overrides": {
+#     "lab-": {"High temperature": {"bound": 90}},
+#     "rack-07": {"Excessive vibration": {"enabled": false}}
+#   }
+#
+# Only the first rule that matches in a ``group`` fires, like an elif.
+# Override keys are device ID prefixes; a device gets every matching
+# prefix's overrides, longer prefixes last. An override for a label that
+# isn't a base rule adds a rule for those devices.
+#
+# Each distinct list of enabled rules is compiled once, when the config
+# is loaded, into a generated function with the bounds inlined as
+# constants, so a reading costs the same few comparisons as hand-written
+# checks. Prefixes that end up with the same rules share the function.
+
+METRICS = ("temperature", "humidity", "vibration")
+
+COMPARATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+RULE_FIELDS = ("label", "metric", "comparator", "bound", "group", "enabled")
+
+# Devices whose rule set is remembered; past this the memo starts over
+DEVICE_CACHE_SIZE = 10000
+
+# Rule sets up to this size get a note table covering every combination
+NOTE_TABLE_MAX_RULES = 10
+
+
+def format_note(labels):
+    """Build the payload note from the labels of the rules that fired."""
+    if not labels:
+        return "Normal"
+    return f"{len(labels)} Anomalies Detected: {', '.join(labels)}"
+
+
+def rule_key(label):
+    """Result key for a rule's mask in classify_batch(), e.g. "high_temperature"."""
+    return label.lower().replace(" ", "_")
+
+
+def validate_rule(rule):
+    """Return a clean copy of a rule dict, or raise ValueError."""
+    unknown = set(rule) - set(RULE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown rule fields {sorted(unknown)} in {rule}")
+    label = rule.get("label")
+    if not isinstance(label, str) or not label or ", " in label:
+        raise ValueError(f"Rule needs a label without ', ': {rule}")
+    if rule.get("metric") not in METRICS:
+        raise ValueError(f"Rule {label!r} has unknown metric {rule.get('metric')!r}")
+    if rule.get("comparator") not in COMPARATORS:
+        raise ValueError(f"Rule {label!r} has unknown comparator {rule.get('comparator')!r}")
+    bound = rule.get("bound")
+    if isinstance(bound, bool) or not isinstance(bound, (int, float)) or not math.isfinite(bound):
+        raise ValueError(f"Rule {label!r} needs a finite numeric bound")
+    group = rule.get("group")
+    if group is not None and not isinstance(group, str):
+        raise ValueError(f"Rule {label!r} has a non-string group")
+    return {
+        "label": label,
+        "metric": rule["metric"],
+        "comparator": rule["comparator"],
+        "bound": float(bound),
+        "group": group,
+        "enabled": bool(rule.get("enabled", True)),
+    }
+
+
+class RuleSet:
+    """A list of rules compiled into one function.
+
+    evaluate(temperature, humidity, vibration) returns a bit code with bit
+    ``i`` set when rule ``i`` fired, and classify() turns that into
+    (num_anomalies, note) through a table filled on first use.
+    """
+
+    __slots__ = ("rules", "labels", "shape", "bounds", "evaluate", "_outcomes", "_note_table")
+
+    def __init__(self, rules):
+        self.rules = [rule for rule in (validate_rule(r) for r in rules) if rule["enabled"]]
+        labels = [rule["label"] for rule in self.rules]
+        if len(set(labels)) != len(labels):
+            raise ValueError(f"Duplicate rule labels in {labels}")
+        self.labels = tuple(labels)
+        # Rule sets with the same shape differ only in their bounds, so a
+        # batch can evaluate them together with a bound per reading
+        self.shape = tuple((rule["label"], rule["metric"], rule["comparator"], rule["group"])
+                           for rule in self.rules)
+        self.bounds = tuple(rule["bound"] for rule in self.rules)
+        self.evaluate = self._compile()
+        self._outcomes = {}
+        self._note_table = None
+
+    def _compile(self):
+        # Bounds are validated finite floats, metrics and comparators come
+        # from fixed sets, so the generated source only holds those
+        lines = ["def evaluate(temperature, humidity, vibration):", "    code = 0"]
+        groups = {}
+        for bit, rule in enumerate(self.rules):
+            test = f"{rule['metric']} {rule['comparator']} {rule['bound']!r}"
+            earlier = groups.get(rule["group"], 0) if rule["group"] is not None else 0
+            if earlier:
+                test = f"not code & {earlier} and {test}"
+            lines.append(f"    if {test}:")
+            lines.append(f"        code |= {1 << bit}")
+            if rule["group"] is not None:
+                groups[rule["group"]] = earlier | (1 << bit)
+        lines.append("    return code")
+        namespace = {}
+        exec(compile("\n".join(lines), "<rules>", "exec"), namespace)
+        return namespace["evaluate"]
+
+    def outcome(self, code):
+        """Return (num_anomalies, note) for a bit code."""
+        result = self._outcomes.get(code)
+        if result is None:
+            labels = [label for bit, label in enumerate(self.labels) if code >> bit & 1]
+            result = self._outcomes[code] = (len(labels), format_note(labels))
+        return result
+
+    def outcome_table(self):
+        """(num_anomalies, note) lists indexed by every possible code.
+
+        Only built for up to NOTE_TABLE_MAX_RULES rules; returns None above
+        that, where the table would be too large.
+        """
+        if self._note_table is None and len(self.rules) <= NOTE_TABLE_MAX_RULES:
+            outcomes = [self.outcome(code) for code in range(1 << len(self.rules))]
+            self._note_table = ([num for num, _ in outcomes], [note for _, note in outcomes])
+        return self._note_table
+
+    def classify(self, temperature, humidity, vibration):
+        return self.outcome(self.evaluate(temperature, humidity, vibration))
+
+    def masks(self, np, columns, bounds=None):
+        """Evaluate every rule over NumPy arrays. Returns (code array, {label: mask}).
+
+        ``bounds``, if given, is a (readings x rules) array used instead of
+        this set's own bounds, for rule sets of the same shape.
+        """
+        code = np.zeros(len(columns["temperature"]), dtype=np.int64)
+        masks = {}
+        fired = {}
+        for bit, rule in enumerate(self.rules):
+            bound = rule["bound"] if bounds is None else bounds[:, bit]
+            mask = COMPARATORS[rule["comparator"]](columns[rule["metric"]], bound)
+            group = rule["group"]
+            if group is not None:
+                if group in fired:
+                    mask &= ~fired[group]
+                    fired[group] |= mask
+                else:
+                    fired[group] = mask.copy()
+            masks[rule["label"]] = mask
+            code |= mask.astype(np.int64) << bit
+        return code, masks
+
+
+class RuleIndex:
+    """Base rules plus per-prefix overrides, with a rule set per distinct prefix.
+
+    Prefixes whose overrides come out as the same enabled rules share one
+    compiled RuleSet. for_device() looks a device up by trying each
+    override prefix length, longest first, as a dict key, and remembers
+    the answer per device.
+    """
+
+    def __init__(self, rules, overrides=None):
+        base = [validate_rule(rule) for rule in rules]
+        self._compiled = {}
+        self.default = self._rule_set(base)
+        overrides = overrides or {}
+        self._by_prefix = {}
+        for prefix in overrides:
+            # Every override whose prefix this one starts with, shortest first
+            applied = sorted((p for p in overrides if prefix.startswith(p)), key=len)
+            self._by_prefix[prefix] = self._rule_set(
+                _apply_overrides(base, [overrides[p] for p in applied], prefix))
+        self._lengths = sorted({len(prefix) for prefix in self._by_prefix}, reverse=True)
+        self._by_device = {}
+
+    def for_device(self, device_id):
+        if not isinstance(device_id, str):
+            return self.default
+        rule_set = self._by_device.get(device_id)
+        if rule_set is None:
+            rule_set = self.default
+            for length in self._lengths:
+                match = self._by_prefix.get(device_id[:length])
+                if match is not None:
+                    rule_set = match
+                    break
+            if len(self._by_device) >= DEVICE_CACHE_SIZE:
+                self._by_device.clear()
+            self._by_device[device_id] = rule_set
+        return rule_set
+
+    def _rule_set(self, rules):
+        rules = [validate_rule(rule) for rule in rules]
+        key = tuple(tuple(rule.values()) for rule in rules if rule["enabled"])
+        rule_set = self._compiled.get(key)
+        if rule_set is None:
+            rule_set = self._compiled[key] = RuleSet(rules)
+        return rule_set
+
+
+def _apply_overrides(base, override_maps, prefix):
+    rules = [dict(rule) for rule in base]
+    by_label = {rule["label"]: rule for rule in rules}
+    for override_map in override_maps:
+        if not isinstance(override_map, dict):
+            raise ValueError(f"Overrides for {prefix!r} must map labels to settings")
+        for label, changes in override_map.items():
+            if not isinstance(changes, dict):
+                raise ValueError(f"Override {label!r} for {prefix!r} must be an object")
+            rule = by_label.get(label)
+            if rule is None:
+                rule = by_label[label] = {"label": label}
+                rules.append(rule)
+            rule.update(changes)
+    return rules
+
+
+DEFAULT_RULES = (
+    {"label": "High temperature", "metric": "temperature", "comparator": ">", "bound": 85},
+    {"label": "Low humidity", "metric": "humidity", "comparator": "<", "bound": 20,
+     "group": "humidity"},
+    {"label": "High humidity", "metric": "humidity", "comparator": ">", "bound": 60,
+     "group": "humidity"},
+    {"label": "Excessive vibration", "metric": "vibration", "comparator": ">", "bound": 0.5},
+)
+
+DEFAULT_INDEX = RuleIndex(DEFAULT_RULES)
+
+_compiled = {"config": None, "index": DEFAULT_INDEX}
+
+
+def rules_from_config(config):
+    """Return the RuleIndex for a loaded config, compiling it once per config object.
+
+    load_config() hands out the same dict until it reloads the file, so
+    warm invocations reuse the compiled rules. Without "rules" or
+    "rule_overrides" the built-in defaults apply.
+    """
+    if config is _compiled["config"]:
+        return _compiled["index"]
+    rules = config.get("rules")
+    overrides = config.get("rule_overrides")
+    if rules is None and not overrides:
+        index = DEFAULT_INDEX
+    else:
+        index = RuleIndex(DEFAULT_RULES if rules is None else rules, overrides)
+    _compiled["config"] = config
+    _compiled["index"] = index
+    return index
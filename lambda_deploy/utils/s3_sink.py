@@ -0,0 +1,122 @@
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+
+# Chunked S3 sink. Instead of one tiny object per reading, payloads are
+# buffered per (prefix, device, hour) partition and written as one
+# newline-delimited JSON object per chunk:
+#
+#   {prefix}{device_id}/{YYYY-MM-DDTHH}/{first_timestamp}_{suffix}.ndjson[.gz]
+#
+# The first-timestamp file name keeps chunks in time order within a
+# partition, and the random suffix avoids collisions between containers.
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+
+class BufferedS3Sink:
+    """Buffers payloads per partition and hands them out as NDJSON chunks.
+
+    A partition is ready once it holds ``max_bytes`` of data or its oldest
+    record is ``max_age_seconds`` old. With ``max_age_seconds=0`` every
+    drain() empties the buffer, which is the safe choice in Lambda where a
+    frozen container may never run again.
+    """
+
+    def __init__(self, compress=False, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age_seconds=0):
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    def add(self, prefix, payload, timestamp, device_id, tag=None):
+        """Buffer one payload. ``tag`` identifies the record in drained chunks."""
+        line = json.dumps(payload).encode("utf-8") + b"\n"
+        key = (prefix, device_id, timestamp[:13])
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = {
+                    "lines": [],
+                    "size": 0,
+                    "tags": [],
+                    "first_timestamp": timestamp,
+                    "opened_at": time.monotonic(),
+                }
+                self._partitions[key] = partition
+            partition["lines"].append(line)
+            partition["size"] += len(line)
+            if tag is not None:
+                partition["tags"].append(tag)
+
+    def pending(self):
+        """Return the number of buffered records."""
+        with self._lock:
+            return sum(len(p["lines"]) for p in self._partitions.values())
+
+    def drain(self, force=False):
+        """Remove ready partitions from the buffer and return them as chunks.
+
+        Each chunk is a dict with ``key``, ``body``, ``records`` and the
+        ``tags`` of the records it contains.
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for key, partition in list(self._partitions.items()):
+                if (force or not self.max_age_seconds
+                        or partition["size"] >= self.max_bytes
+                        or now - partition["opened_at"] >= self.max_age_seconds):
+                    ready.append((key, self._partitions.pop(key)))
+        return [self._build_chunk(key, partition) for key, partition in ready]
+
+    def _build_chunk(self, key, partition):
+        prefix, device_id, hour = key
+        body = b"".join(partition["lines"])
+        extension = "ndjson"
+        if self.compress:
+            body = gzip.compress(body)
+            extension = "ndjson.gz"
+        name = f"{partition['first_timestamp']}_{uuid.uuid4().hex[:8]}.{extension}"
+        return {
+            "key": f"{prefix}{device_id}/{hour}/{name}",
+            "body": body,
+            "records": len(partition["lines"]),
+            "tags": partition["tags"],
+        }
+
+
+def put_chunk(s3_client, bucket, chunk):
+    """Write one drained chunk to S3."""
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=chunk["key"],
+        Body=chunk["body"],
+        ContentType=chunk.get("content_type", "application/x-ndjson")
+    )
+
+
+def sink_from_env():
+    """Build the sink configured by S3_SINK_* variables, or None for per-object writes."""
+    mode = os.getenv("S3_SINK_MODE", "object")
+    if mode not in ("ndjson", "parquet"):
+        return None
+    max_age_seconds = float(os.getenv("S3_SINK_MAX_AGE_SECONDS", "0"))
+    ndjson_sink = BufferedS3Sink(
+        compress=os.getenv("S3_SINK_GZIP", "1") in ("1", "true", "True"),
+        max_bytes=int(os.getenv("S3_SINK_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+        max_age_seconds=max_age_seconds,
+    )
+    if mode == "ndjson":
+        return ndjson_sink
+    # Imported here so pyarrow is only loaded when the parquet sink is used
+    from utils.columnar_sink import ParquetS3Sink
+    return ParquetS3Sink(
+        compression=os.getenv("S3_SINK_PARQUET_COMPRESSION", "snappy"),
+        max_age_seconds=max_age_seconds,
+        fallback=ndjson_sink,
+    )
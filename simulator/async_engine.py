@@ -0,0 +1,173 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import json
+import math
+import random
+import time
+from simulator.clock import make_clock
+from simulator.instrumentation import PublishMonitor
+from simulator.simulate_sensors import generate_payload, publishing_client, rack_rng
+
+
+class TimerWheel:
+    """Hashed timer wheel shared by every rack coroutine.
+
+    Racks sleep by parking a future in one of ``slots`` buckets instead of
+    each owning an event-loop timer. A single driver task advances the wheel
+    every ``tick`` seconds and wakes the racks that are due, so scheduling
+    cost stays flat whether there are ten racks or ten thousand.
+    """
+
+    def __init__(self, tick=0.05, slots=512):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.position = 0
+        self._stopped = False
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def sleep(self, delay):
+        """Return a future that resolves after roughly ``delay`` seconds."""
+        future = asyncio.get_running_loop().create_future()
+        if self._stopped:
+            future.set_result(None)
+            return future
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self.position + ticks) % len(self.slots)
+        rounds = (ticks - 1) // len(self.slots)
+        self.slots[slot].append([rounds, future])
+        return future
+
+    def _advance(self):
+        self.position = (self.position + 1) % len(self.slots)
+        bucket = self.slots[self.position]
+        waiting = []
+        for entry in bucket:
+            if entry[0] == 0:
+                if not entry[1].done():
+                    entry[1].set_result(None)
+            else:
+                entry[0] -= 1
+                waiting.append(entry)
+        self.slots[self.position] = waiting
+
+    async def run(self, stop_event):
+        """Drive the wheel until ``stop_event`` (a threading.Event) is set.
+
+        Ticks are scheduled against absolute loop time, so a slow tick is
+        caught up on the next one instead of drifting.
+        """
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        while not stop_event.is_set() and not self._stopped:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            while loop.time() >= next_tick:
+                self._advance()
+                next_tick += self.tick
+        self.stop()
+
+    def stop(self):
+        """Wake every sleeping rack and refuse new sleeps."""
+        self._stopped = True
+        for bucket in self.slots:
+            for _, future in bucket:
+                if not future.done():
+                    future.set_result(None)
+            bucket.clear()
+
+
+async def simulate_rack_async(device_id, publisher, wheel, min_interval,
+                              max_interval, stop_event, anomaly_rate=0.05,
+                              num_messages=None, rng=random, clock=None, qos=0,
+                              monitor=None):
+    """Coroutine version of simulate_rack that sleeps on the shared wheel.
+
+    With a simulated clock the rack only yields to the loop between
+    messages and its clock advances by the drawn interval instead.
+    """
+    topic = f"sensors/server-room/{device_id}"
+    message_count = 0
+    clock = clock or make_clock("wall")
+    if clock.realtime:
+        # Stagger start-up so thousands of racks don't all publish in the first tick
+        await wheel.sleep(random.uniform(0, max_interval))
+    while not stop_event.is_set():
+        if num_messages is not None and message_count >= num_messages:
+            break
+        payload = generate_payload(device_id=device_id, anomaly_rate=anomaly_rate,
+                                   rng=rng, now=clock.now())
+        payload_json = json.dumps(payload)
+        started = time.perf_counter()
+        result = await publish_when_ready(publisher, wheel, topic, payload_json, qos)
+        if result is None:
+            # Shut down while waiting for room on the connection
+            break
+        monitor.sent(device_id, topic, payload_json, result, started,
+                     publishing_client(publisher, topic))
+        message_count += 1
+        interval = rng.randint(min_interval, max_interval)
+        if clock.realtime:
+            await wheel.sleep(interval)
+        else:
+            clock.sleep(interval)
+            await asyncio.sleep(0)
+    return message_count
+
+
+async def publish_when_ready(publisher, wheel, topic, payload, qos=0):
+    """Publish without blocking the event loop.
+
+    Pooled publishers refuse messages while a connection is at its in-flight
+    limit; the rack then waits a tick and tries again instead of stalling
+    every other rack on the loop. Returns None if the wheel stops first.
+    """
+    if not hasattr(publisher, "try_publish"):
+        return publisher.publish(topic, payload, qos=qos)
+    while True:
+        result = publisher.try_publish(topic, payload, qos=qos)
+        if result is not None or wheel.stopped:
+            return result
+        await wheel.sleep(0)
+
+
+async def run_racks(device_ids, publisher, min_interval, max_interval,
+                    stop_event, anomaly_rate=0.05, num_messages=None, tick=0.05,
+                    seed=None, clock="wall", start_time=None, qos=0, monitor=None):
+    """Simulate all racks as coroutines on one event loop.
+
+    Each rack gets its own RNG stream (see rack_rng) and clock.
+    Returns a dict of messages sent per device.
+    """
+    wheel = TimerWheel(tick=tick)
+    monitor = monitor or PublishMonitor()
+    driver = asyncio.create_task(wheel.run(stop_event))
+    try:
+        counts = await asyncio.gather(*(
+            simulate_rack_async(device_id, publisher, wheel, min_interval,
+                                max_interval, stop_event, anomaly_rate,
+                                num_messages, rack_rng(seed, device_id),
+                                make_clock(clock, start_time), qos, monitor)
+            for device_id in device_ids
+        ))
+    finally:
+        wheel.stop()
+        await driver
+    return dict(zip(device_ids, counts))
+
+
+def run_async_simulation(device_ids, publisher, min_interval, max_interval,
+                         stop_event, anomaly_rate=0.05, num_messages=None,
+                         tick=0.05, seed=None, clock="wall", start_time=None,
+                         qos=0, monitor=None):
+    """Blocking entry point used by simulate_sensors.main()."""
+    counts = asyncio.run(run_racks(
+        device_ids, publisher, min_interval, max_interval, stop_event,
+        anomaly_rate, num_messages, tick, seed, clock, start_time, qos, monitor
+    ))
+    total = sum(counts.values())
+    print(f"[Main] {len(counts)} racks sent {total} messages.")
+    return counts
@@ -0,0 +1,222 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from simulator.clock import parse_start_time
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is not in requirements.txt; only this tool and the optional
+    # vectorized Lambda path need it
+    raise ImportError("simulator/bulk_generate.py requires NumPy; install it with "
+                      "`pip install numpy`") from None
+
+# Vectorized counterpart of simulate_sensors.generate_payload for backfills
+# and load tests. Every column is drawn for a whole batch at once from the
+# same distributions as the per-message generator.
+
+
+def triangular(u, low, high, mode):
+    """Vectorized random.triangular(low, high, mode) applied to uniforms ``u``.
+
+    Uses the same formula as the standard library, including its argument
+    order and its behaviour when ``mode`` lies outside [low, high], so the
+    batch generator matches generate_payload's distributions exactly.
+    """
+    c = (mode - low) / (high - low)
+    upper = u > c
+    return np.where(
+        upper,
+        high + (low - high) * np.sqrt(np.where(upper, (1.0 - u) * (1.0 - c), 0.0)),
+        low + (high - low) * np.sqrt(np.where(upper, 0.0, u * c)),
+    )
+
+
+def generate_payloads(n, device_ids=("rack-01",), anomaly_rate=0.05, rng=None,
+                      start_time=None, interval=0.0):
+    """Generate ``n`` payloads as a dict of columns.
+
+    Devices are assigned round-robin. Each round of devices shares a
+    timestamp, starting at ``start_time`` (a datetime, default now) and
+    advancing by ``interval`` seconds per round. The ``anomaly`` column
+    marks the rows that had an anomaly injected.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    device_ids = list(device_ids)
+
+    # Use triangular skewing for realism
+    temperature = triangular(rng.random(n), 65.0, 72.0, 95.0)
+    humidity = triangular(rng.random(n), 25.0, 45.0, 70.0)
+    vibration = triangular(rng.random(n), 0.0, 0.15, 1.0)
+
+    inject = rng.random(n) < anomaly_rate
+    anomaly_type = rng.integers(0, 3, n)
+    temperature = np.where(inject & (anomaly_type == 0),
+                           rng.uniform(90.0, 100.0, n), temperature)
+    humidity = np.where(
+        inject & (anomaly_type == 1),
+        np.where(rng.random(n) < 0.5, rng.uniform(10.0, 18.0, n), rng.uniform(65.0, 75.0, n)),
+        humidity,
+    )
+    vibration = np.where(inject & (anomaly_type == 2),
+                         rng.uniform(0.6, 1.0, n), vibration)
+
+    if start_time is None:
+        start_time = datetime.now(timezone.utc)
+    start = np.datetime64(start_time.astimezone(timezone.utc).replace(tzinfo=None), "us")
+    # Every device in a round shares a timestamp, so only format one per round
+    index = np.arange(n)
+    rounds = index // len(device_ids)
+    num_rounds = int(rounds[-1]) + 1 if n else 0
+    offsets = (np.arange(num_rounds) * interval * 1e6).astype("timedelta64[us]")
+    round_timestamps = np.char.add(np.datetime_as_string(start + offsets, unit="us"), "Z")
+
+    return {
+        "device_id": np.asarray(device_ids, dtype=object)[index % len(device_ids)],
+        "timestamp": round_timestamps[rounds],
+        "temperature": np.round(temperature, 2),
+        "humidity": np.round(humidity, 2),
+        "vibration": np.round(vibration, 2),
+        "anomaly": inject,
+    }
+
+
+def to_payloads(columns):
+    """Convert generated columns into payload dicts like generate_payload returns."""
+    return [
+        {"device_id": d, "timestamp": ts, "temperature": t, "humidity": h, "vibration": v}
+        for d, ts, t, h, v in zip(
+            columns["device_id"].tolist(), columns["timestamp"].tolist(),
+            columns["temperature"].tolist(), columns["humidity"].tolist(),
+            columns["vibration"].tolist(),
+        )
+    ]
+
+
+def _byte_matrix(table, indices=None):
+    # Rows of a bytes table as a (rows, width) uint8 matrix; shorter
+    # entries are padded with NUL bytes.
+    fixed = np.asarray(table, dtype=bytes)
+    if indices is not None:
+        fixed = fixed[indices]
+    return fixed.view(np.uint8).reshape(len(fixed), fixed.dtype.itemsize)
+
+
+def _constant(text, n):
+    return np.broadcast_to(np.frombuffer(text.encode("ascii"), dtype=np.uint8), (n, len(text)))
+
+
+def _value_table(values, suffix):
+    # One entry per distinct 2-decimal value between the column's min and
+    # max. cents / 100 is the same float as round(value, 2), so its repr is
+    # exactly what json.dumps() writes.
+    cents = np.rint(values * 100).astype(np.int64)
+    low, high = int(cents.min()), int(cents.max())
+    table = [f"{c / 100!r}{suffix}".encode("ascii") for c in range(low, high + 1)]
+    return table, cents - low
+
+
+def to_json_lines(columns):
+    """Serialize generated columns straight to newline-delimited JSON bytes.
+
+    Each line is byte-for-byte what json.dumps() produces for the matching
+    payload dict. Lines are assembled as a byte matrix from fixed-width
+    fields and small lookup tables, then the NUL padding is masked out.
+    """
+    n = len(columns["temperature"])
+    if n == 0:
+        return b""
+    device_ids = columns["device_id"].tolist()
+    quoted = {d: json.dumps(d).encode("utf-8") for d in set(device_ids)}
+    temperature, temperature_index = _value_table(columns["temperature"], ', "humidity": ')
+    humidity, humidity_index = _value_table(columns["humidity"], ', "vibration": ')
+    vibration, vibration_index = _value_table(columns["vibration"], "}\n")
+    matrix = np.hstack([
+        _constant('{"device_id": ', n),
+        _byte_matrix([quoted[d] for d in device_ids]),
+        _constant(', "timestamp": "', n),
+        _byte_matrix(np.asarray(columns["timestamp"]).astype(bytes)),
+        _constant('", "temperature": ', n),
+        _byte_matrix(temperature, temperature_index),
+        _byte_matrix(humidity, humidity_index),
+        _byte_matrix(vibration, vibration_index),
+    ])
+    return matrix[matrix != 0].tobytes()
+
+
+def iter_json_batches(total, batch_size=100000, **kwargs):
+    """Yield NDJSON byte batches until ``total`` payloads have been generated.
+
+    Timestamps continue from one batch to the next.
+    """
+    device_ids = list(kwargs.pop("device_ids", ("rack-01",)))
+    interval = kwargs.pop("interval", 0.0)
+    start_time = kwargs.pop("start_time", None) or datetime.now(timezone.utc)
+    generated = 0
+    while generated < total:
+        n = min(batch_size, total - generated)
+        rounds_done = generated // len(device_ids)
+        # Rotate the device list so round-robin assignment carries over
+        offset = generated % len(device_ids)
+        columns = generate_payloads(
+            n, device_ids[offset:] + device_ids[:offset],
+            start_time=datetime.fromtimestamp(
+                start_time.timestamp() + rounds_done * interval, timezone.utc
+            ),
+            interval=interval, **kwargs
+        )
+        yield to_json_lines(columns)
+        generated += n
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Bulk sensor payload generator for backfills and load tests"
+        )
+    parser.add_argument("--count", type=int, required=True,
+                        help="Number of payloads to generate")
+    parser.add_argument("--num-racks", type=int, default=1,
+                        help="Number of racks to spread payloads across")
+    parser.add_argument("--anomaly-rate", type=float, default=0.05,
+                        help="Probability [0–1] that a payload contains an anomaly")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Seconds between consecutive readings of a rack")
+    parser.add_argument("--batch-size", type=int, default=100000,
+                        help="Payloads generated per vectorized batch")
+    parser.add_argument("--output", type=str, default="-",
+                        help="NDJSON output file, or - for stdout")
+    parser.add_argument("--seed", type=int,
+                        help="Seed the generator for a reproducible output file")
+    parser.add_argument("--start-time", type=str,
+                        help="Timestamp of the first round (ISO-8601, default now)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    device_ids = [f"rack-{i+1:02d}" for i in range(args.num_racks)]
+    start_time = parse_start_time(args.start_time) if args.start_time else None
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    start = time.perf_counter()
+    try:
+        for batch in iter_json_batches(args.count, args.batch_size, device_ids=device_ids,
+                                       anomaly_rate=args.anomaly_rate,
+                                       interval=args.interval,
+                                       rng=np.random.default_rng(args.seed),
+                                       start_time=start_time):
+            out.write(batch)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"[Bulk] Generated {args.count} payloads in {elapsed:.2f}s "
+          f"({args.count / elapsed:,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
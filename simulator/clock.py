@@ -0,0 +1,54 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+# Clocks used by the simulator engines. A rack asks its clock for the
+# current time when it builds a payload and calls sleep() between
+# messages, so the same rack code runs in real time or in logical time.
+
+DEFAULT_START_TIME = "2025-01-01T00:00:00Z"
+
+
+def parse_start_time(value):
+    """Parse an ISO-8601 start time; naive values are taken as UTC."""
+    start = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start.astimezone(timezone.utc)
+
+
+class WallClock:
+    """Real time: timestamps come from datetime.now and sleep() blocks."""
+
+    realtime = True
+
+    def now(self):
+        return datetime.now(timezone.utc)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Logical time: sleep() advances the clock instantly instead of waiting.
+
+    Each rack owns one, so its timestamps depend only on its own send
+    intervals and not on scheduling or how many workers are running.
+    """
+
+    realtime = False
+
+    def __init__(self, start=None):
+        self.current = start or parse_start_time(DEFAULT_START_TIME)
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+def make_clock(mode, start_time=None):
+    """Return a new clock for ``mode`` ("wall" or "simulated")."""
+    if mode == "simulated":
+        return SimulatedClock(parse_start_time(start_time or DEFAULT_START_TIME))
+    return WallClock()
@@ -0,0 +1,263 @@
+import math
+import threading
+import time
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in microseconds, in the style of HdrHistogram.
+
+    Values below ``sub_buckets`` are counted exactly. Larger values go into
+    one of ``sub_buckets / 2`` linear buckets per power of two, so the
+    relative error of any percentile stays under 2 / sub_buckets (about 1.6%
+    by default) while memory only grows with the range actually seen.
+    """
+
+    def __init__(self, sub_buckets=128):
+        if sub_buckets & (sub_buckets - 1):
+            raise ValueError("sub_buckets must be a power of two")
+        self.sub_buckets = sub_buckets
+        self._bits = sub_buckets.bit_length() - 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self._bits)
+        return shift * self.sub_buckets + (value >> shift)
+
+    def _highest_equivalent(self, index):
+        shift, mantissa = divmod(index, self.sub_buckets)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value_us):
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Return the value at ``percent`` (0-100), or 0 if empty."""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        """Return a one-line summary in milliseconds."""
+        if not self.count:
+            return "n=0"
+        return (f"n={self.count} p50={self.percentile(50) / 1000:.2f}ms "
+                f"p90={self.percentile(90) / 1000:.2f}ms "
+                f"p99={self.percentile(99) / 1000:.2f}ms "
+                f"max={self.max / 1000:.2f}ms")
+
+
+class RateLimitedLog:
+    """Prints at most ``rate`` lines per second (0 = unlimited) and counts the rest."""
+
+    def __init__(self, rate=10.0):
+        self.rate = rate
+        self.suppressed = 0
+        self._tokens = rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, line):
+        if self.rate:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens < 1:
+                    self.suppressed += 1
+                    return
+                self._tokens -= 1
+        print(line)
+
+
+class RackStats:
+    __slots__ = ("published", "failed", "acked", "ack_latency")
+
+    def __init__(self):
+        self.published = 0
+        self.failed = 0
+        self.acked = 0
+        self.ack_latency = LatencyHistogram()
+
+
+class PublishMonitor:
+    """Per-rack and aggregate publish counters and latency histograms.
+
+    Engines call sent() after every publish with the MQTTMessageInfo they
+    got back, and the MQTT client's on_publish callback is pointed at
+    on_publish(). The time between the two is publish-to-PUBACK with QoS 1,
+    or publish-to-socket-write with QoS 0. Time spent inside publish() is
+    recorded separately, so a slow client call and a slow broker can be
+    told apart.
+    """
+
+    def __init__(self, log_messages=False, log_rate=10.0):
+        self.log_messages = log_messages
+        self.log = RateLimitedLog(log_rate)
+        self.racks = {}
+        self.call_latency = LatencyHistogram()
+        self.ack_latency = LatencyHistogram()
+        self.started = time.monotonic()
+        self._pending = {}
+        self._early_acks = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._reporter = None
+        self._reporter_stop = threading.Event()
+        self._last_report = (self.started, 0)
+
+    def _rack(self, device_id):
+        stats = self.racks.get(device_id)
+        if stats is None:
+            stats = self.racks[device_id] = RackStats()
+        return stats
+
+    def sent(self, device_id, topic, payload, result, started, client=None):
+        """Record one publish() call that began at perf_counter() ``started``.
+
+        ``client`` is the paho client that carried it; without one (or a
+        result without a mid) only the call itself is measured.
+        """
+        now = time.perf_counter()
+        ok = result is not None and result.rc == 0
+        mid = getattr(result, "mid", None)
+        key = (id(client), mid)
+        with self._lock:
+            stats = self._rack(device_id)
+            self.call_latency.record((now - started) * 1e6)
+            if not ok:
+                stats.failed += 1
+                if client is not None and mid is not None:
+                    # paho may still deliver (and ack) a QoS 1 message it
+                    # queued while disconnected; that ack is not a latency
+                    if self._early_acks.pop(key, None) is None:
+                        self._failed.add(key)
+            else:
+                stats.published += 1
+                if client is not None and mid is not None:
+                    # mids wrap around, so this one is live again
+                    self._failed.discard(key)
+                    acked_at = self._early_acks.pop(key, None)
+                    if acked_at is None:
+                        self._pending[key] = (device_id, started)
+                    else:
+                        # The network thread beat us to it
+                        self._record_ack(stats, acked_at - started)
+        if not ok:
+            self.log(f"[{device_id}] Failed to publish message: "
+                     f"{getattr(result, 'rc', 'no result')}")
+        elif self.log_messages:
+            self.log(f"[{device_id}] Published to {topic}: {payload}")
+
+    def on_publish(self, client, userdata, mid, *args):
+        """paho on_publish callback (either callback API version)."""
+        now = time.perf_counter()
+        key = (id(client), mid)
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                if key in self._failed:
+                    self._failed.discard(key)
+                else:
+                    self._early_acks[key] = now
+                return
+            device_id, started = pending
+            self._record_ack(self._rack(device_id), now - started)
+
+    def _record_ack(self, stats, seconds):
+        stats.acked += 1
+        stats.ack_latency.record(seconds * 1e6)
+        self.ack_latency.record(seconds * 1e6)
+
+    def totals(self):
+        """Return aggregate counters."""
+        with self._lock:
+            return {
+                "racks": len(self.racks),
+                "published": sum(s.published for s in self.racks.values()),
+                "failed": sum(s.failed for s in self.racks.values()),
+                "acked": sum(s.acked for s in self.racks.values()),
+                "unacked": len(self._pending),
+            }
+
+    def summary_lines(self, final=False, max_racks=10):
+        """Return the summary as printable lines.
+
+        The final summary adds one line per rack, limited to the
+        ``max_racks`` racks with the slowest p99 acknowledgement.
+        """
+        now = time.monotonic()
+        totals = self.totals()
+        last_time, last_published = self._last_report
+        self._last_report = (now, totals["published"])
+        interval_rate = (totals["published"] - last_published) / max(now - last_time, 1e-9)
+        with self._lock:
+            lines = [
+                f"[Stats] {totals['published']} published, {totals['failed']} failed, "
+                f"{totals['acked']} acked, {totals['unacked']} awaiting ack across "
+                f"{totals['racks']} racks; {interval_rate:.1f} msg/s "
+                f"(overall {totals['published'] / max(now - self.started, 1e-9):.1f} msg/s)",
+                f"[Stats] publish call: {self.call_latency.summary()}",
+                f"[Stats] publish to ack: {self.ack_latency.summary()}",
+            ]
+            if self.log.suppressed:
+                lines.append(f"[Stats] {self.log.suppressed} log lines suppressed by rate limit")
+            if final:
+                racks = sorted(self.racks.items(),
+                               key=lambda item: item[1].ack_latency.percentile(99),
+                               reverse=True)
+                if len(racks) > max_racks:
+                    lines.append(f"[Stats] Slowest {max_racks} of {len(racks)} racks:")
+                for device_id, stats in racks[:max_racks]:
+                    lines.append(f"[Stats] {device_id}: {stats.published} published, "
+                                 f"{stats.failed} failed, ack {stats.ack_latency.summary()}")
+        return lines
+
+    def print_summary(self, final=False):
+        for line in self.summary_lines(final=final):
+            print(line)
+
+    def start_reporter(self, interval):
+        """Print a summary every ``interval`` seconds until stop_reporter()."""
+        if not interval:
+            return
+
+        def report():
+            while not self._reporter_stop.wait(interval):
+                self.print_summary()
+
+        self._reporter = threading.Thread(target=report, daemon=True)
+        self._reporter.start()
+
+    def stop_reporter(self):
+        self._reporter_stop.set()
+        if self._reporter is not None:
+            self._reporter.join()
+            self._reporter = None
@@ -0,0 +1,203 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from simulator.instrumentation import PublishMonitor
+from simulator.simulate_sensors import generate_payload, publishing_client, rack_rng
+
+PROFILES = ("constant", "ramp", "step", "spike")
+
+
+class RateProfile:
+    """Target aggregate messages/sec as a function of elapsed seconds.
+
+    - constant: ``rate`` throughout.
+    - ramp: linear from 0 to ``rate`` over ``ramp_seconds``, then ``rate``.
+    - step: ``steps`` equal increments up to ``rate``, one every ``step_seconds``.
+    - spike: ``rate``, multiplied by ``spike_factor`` for ``spike_seconds``
+      at the start of every ``spike_every`` seconds window.
+    """
+
+    def __init__(self, kind="constant", rate=100.0, ramp_seconds=60.0, steps=4,
+                 step_seconds=15.0, spike_factor=5.0, spike_seconds=5.0, spike_every=30.0):
+        if kind not in PROFILES:
+            raise ValueError(f"Unknown rate profile: {kind}")
+        if step_seconds <= 0 or spike_every <= 0:
+            raise ValueError("step_seconds and spike_every must be positive")
+        self.kind = kind
+        self.rate = float(rate)
+        self.ramp_seconds = ramp_seconds
+        self.steps = max(1, steps)
+        self.step_seconds = step_seconds
+        self.spike_factor = spike_factor
+        self.spike_seconds = spike_seconds
+        self.spike_every = spike_every
+
+    def rate_at(self, elapsed):
+        if self.kind == "ramp":
+            if elapsed >= self.ramp_seconds or self.ramp_seconds <= 0:
+                return self.rate
+            return self.rate * elapsed / self.ramp_seconds
+        if self.kind == "step":
+            step = min(self.steps, int(elapsed // self.step_seconds) + 1)
+            return self.rate * step / self.steps
+        if self.kind == "spike":
+            if elapsed % self.spike_every < self.spike_seconds:
+                return self.rate * self.spike_factor
+            return self.rate
+        return self.rate
+
+    def peak(self):
+        if self.kind == "spike":
+            return self.rate * max(1.0, self.spike_factor)
+        return self.rate
+
+
+class LoadGenerator:
+    """Open-loop publisher that holds a target aggregate rate across racks.
+
+    A token bucket is refilled from the monotonic clock on every pass, so
+    time lost to oversleeping or a slow pass is paid back with a burst on
+    the next one instead of drifting below target. Sends are handed to
+    ``workers`` publisher threads and never waited on: when the publish
+    path falls behind, up to ``max_backlog`` messages queue up and anything
+    beyond that is shed and counted, rather than slowing the schedule.
+    """
+
+    def __init__(self, publisher, device_ids, profile, duration=None, anomaly_rate=0.05,
+                 seed=None, workers=4, burst_seconds=1.0, max_backlog=10000,
+                 report_interval=10.0, qos=0, monitor=None):
+        self.publisher = publisher
+        self.device_ids = list(device_ids)
+        self.rngs = {device_id: rack_rng(seed, device_id) for device_id in self.device_ids}
+        self.profile = profile
+        self.duration = duration
+        self.anomaly_rate = anomaly_rate
+        self.workers = workers
+        self.burst = max(1.0, profile.peak() * burst_seconds)
+        self.max_backlog = max_backlog
+        self.report_interval = report_interval
+        self.qos = qos
+        self.monitor = monitor or PublishMonitor()
+        self._lock = threading.Lock()
+        self._backlog = 0
+        self.stats = {"target": 0.0, "sent": 0, "published": 0, "failed": 0, "shed": 0}
+
+    def _publish(self, device_id, topic, payload):
+        started = time.perf_counter()
+        try:
+            result = self.publisher.publish(topic, payload, qos=self.qos)
+            ok = result is not None and result.rc == 0
+        except Exception as e:
+            self.monitor.log(f"[Load] Publish to {topic} raised: {e}")
+            result = None
+            ok = False
+        self.monitor.sent(device_id, topic, payload, result, started,
+                          publishing_client(self.publisher, topic))
+        with self._lock:
+            self._backlog -= 1
+            self.stats["published" if ok else "failed"] += 1
+
+    def _dispatch(self, executor, index):
+        device_id = self.device_ids[index % len(self.device_ids)]
+        with self._lock:
+            if self._backlog >= self.max_backlog:
+                self.stats["shed"] += 1
+                return
+            self._backlog += 1
+            self.stats["sent"] += 1
+        payload = generate_payload(device_id=device_id, anomaly_rate=self.anomaly_rate,
+                                   rng=self.rngs[device_id])
+        executor.submit(self._publish, device_id, f"sensors/server-room/{device_id}",
+                        json.dumps(payload))
+
+    def run(self, stop_event):
+        """Generate load until ``duration`` elapses or ``stop_event`` is set.
+
+        Returns the final report (see report()).
+        """
+        index = 0
+        tokens = 0.0
+        start = last = time.monotonic()
+        next_report = start + self.report_interval
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not stop_event.is_set():
+                now = time.monotonic()
+                elapsed = now - start
+                if self.duration is not None and elapsed >= self.duration:
+                    break
+                # Trapezoid over the pass so ramps integrate to the right total
+                added = (self.profile.rate_at(last - start)
+                         + self.profile.rate_at(elapsed)) / 2 * (now - last)
+                last = now
+                self.stats["target"] += added
+                tokens = min(self.burst, tokens + added)
+                while tokens >= 1:
+                    self._dispatch(executor, index)
+                    index += 1
+                    tokens -= 1
+                if self.report_interval and now >= next_report:
+                    self._print_report(self.report(elapsed))
+                    next_report += self.report_interval
+                rate = self.profile.rate_at(elapsed)
+                wait = (1 - tokens) / rate if rate > 0 else 0.05
+                time.sleep(min(max(wait, 0.0005), 0.05))
+            scheduled = time.monotonic() - start
+        # Include the time spent draining the backlog, so a slow publish
+        # path shows up as achieved < target
+        final = self.report(time.monotonic() - start, scheduled)
+        self._print_report(final)
+        return final
+
+    def report(self, elapsed, scheduled=None):
+        """Return target versus achieved throughput so far.
+
+        ``scheduled`` is how long the schedule ran, when that differs from
+        ``elapsed`` (the final report also waits for the backlog to drain).
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["backlog"] = self._backlog
+        elapsed = max(elapsed, 1e-9)
+        scheduled = max(scheduled or elapsed, 1e-9)
+        stats["elapsed"] = elapsed
+        stats["target_rate"] = stats["target"] / scheduled
+        stats["achieved_rate"] = stats["published"] / elapsed
+        stats["current_target_rate"] = self.profile.rate_at(scheduled)
+        return stats
+
+    def _print_report(self, stats):
+        print(f"[Load] t={stats['elapsed']:.1f}s target={stats['target_rate']:.1f}/s "
+              f"(now {stats['current_target_rate']:.1f}/s) "
+              f"achieved={stats['achieved_rate']:.1f}/s sent={stats['sent']} "
+              f"failed={stats['failed']} shed={stats['shed']} backlog={stats['backlog']}")
+
+
+def run_load(args, device_ids, publisher, stop_event, monitor=None):
+    """Blocking entry point used by simulate_sensors.main() when --rate is set."""
+    profile = RateProfile(
+        kind=args.profile,
+        rate=args.rate,
+        ramp_seconds=args.ramp_seconds,
+        steps=args.steps,
+        step_seconds=args.step_seconds,
+        spike_factor=args.spike_factor,
+        spike_seconds=args.spike_seconds,
+        spike_every=args.spike_every
+    )
+    generator = LoadGenerator(
+        publisher,
+        device_ids,
+        profile,
+        duration=args.duration,
+        anomaly_rate=args.anomaly_rate,
+        seed=args.seed,
+        workers=args.workers,
+        report_interval=args.report_interval,
+        qos=args.qos,
+        monitor=monitor
+    )
+    return generator.run(stop_event)
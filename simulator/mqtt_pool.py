@@ -0,0 +1,121 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import paho.mqtt.client as mqtt
+
+
+class MQTTConnectionPool:
+    """Multiplexes many device topics over a small number of MQTT connections.
+
+    Each topic is pinned to one connection (by CRC32 of the topic), so
+    messages from a device stay in order. Every connection allows at most
+    ``max_inflight`` messages that have not yet been acknowledged by
+    on_publish (written to the socket for QoS 0, PUBACK for QoS 1). Start-up
+    cost and memory grow with ``size``, not with the number of racks.
+    ``on_publish`` is also called with every acknowledgement, e.g. to
+    measure publish latency.
+    """
+
+    def __init__(self, env_vars, size=4, max_inflight=100, client_factory=None,
+                 on_publish=None):
+        if client_factory is None:
+            from simulator.simulate_sensors import create_mqtt_client
+            client_factory = create_mqtt_client
+        self.size = size
+        self.max_inflight = max_inflight
+        self.on_publish = on_publish
+        # TLS handshakes are the slow part of start-up, so do them in parallel
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            self.clients = list(executor.map(client_factory, [env_vars] * size))
+        self._slots = [threading.Semaphore(max_inflight) for _ in range(size)]
+        self._inflight = [0] * size
+        # mids waiting for on_publish, and acks that arrived before
+        # publish() returned their mid
+        self._pending = [set() for _ in range(size)]
+        self._early_acks = [set() for _ in range(size)]
+        self._lock = threading.Lock()
+        for index, client in enumerate(self.clients):
+            client.max_inflight_messages_set(max_inflight)
+            client.on_publish = self._on_publish_callback(index)
+
+    def _on_publish_callback(self, index):
+        # Accepts both paho callback API versions
+        def on_publish(client, userdata, mid, *args):
+            with self._lock:
+                if mid in self._pending[index]:
+                    self._pending[index].discard(mid)
+                    self._release(index)
+                else:
+                    self._early_acks[index].add(mid)
+            if self.on_publish is not None:
+                self.on_publish(client, userdata, mid, *args)
+        return on_publish
+
+    def _release(self, index):
+        # Caller holds self._lock
+        self._inflight[index] -= 1
+        self._slots[index].release()
+
+    def connection_for(self, topic):
+        """Return the index of the connection that carries ``topic``."""
+        return zlib.crc32(topic.encode("utf-8")) % self.size
+
+    def client_for(self, topic):
+        """Return the paho client that carries ``topic``."""
+        return self.clients[self.connection_for(topic)]
+
+    def publish(self, topic, payload, qos=0, timeout=None):
+        """Publish on the topic's connection, waiting while it is at its in-flight limit.
+
+        Returns the paho MQTTMessageInfo, or None if ``timeout`` expired.
+        """
+        index = self.connection_for(topic)
+        if not self._slots[index].acquire(timeout=timeout):
+            return None
+        return self._publish_on(index, topic, payload, qos)
+
+    def try_publish(self, topic, payload, qos=0):
+        """Publish only if the topic's connection has room; otherwise return None."""
+        index = self.connection_for(topic)
+        if not self._slots[index].acquire(blocking=False):
+            return None
+        return self._publish_on(index, topic, payload, qos)
+
+    def _publish_on(self, index, topic, payload, qos):
+        with self._lock:
+            self._inflight[index] += 1
+        try:
+            result = self.clients[index].publish(topic, payload, qos=qos)
+        except Exception:
+            with self._lock:
+                self._release(index)
+            raise
+        # With QoS 1/2 paho keeps a message it could not send for lack of a
+        # connection and acknowledges it after reconnecting. Anything else
+        # that failed was dropped, so on_publish will never fire for it.
+        queued = (result.rc == mqtt.MQTT_ERR_SUCCESS
+                  or (qos > 0 and result.rc == mqtt.MQTT_ERR_NO_CONN))
+        with self._lock:
+            if not queued:
+                self._release(index)
+            elif result.mid in self._early_acks[index]:
+                # The network thread acknowledged it before publish() returned
+                self._early_acks[index].discard(result.mid)
+                self._release(index)
+            else:
+                self._pending[index].add(result.mid)
+        return result
+
+    def inflight(self):
+        """Return the number of unacknowledged messages per connection."""
+        with self._lock:
+            return list(self._inflight)
+
+    def close(self):
+        """Stop the network loops and disconnect every connection."""
+        for client in self.clients:
+            client.loop_stop()
+            client.disconnect()
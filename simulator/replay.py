@@ -0,0 +1,211 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gzip
+import heapq
+import json
+import re
+import time
+from datetime import datetime, timezone
+from simulator.instrumentation import PublishMonitor
+from simulator.simulate_sensors import publishing_client
+from utils.timestamps import normalize_timestamp, parse_key_timestamp
+
+# Replays recorded readings through any publisher, keeping their original
+# inter-arrival times scaled by a speed factor. Input is read lazily, one
+# record (or one Parquet row group) at a time, so memory stays flat however
+# large the capture is.
+#
+# Accepted input: a .json file (one reading or a list), .ndjson/.jsonl
+# (optionally .gz), .parquet as written by the columnar S3 sink, or a
+# directory of any of these, e.g. an `aws s3 sync` of raw/.
+
+KEY_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}(?:\.\d{1,6})?Z")
+
+# Fields the Lambda adds to stored payloads; sensors never send them
+DERIVED_FIELDS = ("alert", "note")
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")
+REPLAY_SUFFIXES = NDJSON_SUFFIXES + (".json", ".parquet")
+
+_EARLIEST = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def reading_time(value):
+    """Parse a reading's timestamp, in ISO-8601 or S3-key form. None if it can't be."""
+    if not isinstance(value, str):
+        return None
+    try:
+        if KEY_TIMESTAMP.fullmatch(value):
+            return parse_key_timestamp(value)
+        return parse_key_timestamp(normalize_timestamp(value))
+    except (ValueError, OverflowError):
+        return None
+
+
+def to_sensor_reading(record):
+    """Turn a recorded payload back into what the sensor sent.
+
+    Returns (time, reading). Stored raw/ payloads carry S3-key timestamps
+    and the handler's alert/note fields, which are converted back and
+    dropped so they replay as the original messages.
+    """
+    reading = {k: v for k, v in record.items() if k not in DERIVED_FIELDS}
+    when = reading_time(reading.get("timestamp"))
+    if when is not None and KEY_TIMESTAMP.fullmatch(reading["timestamp"]):
+        reading["timestamp"] = when.isoformat().replace("+00:00", "Z")
+    return when, reading
+
+
+def iter_json_file(path):
+    with open(path, "r") as f:
+        try:
+            data = json.load(f)
+        except ValueError:
+            print(f"[Replay] Skipping {path}: not valid JSON")
+            return
+    for record in data if isinstance(data, list) else [data]:
+        if isinstance(record, dict):
+            yield to_sensor_reading(record)
+
+
+def iter_ndjson(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"[Replay] Skipping {path}:{number}: not valid JSON")
+                continue
+            if isinstance(record, dict):
+                yield to_sensor_reading(record)
+
+
+def iter_parquet(path, batch_size=1024):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required to replay Parquet files")
+    # The columnar sink keeps device_id in the Hive partition path
+    match = re.search(r"device_id=([^/\\]+)", path)
+    partition_device = match.group(1) if match else "unknown"
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            timestamp = row.get("timestamp")
+            if isinstance(timestamp, datetime):
+                row["timestamp"] = (timestamp.astimezone(timezone.utc)
+                                    .isoformat().replace("+00:00", "Z"))
+            row.setdefault("device_id", partition_device)
+            yield to_sensor_reading(row)
+
+
+def iter_file(path):
+    """Yield (time, reading) pairs from one recorded file."""
+    if path.endswith(NDJSON_SUFFIXES):
+        return iter_ndjson(path)
+    if path.endswith(".parquet"):
+        return iter_parquet(path)
+    if path.endswith(".json"):
+        return iter_json_file(path)
+    raise ValueError(f"Don't know how to replay {path}")
+
+
+def file_start(name):
+    """Time of the first reading in a stored file, from its name, or None."""
+    match = KEY_TIMESTAMP.match(name)
+    if not match:
+        return None
+    try:
+        return parse_key_timestamp(match.group(0))
+    except ValueError:
+        return None
+
+
+def iter_directory(path):
+    """Yield (time, reading) pairs from every recording under ``path``.
+
+    Every file is merged by timestamp. The handler names stored files
+    after their first reading, so a file is only opened once the replay
+    reaches that time, and closed when it runs out. Open files are then
+    bounded by the files whose readings overlap the current replay time:
+    one per device for NDJSON hour chunks or Parquet date partitions, none
+    for one-reading .json objects, which are read and closed at once.
+    Files without a timestamp in their name are opened straight away.
+    The file names themselves are listed up front, so memory still grows
+    with the number of files, but not with their contents.
+    """
+    pending = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(REPLAY_SUFFIXES):
+                pending.append((file_start(name) or _EARLIEST, os.path.join(root, name)))
+    # Entries are (time, order, path, stream, item). stream is None until
+    # the file is opened; item is the stream's next reading. ``order``
+    # keeps ties in file name order.
+    heap = [(when, order, file_path, None, None)
+            for order, (when, file_path) in enumerate(pending)]
+    del pending
+    heapq.heapify(heap)
+    while heap:
+        _, order, file_path, stream, item = heapq.heappop(heap)
+        if stream is None:
+            stream = iter_file(file_path)
+        else:
+            yield item
+        item = next(stream, None)
+        if item is not None:
+            heapq.heappush(heap, (item[0] or _EARLIEST, order, file_path, stream, item))
+
+
+def iter_recording(path):
+    """Yield (time, reading) pairs from a file or directory, lazily."""
+    if os.path.isdir(path):
+        return iter_directory(path)
+    return iter_file(path)
+
+
+def replay(records, publisher, stop_event, speed=1.0, qos=0, monitor=None):
+    """Publish recorded readings, keeping their spacing divided by ``speed``.
+
+    ``speed`` 0 publishes as fast as possible. Send times are computed from
+    the start of the replay, so a slow publish does not push back every
+    later message. Readings without a usable timestamp, or earlier than the
+    one before, are sent straight away. Returns the number published.
+    """
+    monitor = monitor or PublishMonitor()
+    first = None
+    start = time.monotonic()
+    count = 0
+    for when, reading in records:
+        if stop_event.is_set():
+            break
+        if speed and when is not None:
+            if first is None:
+                first = when
+            delay = start + (when - first).total_seconds() / speed - time.monotonic()
+            if delay > 0 and stop_event.wait(delay):
+                break
+        device_id = str(reading.get("device_id", "unknown"))
+        topic = f"sensors/server-room/{device_id}"
+        payload = json.dumps(reading)
+        started = time.perf_counter()
+        result = publisher.publish(topic, payload, qos=qos)
+        monitor.sent(device_id, topic, payload, result, started,
+                     publishing_client(publisher, topic))
+        count += 1
+    return count
+
+
+def run_replay(args, publisher, stop_event, monitor=None):
+    """Blocking entry point used by simulate_sensors.main() when --replay is set."""
+    start = time.monotonic()
+    count = replay(iter_recording(args.replay), publisher, stop_event,
+                   speed=args.speed, qos=args.qos, monitor=monitor)
+    elapsed = time.monotonic() - start
+    print(f"[Replay] Replayed {count} readings from {args.replay} in {elapsed:.1f}s.")
+    return count
@@ -8,38 +8,60 @@ import time
 from datetime import datetime, timezone
 import json
 import argparse
+import contextlib
 import ssl
 import paho.mqtt.client as mqtt
 from concurrent.futures import ThreadPoolExecutor
 from utils.config_loader import load_env, load_config
+from simulator.clock import DEFAULT_START_TIME, WallClock, make_clock
+from simulator.instrumentation import PublishMonitor
 
 
-def generate_payload(device_id="rack-01", anomaly_rate=0.05):
-    """Generate a random payload for the sensor, optionally injecting anomalies."""
-    inject_anomaly = random.random() < anomaly_rate
+def generate_payload(device_id="rack-01", anomaly_rate=0.05, rng=random, now=None):
+    """Generate a random payload for the sensor, optionally injecting anomalies.
+
+    ``rng`` is anything with the random module's interface (e.g. a rack's
+    random.Random stream) and ``now`` overrides the wall-clock timestamp.
+    """
+    inject_anomaly = rng.random() < anomaly_rate
     # Use triangular skewing for realism
-    temperature = round(random.triangular(65.0, 72.0, 95.0), 2)
-    humidity = round(random.triangular(25.0, 45.0, 70.0), 2)
-    vibration = round(random.triangular(0.0, 0.15, 1.0), 2)
+    temperature = round(rng.triangular(65.0, 72.0, 95.0), 2)
+    humidity = round(rng.triangular(25.0, 45.0, 70.0), 2)
+    vibration = round(rng.triangular(0.0, 0.15, 1.0), 2)
 
     if inject_anomaly:
-        anomaly_type = random.choice(["temp", "humidity", "vibration"])
+        anomaly_type = rng.choice(["temp", "humidity", "vibration"])
         if anomaly_type == "temp":
-            temperature = round(random.uniform(90.0, 100.0), 2)
+            temperature = round(rng.uniform(90.0, 100.0), 2)
         elif anomaly_type == "humidity":
-            humidity = round(random.choice([random.uniform(10.0, 18.0), random.uniform(65.0, 75.0)]), 2)
+            humidity = round(rng.choice([rng.uniform(10.0, 18.0), rng.uniform(65.0, 75.0)]), 2)
         elif anomaly_type == "vibration":
-            vibration = round(random.uniform(0.6, 1.0), 2)
+            vibration = round(rng.uniform(0.6, 1.0), 2)
 
+    if now is None:
+        now = datetime.now(timezone.utc)
     return {
         "device_id": device_id,
-        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "timestamp": now.isoformat().replace("+00:00", "Z"),
         "temperature": temperature,
         "humidity": humidity,
         "vibration": vibration
     }
 
 
+def rack_rng(seed, device_id):
+    """Return the RNG stream for one rack.
+
+    Unseeded racks share the global random module. Seeded racks each get
+    their own random.Random derived from the seed and device ID, so a rack's
+    payloads are the same however many racks or workers run alongside it.
+    """
+    if seed is None:
+        return random
+    # String seeds are hashed with SHA-512, independent of PYTHONHASHSEED
+    return random.Random(f"{seed}/{device_id}")
+
+
 def create_mqtt_client(env_vars):
     """Set up and return an MQTT client connected to AWS IoT."""
     client = mqtt.Client(protocol=mqtt.MQTTv311)
@@ -71,12 +93,71 @@ def parse_args():
                         help="Optional number of messages to send before stopping (per rack)")
     parser.add_argument("--anomaly-rate", type=float, default=0.05,
                         help="Probability [0–1] that a payload contains an anomaly")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                        help="threads: one OS thread and MQTT client per rack; "
+                             "asyncio: all racks as coroutines on one event loop and one client")
+    parser.add_argument("--tick", type=float, default=0.05,
+                        help="Timer wheel resolution in seconds (asyncio engine)")
+    parser.add_argument("--connections", type=int, default=0,
+                        help="Share this many MQTT connections between all racks "
+                             "(default: one per rack for threads, one for asyncio)")
+    parser.add_argument("--max-inflight", type=int, default=100,
+                        help="Unacknowledged messages allowed per pooled connection")
+    parser.add_argument("--seed", type=int,
+                        help="Seed per-rack RNG streams for a reproducible workload")
+    parser.add_argument("--clock", choices=["wall", "simulated"], default="wall",
+                        help="wall: real timestamps and sleeps; simulated: timestamps "
+                             "advance by the send interval without waiting")
+    parser.add_argument("--start-time", type=str, default=DEFAULT_START_TIME,
+                        help="First timestamp of the simulated clock (ISO-8601)")
+    parser.add_argument("--rate", type=float,
+                        help="Open-loop mode: target aggregate messages/sec across all racks")
+    parser.add_argument("--profile", choices=["constant", "ramp", "step", "spike"],
+                        default="constant", help="Shape of the target rate over time (open-loop)")
+    parser.add_argument("--duration", type=float,
+                        help="Seconds to generate load for (open-loop, default until stopped)")
+    parser.add_argument("--ramp-seconds", type=float, default=60.0,
+                        help="Seconds to ramp from 0 to --rate (ramp profile)")
+    parser.add_argument("--steps", type=int, default=4,
+                        help="Number of equal steps up to --rate (step profile)")
+    parser.add_argument("--step-seconds", type=float, default=15.0,
+                        help="Seconds per step (step profile)")
+    parser.add_argument("--spike-factor", type=float, default=5.0,
+                        help="Rate multiplier during a spike (spike profile)")
+    parser.add_argument("--spike-seconds", type=float, default=5.0,
+                        help="Length of each spike (spike profile)")
+    parser.add_argument("--spike-every", type=float, default=30.0,
+                        help="Seconds from the start of one spike to the next (spike profile)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Publisher threads used by the open-loop mode")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+                        help="Seconds between open-loop throughput reports")
+    parser.add_argument("--qos", type=int, choices=[0, 1], default=0,
+                        help="MQTT QoS; with 1, latency is measured up to the PUBACK")
+    parser.add_argument("--stats-interval", type=float, default=10.0,
+                        help="Seconds between publish statistics summaries (0 = only at shutdown)")
+    parser.add_argument("--log-messages", action="store_true",
+                        help="Log every published payload (rate-limited by --log-rate)")
+    parser.add_argument("--log-rate", type=float, default=10.0,
+                        help="Maximum log lines per second (0 = unlimited)")
+    parser.add_argument("--sink", type=str, default="iot",
+                        help="Where payloads go: iot (AWS IoT over TLS), file:PATH[.gz], "
+                             "stdout, mqtt://HOST[:PORT] (no TLS) or handler (in-process Lambda)")
+    parser.add_argument("--handler-batch-size", type=int, default=1,
+                        help="With --sink handler, call batch_handler with this many payloads")
+    parser.add_argument("--replay", type=str,
+                        help="Replay recorded readings from a directory, .json, .ndjson[.gz] "
+                             "or .parquet file instead of generating them")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed factor (e.g. 10 for 10x; 0 = as fast as possible)")
 
     args = parser.parse_args()
 
     # Safeguard: Check if --device-id was explicitly set
     if args.num_racks > 1 and "--device-id" in sys.argv:
         parser.error("Cannot use --device-id when --num-racks > 1. Device IDs are auto-generated in multi-rack mode.")
+    if args.step_seconds <= 0 or args.spike_every <= 0:
+        parser.error("--step-seconds and --spike-every must be greater than 0.")
 
     return args
 
@@ -90,8 +171,16 @@ def setup_signal_handlers(stop_event):
 
 
 def simulate_rack(device_id, env_vars, min_interval,
-                  max_interval, stop_event, anomaly_rate=0.05, num_messages=None):
-    mqtt_client = create_mqtt_client(env_vars)
+                  max_interval, stop_event, anomaly_rate=0.05, num_messages=None,
+                  publisher=None, rng=random, clock=None, qos=0, monitor=None):
+    # A shared publisher (e.g. MQTTConnectionPool) is owned by the caller;
+    # otherwise the rack opens and closes its own connection
+    monitor = monitor or PublishMonitor()
+    mqtt_client = publisher
+    if publisher is None:
+        mqtt_client = create_mqtt_client(env_vars)
+        mqtt_client.on_publish = monitor.on_publish
+    clock = clock or WallClock()
     topic = f"sensors/server-room/{device_id}"
     message_count = 0
     try:
@@ -99,52 +188,146 @@ def simulate_rack(device_id, env_vars, min_interval,
             reached_limit = (num_messages is not None and message_count >= num_messages)
             if reached_limit:
                 break
-            payload = generate_payload(device_id=device_id, anomaly_rate=anomaly_rate)
+            payload = generate_payload(device_id=device_id, anomaly_rate=anomaly_rate,
+                                       rng=rng, now=clock.now())
             payload_json = json.dumps(payload)
-            result = mqtt_client.publish(topic, payload_json)
-            if result.rc != mqtt.MQTT_ERR_SUCCESS:
-                print(f"[{device_id}] Failed to publish message: {result.rc}")
-            print(f"[{device_id}] Published to {topic}: {payload_json}")
+            started = time.perf_counter()
+            result = mqtt_client.publish(topic, payload_json, qos=qos)
+            monitor.sent(device_id, topic, payload_json, result, started,
+                         publishing_client(mqtt_client, topic))
             message_count += 1
-            time.sleep(random.randint(min_interval, max_interval))
+            clock.sleep(rng.randint(min_interval, max_interval))
     finally:
-        mqtt_client.loop_stop()
-        mqtt_client.disconnect()
-        print(f"[{device_id}] Disconnected cleanly after sending {message_count} messages.")
+        if publisher is None:
+            mqtt_client.loop_stop()
+            mqtt_client.disconnect()
+            print(f"[{device_id}] Disconnected cleanly after sending {message_count} messages.")
+        else:
+            monitor.log(f"[{device_id}] Stopped after sending {message_count} messages.")
+
+
+def publishing_client(publisher, topic):
+    """Return the paho client a publisher uses for ``topic``, if it has one."""
+    if hasattr(publisher, "client_for"):
+        return publisher.client_for(topic)
+    if isinstance(publisher, mqtt.Client):
+        return publisher
+    return None
+
+
+def rack_device_ids(args):
+    """Return the device IDs to simulate for the parsed arguments."""
+    if args.num_racks == 1:
+        return [args.device_id]
+    return [f"rack-{i+1:02d}" for i in range(args.num_racks)]
+
+
+def run_simulation(args, env_vars, stop_event, publisher=None, monitor=None):
+    """Run the selected engine until every rack is done or stop_event is set."""
+    if args.replay:
+        from simulator.replay import run_replay
+        run_replay(args, publisher, stop_event, monitor)
+    elif args.rate:
+        from simulator.load_generator import run_load
+        run_load(args, rack_device_ids(args), publisher, stop_event, monitor)
+    elif args.engine == "asyncio":
+        from simulator.async_engine import run_async_simulation
+        run_async_simulation(
+            rack_device_ids(args),
+            publisher,
+            args.min_interval,
+            args.max_interval,
+            stop_event,
+            anomaly_rate=args.anomaly_rate,
+            num_messages=args.num_messages,
+            tick=args.tick,
+            seed=args.seed,
+            clock=args.clock,
+            start_time=args.start_time,
+            qos=args.qos,
+            monitor=monitor
+        )
+    elif args.num_racks == 1:
+        simulate_rack(
+            device_id=args.device_id,
+            env_vars=env_vars,
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+            stop_event=stop_event,
+            anomaly_rate=args.anomaly_rate,
+            num_messages=args.num_messages,
+            publisher=publisher,
+            rng=rack_rng(args.seed, args.device_id),
+            clock=make_clock(args.clock, args.start_time),
+            qos=args.qos,
+            monitor=monitor
+        )
+    else:
+        with ThreadPoolExecutor(max_workers=args.num_racks) as executor:
+            for device_id in rack_device_ids(args):
+                executor.submit(
+                    simulate_rack,
+                    device_id,
+                    env_vars,
+                    args.min_interval,
+                    args.max_interval,
+                    stop_event,
+                    args.anomaly_rate,
+                    args.num_messages,
+                    publisher,
+                    rack_rng(args.seed, device_id),
+                    make_clock(args.clock, args.start_time),
+                    args.qos,
+                    monitor
+                )
 
 
 def main():
     """Main function to simulate sensor data generation."""
     try:
         args = parse_args()
-        env_vars = load_env()
         stop_event = threading.Event()
         setup_signal_handlers(stop_event)
+        monitor = PublishMonitor(log_messages=args.log_messages, log_rate=args.log_rate)
 
-        if args.num_racks == 1:
-            simulate_rack(
-                device_id=args.device_id,
-                env_vars=env_vars,
-                min_interval=args.min_interval,
-                max_interval=args.max_interval,
-                stop_event=stop_event,
-                anomaly_rate=args.anomaly_rate,
-                num_messages=args.num_messages
-            )
+        publisher = None
+        env_vars = {}
+        output = contextlib.nullcontext()
+        if args.sink == "iot" or args.sink.startswith("mqtt://"):
+            client_factory = None
+            connections = args.connections
+            if args.sink == "iot":
+                env_vars = load_env()
+            else:
+                from simulator.sinks import create_local_mqtt_client
+                client_factory = lambda env: create_local_mqtt_client(args.sink)
+                # Racks only open their own connections to AWS IoT
+                connections = connections or 1
+            if (args.engine == "asyncio" or args.rate or args.replay) and not connections:
+                connections = 1
+            if connections:
+                from simulator.mqtt_pool import MQTTConnectionPool
+                publisher = MQTTConnectionPool(env_vars, size=connections,
+                                               max_inflight=args.max_inflight,
+                                               client_factory=client_factory,
+                                               on_publish=monitor.on_publish)
+                print(f"[Main] Opened {connections} shared MQTT connection(s).")
         else:
-            with ThreadPoolExecutor(max_workers=args.num_racks) as executor:
-                for i in range(args.num_racks):
-                    device_id = f"rack-{i+1:02d}"
-                    executor.submit(
-                        simulate_rack,
-                        device_id,
-                        env_vars,
-                        args.min_interval,
-                        args.max_interval,
-                        stop_event,
-                        args.anomaly_rate,
-                        args.num_messages
-                    )
+            from simulator.sinks import open_sink
+            publisher = open_sink(args.sink, args.handler_batch_size)
+            if args.sink == "stdout":
+                # Payloads own stdout; logs and summaries go to stderr
+                output = contextlib.redirect_stdout(sys.stderr)
+
+        with output:
+            monitor.start_reporter(args.stats_interval)
+            try:
+                run_simulation(args, env_vars, stop_event, publisher, monitor)
+            finally:
+                monitor.stop_reporter()
+                if publisher is not None:
+                    publisher.close()
+                monitor.print_summary(final=True)
     except KeyboardInterrupt:
         print("\nSimulation stopped.")
 
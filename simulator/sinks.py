@@ -0,0 +1,169 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gzip
+import importlib
+import itertools
+import json
+import threading
+from collections import namedtuple
+from urllib.parse import urlparse
+import paho.mqtt.client as mqtt
+
+# Offline stand-ins for the AWS IoT connection. Each sink has the publish()
+# interface the engines already use (returning an object with rc and mid),
+# so generation and the Lambda handler can be benchmarked without a network.
+#
+#   file:PATH          NDJSON file, gzip-compressed when PATH ends in .gz
+#   stdout             NDJSON on standard output
+#   mqtt://HOST[:PORT] local broker, plain TCP without TLS
+#   handler            lambda_handler (or batch_handler) called in-process
+
+SinkResult = namedtuple("SinkResult", ["rc", "mid"])
+
+
+class FileSink:
+    """Appends each payload as one NDJSON line to a file or binary stream."""
+
+    def __init__(self, path=None, stream=None, compress=None):
+        if stream is None:
+            if compress is None:
+                compress = path.endswith(".gz")
+            stream = gzip.open(path, "wb") if compress else open(path, "wb")
+            self._owns_stream = True
+        else:
+            self._owns_stream = False
+        self.stream = stream
+        self.written = 0
+        self._mids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, qos=0):
+        line = payload.encode("utf-8") + b"\n"
+        with self._lock:
+            self.stream.write(line)
+            self.written += 1
+            return SinkResult(mqtt.MQTT_ERR_SUCCESS, next(self._mids))
+
+    def close(self):
+        with self._lock:
+            if self._owns_stream:
+                self.stream.close()
+            else:
+                self.stream.flush()
+
+
+class OfflineAWSClient:
+    """Accepts any boto3 client call, counts it and returns an empty response."""
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, operation):
+        if operation.startswith("_"):
+            raise AttributeError(operation)
+
+        def call(**kwargs):
+            with self._lock:
+                self.calls[operation] = self.calls.get(operation, 0) + 1
+            return {}
+        return call
+
+
+class HandlerSink:
+    """Runs the Lambda handler in-process on every published payload.
+
+    With ``batch_size`` above 1, payloads are buffered and handed to
+    batch_handler as a list instead. AWS clients are replaced by
+    OfflineAWSClient stand-ins unless ``offline_aws`` is False, and when
+    ``config`` is given it is used instead of config.json. A result's rc is
+    non-zero only when the handler answered with a server error; in batch
+    mode payloads succeed once buffered and failed records are counted in
+    ``errors``.
+
+    Handler calls run one at a time, like invocations in one Lambda
+    container, because the handler's module-level state (device windows,
+    incidents) is not thread-safe. Publisher threads wait their turn.
+    """
+
+    def __init__(self, batch_size=1, config=None, offline_aws=True,
+                 module="lambda_deploy.lambda_function"):
+        self.handler_module = importlib.import_module(module)
+        self.batch_size = batch_size
+        self.aws_clients = {}
+        if offline_aws:
+            from utils import aws_clients
+            for service_name in ("s3", "sns", "cloudwatch"):
+                client = OfflineAWSClient(service_name)
+                aws_clients.set_client(service_name, client)
+                self.aws_clients[service_name] = client
+        if config is not None:
+            self.handler_module.load_config = lambda: config
+        self.invocations = 0
+        self.errors = 0
+        self._pending = []
+        self._mids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._invoke_lock = threading.Lock()
+
+    def publish(self, topic, payload, qos=0):
+        reading = json.loads(payload)
+        if self.batch_size <= 1:
+            with self._invoke_lock:
+                response = self.handler_module.lambda_handler(reading, None)
+            with self._lock:
+                self.invocations += 1
+                ok = response.get("statusCode", 500) < 500
+                self.errors += 0 if ok else 1
+                return SinkResult(mqtt.MQTT_ERR_SUCCESS if ok else mqtt.MQTT_ERR_UNKNOWN,
+                                  next(self._mids))
+        with self._lock:
+            self._pending.append(reading)
+            batch = None
+            if len(self._pending) >= self.batch_size:
+                batch, self._pending = self._pending, []
+            mid = next(self._mids)
+        if batch is not None:
+            self._invoke_batch(batch)
+        return SinkResult(mqtt.MQTT_ERR_SUCCESS, mid)
+
+    def _invoke_batch(self, batch):
+        with self._invoke_lock:
+            response = self.handler_module.batch_handler(batch, None)
+        with self._lock:
+            self.invocations += 1
+            self.errors += len(response.get("batchItemFailures", []))
+
+    def close(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._invoke_batch(batch)
+
+
+def create_local_mqtt_client(url):
+    """Connect to a local MQTT broker such as mosquitto over plain TCP."""
+    parsed = urlparse(url)
+    client = mqtt.Client(protocol=mqtt.MQTTv311)
+    client.connect(parsed.hostname or "localhost", port=parsed.port or 1883)
+    client.loop_start()
+    return client
+
+
+def open_sink(spec, handler_batch_size=1):
+    """Return the offline publisher for a --sink value other than iot or mqtt://."""
+    if spec == "stdout":
+        return FileSink(stream=sys.stdout.buffer)
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    if spec == "handler":
+        from utils.config_loader import read_config
+        try:
+            config = read_config()
+        except RuntimeError:
+            # No config.json: the handler falls back to its default bucket
+            config = {}
+        return HandlerSink(batch_size=handler_batch_size, config=config)
+    raise ValueError(f"Unknown sink: {spec}")
@@ -0,0 +1,376 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+import json
+import argparse
+import gc
+import importlib
+import logging
+import platform
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from simulator.clock import parse_start_time, DEFAULT_START_TIME
+from simulator.instrumentation import LatencyHistogram
+from simulator.simulate_sensors import generate_payload
+from simulator.sinks import OfflineAWSClient
+from utils import aws_clients
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# End-to-end benchmark for lambda_handler. S3, SNS and CloudWatch are
+# replaced by in-process stand-ins, so it runs offline and measures the
+# handler itself: validation, classification, payload building and the
+# side-effect fan-out. Results are written as JSON so two commits can be
+# compared:
+#
+#   python3 test/bench_handler.py --output before.json
+#   python3 test/bench_handler.py --output after.json --compare before.json
+#
+# --aws-latency-ms adds a fixed delay to every stand-in call, to see how
+# the side-effect pool behaves when AWS is slower than the handler.
+
+WORKLOADS = ("normal", "anomalous", "invalid", "mixed", "mixed_batch")
+
+BENCH_CONFIG = {"s3_bucket": "bench-bucket"}
+BENCH_TOPIC_ARN = "arn:aws:sns:us-east-1:000000000000:bench-alerts"
+REQUIRED_FIELDS = ("device_id", "temperature", "humidity", "vibration", "timestamp")
+
+# Share of each kind of reading in the mixed workloads
+MIX = (("normal", 0.80), ("anomalous", 0.15), ("invalid", 0.05))
+
+# Metrics where a larger number is a regression; readings_per_sec is the
+# only one where smaller is worse
+LOWER_IS_BETTER = ("p50_us", "p90_us", "p99_us", "alloc_peak_bytes_per_reading",
+                   "retained_bytes_per_reading")
+
+
+class SlowAWSClient(OfflineAWSClient):
+    """OfflineAWSClient that sleeps ``delay`` seconds on every call."""
+
+    def __init__(self, service_name, delay):
+        super().__init__(service_name)
+        self.delay = delay
+
+    def __getattr__(self, operation):
+        call = super().__getattr__(operation)
+
+        def slow_call(**kwargs):
+            time.sleep(self.delay)
+            return call(**kwargs)
+        return slow_call
+
+
+def install_stand_ins(handler_module, aws_latency_ms=0.0):
+    """Point the handler at offline AWS clients and a fixed config.
+
+    Returns the clients by service name so their call counts can be read.
+    """
+    clients = {}
+    for service_name in ("s3", "sns", "cloudwatch"):
+        if aws_latency_ms:
+            client = SlowAWSClient(service_name, aws_latency_ms / 1000)
+        else:
+            client = OfflineAWSClient(service_name)
+        aws_clients.set_client(service_name, client)
+        clients[service_name] = client
+    handler_module.load_config = lambda: BENCH_CONFIG
+    os.environ["SNS_TOPIC_ARN"] = BENCH_TOPIC_ARN
+    return clients
+
+
+def make_reading(kind, rng, device_id, now):
+    """Return one reading of the given kind ("normal", "anomalous" or "invalid")."""
+    if kind == "anomalous":
+        return generate_payload(device_id, anomaly_rate=1.0, rng=rng, now=now)
+    reading = generate_payload(device_id, anomaly_rate=0.0, rng=rng, now=now)
+    if kind == "invalid":
+        # Equal parts out of range, missing a field and wrong type
+        flaw = rng.randrange(3)
+        if flaw == 0:
+            reading["temperature"] = round(rng.uniform(250.0, 500.0), 2)
+        elif flaw == 1:
+            del reading[rng.choice(REQUIRED_FIELDS)]
+        else:
+            reading[rng.choice(("temperature", "humidity", "vibration"))] = "n/a"
+    return reading
+
+
+def make_workload(name, count, seed=0, num_racks=10, start_time=DEFAULT_START_TIME):
+    """Return ``count`` readings for a workload, the same for a given seed.
+
+    Racks report in turn every 5 seconds from ``start_time``.
+    """
+    rng = random.Random(f"{seed}/{name}")
+    start = parse_start_time(start_time)
+    kinds = [kind for kind, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    readings = []
+    for index in range(count):
+        device_id = f"rack-{index % num_racks + 1:02d}"
+        now = start + timedelta(seconds=5 * (index // num_racks))
+        if name.startswith("mixed"):
+            kind = rng.choices(kinds, weights)[0]
+        else:
+            kind = name
+        readings.append(make_reading(kind, rng, device_id, now))
+    return readings
+
+
+def invocations(name, readings, batch_size):
+    """Split a workload into handler events: single readings or batches."""
+    if name.endswith("_batch"):
+        return [readings[i:i + batch_size] for i in range(0, len(readings), batch_size)]
+    return readings
+
+
+def event_size(event):
+    return len(event) if isinstance(event, list) else 1
+
+
+def time_invocations(handler, events):
+    """Call the handler on every event; return (latency histogram, seconds, statuses)."""
+    histogram = LatencyHistogram()
+    statuses = {}
+    gc.collect()
+    started = time.perf_counter()
+    for event in events:
+        before = time.perf_counter_ns()
+        response = handler(event, None)
+        histogram.record((time.perf_counter_ns() - before) / 1000)
+        status = str(response.get("statusCode"))
+        statuses[status] = statuses.get(status, 0) + 1
+    return histogram, time.perf_counter() - started, statuses
+
+
+def measure_allocations(handler, events):
+    """Trace allocations while calling the handler on ``events``.
+
+    Returns the mean per-reading peak (the most memory held at once above
+    what was allocated before the call) and the bytes still held after all
+    calls, per reading. Run separately from timing because tracing slows
+    every allocation down.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        peaks = 0
+        readings = 0
+        for event in events:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            handler(event, None)
+            peaks += tracemalloc.get_traced_memory()[1] - before
+            readings += event_size(event)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    readings = max(readings, 1)
+    return {
+        "alloc_peak_bytes_per_reading": round(peaks / readings, 1),
+        "retained_bytes_per_reading": round(retained / readings, 1),
+    }
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def bench_workload(handler_module, name, count, batch_size=100, warmup=200,
+                   alloc_sample=1000, seed=0, runs=3):
+    """Run one workload and return its results, timed from the fastest of ``runs`` passes."""
+    handler = (handler_module.batch_handler if name.endswith("_batch")
+               else handler_module.lambda_handler)
+    # Warm caches and the side-effect pool on readings not timed later
+    for event in invocations(name, make_workload(name, warmup, seed=seed + 1), batch_size):
+        handler(event, None)
+    events = invocations(name, make_workload(name, count, seed=seed), batch_size)
+    histogram, seconds, statuses = min(
+        (time_invocations(handler, events) for _ in range(max(1, runs))),
+        key=lambda timed: timed[1]
+    )
+    sample = invocations(name, make_workload(name, alloc_sample, seed=seed + 2), batch_size)
+    result = {
+        "readings": count,
+        "invocations": len(events),
+        "seconds": round(seconds, 4),
+        "readings_per_sec": round(count / max(seconds, 1e-9), 1),
+        "p50_us": histogram.percentile(50),
+        "p90_us": histogram.percentile(90),
+        "p99_us": histogram.percentile(99),
+        "max_us": histogram.max,
+        "mean_us": round(histogram.mean(), 1),
+        "statuses": statuses,
+    }
+    if name.endswith("_batch"):
+        # Latencies are per batch; also give the per-reading figure
+        result["p50_us_per_reading"] = round(result["p50_us"] / batch_size, 1)
+    result.update(measure_allocations(handler, sample))
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(workloads=WORKLOADS, count=5000, batch_size=100, warmup=200,
+                  alloc_sample=1000, seed=0, aws_latency_ms=0.0, log_level="INFO",
+                  runs=3, module="lambda_deploy.lambda_function"):
+    """Run the selected workloads in this process and return the results document."""
+    handler_module = importlib.import_module(module)
+    # Log records are still formatted, as in Lambda, but written to
+    # os.devnull so the terminal is not part of the measurement. The
+    # logging setup, config loader and SNS topic are put back afterwards
+    # for whatever runs next.
+    root = logging.getLogger()
+    previous_level = root.level
+    previous_load_config = handler_module.load_config
+    previous_topic = os.environ.get("SNS_TOPIC_ARN")
+    redirected = []
+    devnull = open(os.devnull, "w")
+    try:
+        root.setLevel(log_level)
+        for log_handler in root.handlers:
+            if (isinstance(log_handler, logging.StreamHandler)
+                    and log_handler.stream in (sys.stdout, sys.stderr)):
+                redirected.append((log_handler, log_handler.setStream(devnull)))
+        clients = install_stand_ins(handler_module, aws_latency_ms)
+        results = {}
+        for name in workloads:
+            results[name] = bench_workload(handler_module, name, count, batch_size,
+                                           warmup, alloc_sample, seed, runs)
+    finally:
+        for log_handler, stream in redirected:
+            log_handler.setStream(stream)
+        root.setLevel(previous_level)
+        devnull.close()
+        handler_module.load_config = previous_load_config
+        if previous_topic is None:
+            os.environ.pop("SNS_TOPIC_ARN", None)
+        else:
+            os.environ["SNS_TOPIC_ARN"] = previous_topic
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "count": count,
+            "batch_size": batch_size,
+            "seed": seed,
+            "runs": runs,
+            "aws_latency_ms": aws_latency_ms,
+            "log_level": log_level,
+        },
+        "peak_rss_bytes": peak_rss_bytes(),
+        "threads": threading.active_count(),
+        "aws_calls": {name: dict(client.calls) for name, client in clients.items()},
+        "workloads": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions against an earlier results document."""
+    problems = []
+    for name, current in results["workloads"].items():
+        old = baseline.get("workloads", {}).get(name)
+        if old is None:
+            continue
+        for metric in LOWER_IS_BETTER:
+            if old.get(metric) and current[metric] > old[metric] * tolerance:
+                problems.append(f"{name}: {metric} {current[metric]} vs {old[metric]}")
+        if current["readings_per_sec"] * tolerance < old["readings_per_sec"]:
+            problems.append(f"{name}: readings_per_sec {current['readings_per_sec']} "
+                            f"vs {old['readings_per_sec']}")
+    old_rss = baseline.get("peak_rss_bytes")
+    if old_rss and results["peak_rss_bytes"] and results["peak_rss_bytes"] > old_rss * tolerance:
+        problems.append(f"peak_rss_bytes {results['peak_rss_bytes']} vs {old_rss}")
+    return problems
+
+
+def print_report(results):
+    print(f"{'workload':<12} {'readings/s':>11} {'p50':>8} {'p90':>8} {'p99':>8} "
+          f"{'alloc/rd':>9} {'kept/rd':>8}  statuses")
+    for name, r in results["workloads"].items():
+        print(f"{name:<12} {r['readings_per_sec']:>11.0f} {r['p50_us']:>6}us "
+              f"{r['p90_us']:>6}us {r['p99_us']:>6}us "
+              f"{r['alloc_peak_bytes_per_reading']:>8.0f}B "
+              f"{r['retained_bytes_per_reading']:>7.0f}B  {r['statuses']}")
+    if results["peak_rss_bytes"] is not None:
+        print(f"Peak RSS {results['peak_rss_bytes'] / 2**20:.1f} MiB")
+    print(f"AWS calls: {results['aws_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lambda handler end-to-end benchmark")
+    parser.add_argument("--workload", action="append", choices=WORKLOADS,
+                        help="Workload to run (repeatable). Default is all of them")
+    parser.add_argument("--count", type=int, default=5000, help="Readings per workload")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="Readings per batch_handler call in mixed_batch")
+    parser.add_argument("--warmup", type=int, default=200, help="Untimed readings first")
+    parser.add_argument("--alloc-sample", type=int, default=1000,
+                        help="Readings traced for allocation figures")
+    parser.add_argument("--seed", type=int, default=0, help="Workload seed")
+    parser.add_argument("--runs", type=int, default=3, help="Keep the fastest of N timed passes")
+    parser.add_argument("--aws-latency-ms", type=float, default=0.0,
+                        help="Delay added to every stand-in AWS call")
+    parser.add_argument("--log-level", default="INFO",
+                        help="Handler log level while benchmarking (WARNING skips per-reading logs)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results file to check against")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Allowed slowdown factor for --compare")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        workloads=args.workload or WORKLOADS,
+        count=args.count,
+        batch_size=args.batch_size,
+        warmup=args.warmup,
+        alloc_sample=args.alloc_sample,
+        seed=args.seed,
+        runs=args.runs,
+        aws_latency_ms=args.aws_latency_ms,
+        log_level=args.log_level
+    )
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+        print("No handler regressions.")
+
+
+if __name__ == "__main__":
+    main()
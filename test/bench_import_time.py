@@ -0,0 +1,115 @@
+import sys
+import os
+import json
+import argparse
+import subprocess
+
+# Cold-start import benchmark for the deploy bundle. Runs
+# `python -X importtime -c "import lambda_function"` from lambda_deploy/
+# and compares the result with the checked-in baseline:
+#
+#   python3 test/bench_import_time.py            # print report
+#   python3 test/bench_import_time.py --check    # fail on regressions
+#   python3 test/bench_import_time.py --update   # rewrite the baseline
+
+DEPLOY_DIR = os.path.join(os.path.dirname(__file__), '..', 'lambda_deploy')
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'import_time_baseline.json')
+
+# Only used on paths that the first request does not take. (dateutil is
+# not listed: botocore imports it anyway.)
+LAZY_MODULES = ["dotenv", "numpy", "pyarrow"]
+
+
+def measure_imports(module="lambda_function"):
+    """Import a module in a fresh interpreter and return the -X importtime rows.
+
+    Each row is (name, depth, self_us, cumulative_us), in import order.
+    """
+    env = dict(os.environ)
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=DEPLOY_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped, depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(rows, module="lambda_function"):
+    """Return the total import time and the modules it imported directly."""
+    # -X importtime prints children before their parent, so the module's
+    # subtree is every row after the previous top-level row
+    end = next(i for i, (name, depth, _, _) in enumerate(rows)
+               if name == module and depth == 0)
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    subtree = rows[start:end]
+    total = rows[end][3]
+    direct = {name: cumulative for name, depth, _, cumulative in subtree if depth == 1}
+    loaded = {name.split(".")[0] for name, _, _, _ in subtree}
+    return {
+        "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "total_us": total,
+        "direct_imports": direct,
+        "lazy_modules_loaded": sorted(loaded.intersection(LAZY_MODULES)),
+    }
+
+
+def check(summary, baseline, tolerance):
+    """Return a list of regressions compared to the baseline."""
+    problems = []
+    for name in summary["lazy_modules_loaded"]:
+        problems.append(f"{name} is imported eagerly")
+    for name in summary["direct_imports"]:
+        if name not in baseline["direct_imports"]:
+            problems.append(f"new eager import: {name}")
+    limit = baseline["total_us"] * tolerance
+    if summary["total_us"] > limit:
+        problems.append(
+            f"import took {summary['total_us']} us, over {tolerance}x baseline ({baseline['total_us']} us)"
+        )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lambda handler import-time benchmark")
+    parser.add_argument("--check", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--update", action="store_true", help="Rewrite the baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Allowed slowdown factor for --check")
+    parser.add_argument("--runs", type=int, default=5, help="Take the fastest of N runs")
+    args = parser.parse_args()
+
+    summary = min((summarize(measure_imports()) for _ in range(args.runs)),
+                  key=lambda s: s["total_us"])
+    print(f"lambda_function imported in {summary['total_us'] / 1000:.1f} ms")
+    for name, cumulative in sorted(summary["direct_imports"].items(),
+                                   key=lambda item: -item[1]):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if args.update:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+    if args.check:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        problems = check(summary, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+        print("No import-time regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+import io
+import json
+import unittest
+import lambda_deploy.lambda_function as lambda_function
+from utils import aws_clients
+
+# Shared stand-ins for tests that run the Lambda handlers in-process.
+
+TOPIC = "arn:aws:sns:us-east-1:000000000000:alerts"
+
+
+class StubS3:
+    """Keeps put objects in memory. Keys under ``fail_prefix`` fail."""
+
+    def __init__(self, fail_prefix=None):
+        self.objects = {}
+        self.keys = []
+        self.fail_prefix = fail_prefix
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        if self.fail_prefix and Key.startswith(self.fail_prefix):
+            raise RuntimeError("SlowDown")
+        self.objects[Key] = Body
+        self.keys.append(Key)
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+class StubSNS:
+    """Records every call as (operation, [message]). Batch entries with an
+    Id in ``fail_ids`` are reported as failed."""
+
+    def __init__(self, fail_ids=()):
+        self.calls = []
+        self.messages = []
+        self.fail_ids = fail_ids
+
+    def publish(self, TopicArn, Subject, Message):
+        self.calls.append(("publish", [Message]))
+        self.messages.append((Subject, json.loads(Message)))
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self.calls.append(("publish_batch", [e["Message"] for e in PublishBatchRequestEntries]))
+        self.messages.extend((e["Subject"], json.loads(e["Message"]))
+                             for e in PublishBatchRequestEntries)
+        return {"Failed": [{"Id": i, "Code": "InternalError"} for i in self.fail_ids]}
+
+
+class StubCloudWatch:
+    """Records metric datums, rejecting the same bad parameters botocore does."""
+
+    def __init__(self):
+        self.calls = 0
+        self.datums = []
+
+    def put_metric_data(self, Namespace, MetricData):
+        for datum in MetricData:
+            for dimension in datum["Dimensions"]:
+                if not isinstance(dimension["Value"], str):
+                    raise TypeError("Invalid type for parameter Dimensions.Value")
+        self.calls += 1
+        self.datums.extend(MetricData)
+
+    def metric_names(self):
+        return [datum["MetricName"] for datum in self.datums]
+
+
+class HandlerTestCase(unittest.TestCase):
+    """Runs lambda_function against the stubs with ``config`` as config.json.
+
+    SNS alerts go to TOPIC when ``sns_topic`` is set. Module globals named
+    in ``saved_globals`` are put back after each test, so tests can swap in
+    their own sink, coalescer and so on.
+    """
+
+    config = {"s3_bucket": "test-bucket"}
+    sns_topic = False
+    saved_globals = ()
+
+    def setUp(self):
+        self.s3 = StubS3()
+        self.sns = StubSNS()
+        self.cloudwatch = StubCloudWatch()
+        aws_clients.set_client("s3", self.s3)
+        aws_clients.set_client("sns", self.sns)
+        aws_clients.set_client("cloudwatch", self.cloudwatch)
+        self.saved = {name: getattr(lambda_function, name)
+                      for name in ("load_config",) + tuple(self.saved_globals)}
+        lambda_function.load_config = lambda: self.config
+        if self.sns_topic:
+            os.environ["SNS_TOPIC_ARN"] = TOPIC
+        else:
+            os.environ.pop("SNS_TOPIC_ARN", None)
+
+    def tearDown(self):
+        aws_clients.reset_clients()
+        for name, value in self.saved.items():
+            setattr(lambda_function, name, value)
+        os.environ.pop("SNS_TOPIC_ARN", None)
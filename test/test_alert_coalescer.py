@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import json
+import unittest
+from handler_stubs import HandlerTestCase, lambda_function
+from utils.alert_coalescer import AlertCoalescer
+
+HIGH = ["High temperature"]
+
+
+class TestAlertCoalescer(unittest.TestCase):
+    def kinds(self, coalescer, device_id, labels, when):
+        events, _ = coalescer.observe(device_id, labels, when)
+        return [(event["kind"], event["anomaly"]) for event in events]
+
+    def test_entry_digest_and_recovery(self):
+        coalescer = AlertCoalescer(cooldown_seconds=60, recovery_readings=2)
+        self.assertEqual(self.kinds(coalescer, "rack-01", HIGH, 0),
+                         [("entry", "High temperature")])
+        # Readings every 5 seconds are suppressed until the cooldown passes
+        for when in range(5, 60, 5):
+            self.assertEqual(self.kinds(coalescer, "rack-01", HIGH, when), [])
+        events, _ = coalescer.observe("rack-01", HIGH, 60)
+        self.assertEqual(events[0]["kind"], "update")
+        self.assertEqual(events[0]["suppressed"], 11)
+        self.assertEqual(events[0]["since_last_notification"], 12)
+        self.assertEqual(events[0]["readings"], 13)
+
+        # One clean reading is not enough to close it
+        self.assertEqual(self.kinds(coalescer, "rack-01", [], 65), [])
+        self.assertEqual(self.kinds(coalescer, "rack-01", HIGH, 70), [])
+        self.assertEqual(self.kinds(coalescer, "rack-01", [], 75), [])
+        events, _ = coalescer.observe("rack-01", [], 80)
+        self.assertEqual(events[0]["kind"], "recovery")
+        self.assertEqual(events[0]["duration_seconds"], 80)
+        self.assertEqual(coalescer.incidents, {})
+        self.assertEqual(coalescer.stats["suppressed"], 12)
+
+    def test_incidents_are_per_device_and_type(self):
+        coalescer = AlertCoalescer(cooldown_seconds=60, recovery_readings=1)
+        self.assertEqual(self.kinds(coalescer, "rack-01", HIGH, 0),
+                         [("entry", "High temperature")])
+        self.assertEqual(self.kinds(coalescer, "rack-02", HIGH, 0),
+                         [("entry", "High temperature")])
+        self.assertEqual(self.kinds(coalescer, "rack-01", ["High humidity"], 5),
+                         [("recovery", "High temperature"), ("entry", "High humidity")])
+
+    def test_oldest_incident_is_evicted(self):
+        coalescer = AlertCoalescer(cooldown_seconds=60, max_incidents=2)
+        for index, device_id in enumerate(["rack-01", "rack-02", "rack-03"]):
+            coalescer.observe(device_id, HIGH, index)
+        self.assertEqual([key[0] for key in coalescer.incidents], ["rack-02", "rack-03"])
+        self.assertEqual(coalescer.stats["evicted"], 1)
+        # An evicted incident opens again rather than recovering
+        self.assertEqual(self.kinds(coalescer, "rack-01", [], 10), [])
+
+
+class TestHandlerCoalescing(HandlerTestCase):
+    sns_topic = True
+    saved_globals = ("coalescer",)
+
+    def setUp(self):
+        super().setUp()
+        lambda_function.coalescer = AlertCoalescer(cooldown_seconds=300, recovery_readings=1)
+
+    def reading(self, second, temperature):
+        return {"device_id": "rack-01", "temperature": temperature, "humidity": 40.0,
+                "vibration": 0.1, "timestamp": f"2025-07-08T05:{second // 60:02d}:{second % 60:02d}Z"}
+
+    def test_hot_rack_sends_one_alert_until_it_recovers(self):
+        event = [self.reading(second, 96.0) for second in range(0, 120, 5)]
+        event.append(self.reading(120, 70.0))
+        response = lambda_function.batch_handler(event, None)
+        results = json.loads(response["body"])["results"]
+        # Every reading is still stored and flagged
+        self.assertTrue(all(r["body"]["alert"] for r in results[:-1]))
+        self.assertEqual([subject for subject, _ in self.sns.messages],
+                         ["⚠️ Sensor Alert Detected", "✅ Sensor Alert Resolved"])
+        recovery = self.sns.messages[1][1]["incidents"][0]
+        self.assertEqual(recovery["readings"], 24)
+        self.assertEqual(recovery["suppressed"], 23)
+        self.assertIn("AlertsSuppressed", self.cloudwatch.metric_names())
+
+    def test_without_coalescer_every_reading_publishes(self):
+        lambda_function.coalescer = None
+        for second in range(0, 15, 5):
+            lambda_function.lambda_handler(self.reading(second, 96.0), None)
+        self.assertEqual(len(self.sns.messages), 3)
+        self.assertNotIn("incidents", self.sns.messages[0][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import json
+import unittest
+from handler_stubs import TOPIC, HandlerTestCase, StubSNS, lambda_function
+from utils.alert_digest import (
+    ALERT_SUBJECT, MAX_MESSAGE_BYTES, AlertAggregator, group_calls, publish_call
+)
+
+
+def alert(index, note="x"):
+    return {"device_id": f"rack-{index % 50:02d}", "temperature": 96.0, "note": note}
+
+
+class TestAlertAggregator(unittest.TestCase):
+    def test_digest_holds_every_alert_in_one_message(self):
+        aggregator = AlertAggregator()
+        for index in range(200):
+            aggregator.add(TOPIC, ALERT_SUBJECT, alert(index), tag=str(index))
+        messages = aggregator.drain()
+        self.assertEqual(len(messages), 1)
+        body = json.loads(messages[0]["message"])
+        self.assertEqual((body["count"], body["devices"]), (200, 50))
+        self.assertEqual(body["alerts"][3], alert(3))
+        self.assertEqual(messages[0]["tags"], [str(i) for i in range(200)])
+        self.assertEqual(messages[0]["subject"], "⚠️ 200 sensor alerts from 50 devices")
+        self.assertEqual(aggregator.pending(), 0)
+
+    def test_digests_stay_under_size_limit(self):
+        aggregator = AlertAggregator()
+        for index in range(300):
+            aggregator.add(TOPIC, ALERT_SUBJECT, alert(index, note="n" * 2000))
+        messages = aggregator.drain()
+        self.assertGreater(len(messages), 1)
+        self.assertEqual(sum(m["alerts"] for m in messages), 300)
+        for message in messages:
+            self.assertLess(len(message["message"].encode("utf-8")), MAX_MESSAGE_BYTES - 1000)
+            self.assertEqual(json.loads(message["message"])["count"], message["alerts"])
+
+    def test_single_alert_is_sent_as_is(self):
+        aggregator = AlertAggregator()
+        aggregator.add(TOPIC, ALERT_SUBJECT, alert(1))
+        (message,) = aggregator.drain()
+        self.assertEqual(json.loads(message["message"]), alert(1))
+        self.assertEqual(message["subject"], ALERT_SUBJECT)
+
+    def test_max_age_keeps_alerts_buffered(self):
+        aggregator = AlertAggregator(max_age_seconds=60)
+        aggregator.add(TOPIC, ALERT_SUBJECT, alert(1))
+        self.assertEqual(aggregator.drain(), [])
+        self.assertEqual(len(aggregator.drain(force=True)), 1)
+
+    def test_publish_batch_groups_ten_messages_per_call(self):
+        aggregator = AlertAggregator(digest=False)
+        for index in range(25):
+            aggregator.add(TOPIC, ALERT_SUBJECT, alert(index))
+        calls = group_calls(aggregator.drain(), use_batch=True)
+        self.assertEqual([len(call) for call in calls], [10, 10, 5])
+        self.assertEqual(len(group_calls(aggregator.drain(), use_batch=False)), 0)
+
+    def test_failed_batch_entries_raise(self):
+        sns = StubSNS(fail_ids=["1"])
+        aggregator = AlertAggregator(digest=False)
+        for index in range(3):
+            aggregator.add(TOPIC, ALERT_SUBJECT, alert(index))
+        with self.assertRaisesRegex(RuntimeError, "1 of 3 SNS messages failed"):
+            publish_call(sns, aggregator.drain())
+
+
+class TestHandlerAggregation(HandlerTestCase):
+    sns_topic = True
+    saved_globals = ("alerts", "SNS_PUBLISH_BATCH")
+
+    def storm(self, racks=40):
+        return [{"device_id": f"rack-{i:02d}", "temperature": 96.0, "humidity": 40.0,
+                 "vibration": 0.1, "timestamp": "2025-07-08T05:13:21Z"} for i in range(racks)]
+
+    def test_batch_storm_is_one_digest(self):
+        lambda_function.alerts = AlertAggregator()
+        response = lambda_function.batch_handler(self.storm(), None)
+        self.assertEqual(json.loads(response["body"])["failed"], 0)
+        self.assertEqual(len(self.sns.calls), 1)
+        self.assertEqual(json.loads(self.sns.calls[0][1][0])["count"], 40)
+
+    def test_batch_storm_with_publish_batch(self):
+        lambda_function.alerts = AlertAggregator(digest=False)
+        lambda_function.SNS_PUBLISH_BATCH = True
+        lambda_function.batch_handler(self.storm(), None)
+        self.assertEqual([(name, len(messages)) for name, messages in self.sns.calls],
+                         [("publish_batch", 10)] * 4)
+
+    def test_failed_digest_is_reported_on_its_records(self):
+        lambda_function.alerts = AlertAggregator()
+        lambda_function.SNS_PUBLISH_BATCH = True
+        self.sns.publish = None  # any publish call fails
+        response = lambda_function.batch_handler(self.storm(3), None)
+        body = json.loads(response["body"])
+        self.assertEqual([sorted(r.get("errors", {})) for r in body["results"]], [["sns"]] * 3)
+        # Alert delivery failures are not storage failures, so nothing is retried
+        self.assertEqual(response["batchItemFailures"], [])
+
+    def test_single_reading_invocation(self):
+        lambda_function.alerts = AlertAggregator()
+        lambda_function.lambda_handler(self.storm(1)[0], None)
+        self.assertEqual(self.sns.calls[0][0], "publish")
+        self.assertEqual(json.loads(self.sns.calls[0][1][0])["device_id"], "rack-00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import io
+import json
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+from simulator.async_engine import TimerWheel, run_racks
+from simulator.clock import make_clock
+from simulator.simulate_sensors import rack_rng, simulate_rack
+
+
+class FakeResult:
+    rc = 0
+
+
+class CollectingPublisher:
+    def __init__(self):
+        self.messages = []
+        self.raw = []
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, qos=0):
+        with self._lock:
+            self.messages.append((topic, json.loads(payload)))
+            self.raw.append((topic, payload))
+        return FakeResult()
+
+    def by_topic(self):
+        streams = {}
+        for topic, payload in self.raw:
+            streams.setdefault(topic, []).append(payload)
+        return streams
+
+
+class TestTimerWheel(unittest.TestCase):
+    def test_sleep_longer_than_one_revolution(self):
+        async def scenario():
+            wheel = TimerWheel(tick=0.01, slots=8)
+            stop = threading.Event()
+            driver = asyncio.create_task(wheel.run(stop))
+            start = time.monotonic()
+            await wheel.sleep(0.2)
+            elapsed = time.monotonic() - start
+            stop.set()
+            await driver
+            return elapsed
+
+        self.assertGreaterEqual(asyncio.run(scenario()), 0.19)
+
+
+class TestAsyncEngine(unittest.TestCase):
+    def test_thousands_of_racks_on_one_loop(self):
+        publisher = CollectingPublisher()
+        device_ids = [f"rack-{i+1:02d}" for i in range(2000)]
+        with redirect_stdout(io.StringIO()):
+            counts = asyncio.run(run_racks(
+                device_ids, publisher, 0, 0, threading.Event(),
+                num_messages=2, tick=0.01
+            ))
+        self.assertEqual(set(counts.values()), {2})
+        self.assertEqual(len(publisher.messages), 4000)
+        topics = {topic for topic, _ in publisher.messages}
+        self.assertIn("sensors/server-room/rack-2000", topics)
+
+    def test_stop_event_wakes_sleeping_racks(self):
+        stop = threading.Event()
+        threading.Timer(0.2, stop.set).start()
+        start = time.monotonic()
+        with redirect_stdout(io.StringIO()):
+            asyncio.run(run_racks(["rack-01", "rack-02"], CollectingPublisher(),
+                                  60, 60, stop, tick=0.01))
+        self.assertLess(time.monotonic() - start, 5)
+
+
+class TestReproducibleWorkload(unittest.TestCase):
+    device_ids = [f"rack-{i+1:02d}" for i in range(6)]
+
+    def run_async(self):
+        publisher = CollectingPublisher()
+        with redirect_stdout(io.StringIO()):
+            asyncio.run(run_racks(self.device_ids, publisher, 5, 10, threading.Event(),
+                                  anomaly_rate=0.3, num_messages=4, seed=7,
+                                  clock="simulated"))
+        return publisher.by_topic()
+
+    def run_threads(self, workers):
+        publisher = CollectingPublisher()
+        with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=workers) as executor:
+            for device_id in self.device_ids:
+                executor.submit(simulate_rack, device_id, None, 5, 10, threading.Event(),
+                                0.3, 4, publisher, rack_rng(7, device_id),
+                                make_clock("simulated"))
+        return publisher.by_topic()
+
+    def test_same_streams_across_runs_engines_and_workers(self):
+        first = self.run_async()
+        self.assertEqual(first, self.run_async())
+        self.assertEqual(first, self.run_threads(1))
+        self.assertEqual(first, self.run_threads(6))
+        self.assertEqual(first["sensors/server-room/rack-01"][0][:54],
+                         '{"device_id": "rack-01", "timestamp": "2025-01-01T00:0')
+
+    def test_simulated_clock_advances_by_interval(self):
+        stamps = [json.loads(p)["timestamp"]
+                  for p in self.run_async()["sensors/server-room/rack-01"]]
+        self.assertEqual(stamps[0], "2025-01-01T00:00:00Z")
+        self.assertEqual(stamps, sorted(stamps))
+        self.assertEqual(len(set(stamps)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
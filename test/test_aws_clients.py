@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+import unittest
+from utils import aws_clients
+
+
+class TestClientFactory(unittest.TestCase):
+    def tearDown(self):
+        aws_clients.configure_clients(max_pool_connections=25, tcp_keepalive=True)
+
+    def test_client_is_built_once(self):
+        aws_clients.reset_clients()
+        first = aws_clients.get_client("sns")
+        self.assertIs(aws_clients.get_client("sns"), first)
+
+    def test_pool_settings_are_applied(self):
+        aws_clients.configure_clients(max_pool_connections=7, tcp_keepalive=True)
+        client = aws_clients.get_client("s3")
+        self.assertEqual(client.meta.config.max_pool_connections, 7)
+        self.assertTrue(client.meta.config.tcp_keepalive)
+
+    def test_configure_drops_cached_clients(self):
+        first = aws_clients.get_client("cloudwatch")
+        aws_clients.configure_clients(max_pool_connections=5)
+        self.assertIsNot(aws_clients.get_client("cloudwatch"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
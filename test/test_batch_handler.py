@@ -0,0 +1,183 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import base64
+import json
+import unittest
+from handler_stubs import HandlerTestCase, lambda_function
+from utils.s3_sink import BufferedS3Sink
+
+TEST_INPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'test_inputs')
+
+
+def load_test_input(file_name):
+    with open(os.path.join(TEST_INPUT_DIR, file_name), 'r') as f:
+        return json.load(f)
+
+
+class TestBatchHandler(HandlerTestCase):
+    def test_plain_list_returns_result_per_record(self):
+        event = [
+            load_test_input("valid_payload.json"),
+            load_test_input("high_temp.json"),
+            load_test_input("malformed_payload.json"),
+        ]
+        response = lambda_function.batch_handler(event, context={})
+        body = json.loads(response["body"])
+        self.assertEqual(body["processed"], 3)
+        self.assertEqual([r["statusCode"] for r in body["results"]], [200, 200, 400])
+        self.assertTrue(body["results"][1]["body"]["alert"])
+        # Metrics for the whole batch go out in a single call
+        self.assertEqual(self.cloudwatch.calls, 1)
+        # Bad data is not retried
+        self.assertEqual(response["batchItemFailures"], [])
+
+    def test_non_string_device_ids_keep_the_batch_metrics(self):
+        event = [load_test_input("valid_payload.json"),
+                 dict(load_test_input("valid_payload.json"), device_id=None),
+                 dict(load_test_input("valid_payload.json"), device_id=5)]
+        lambda_function.batch_handler(event, context={})
+        self.assertEqual(self.cloudwatch.calls, 1)
+        devices = {d["Dimensions"][0]["Value"] for d in self.cloudwatch.datums
+                   if d["MetricName"] == "LambdaExecutions"}
+        self.assertEqual(devices, {"rack-01", "None", "5"})
+
+    def test_sqs_records_report_server_errors_for_retry(self):
+        event = {"Records": [
+            {"messageId": "m-1", "body": json.dumps(load_test_input("valid_payload.json"))},
+            {"messageId": "m-2", "body": "not json"},
+        ]}
+        original = lambda_function.plan_reading
+
+        def flaky(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        lambda_function.plan_reading = flaky
+        try:
+            response = lambda_function.batch_handler(event, context={})
+        finally:
+            lambda_function.plan_reading = original
+        body = json.loads(response["body"])
+        self.assertEqual([r["id"] for r in body["results"]], ["m-1", "m-2"])
+        self.assertEqual([r["statusCode"] for r in body["results"]], [500, 400])
+        # The 500 comes from the injected error, not from a bad call
+        self.assertEqual(body["results"][0]["body"], {"error": "boom"})
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": "m-1"}])
+
+    def test_kinesis_records_are_decoded(self):
+        data = base64.b64encode(
+            json.dumps(load_test_input("multi_anomaly.json")).encode()
+            ).decode()
+        event = {"Records": [
+            {"kinesis": {"sequenceNumber": "49590338271490256608559692538361571095921575989136588898",
+                         "data": data}}
+        ]}
+        response = lambda_function.batch_handler(event, context={})
+        body = json.loads(response["body"])
+        self.assertEqual(body["results"][0]["statusCode"], 200)
+        self.assertIn("raw/rack-03/2025-07-08T05-16-00Z.json", self.s3.keys)
+        self.assertIn("alerts/rack-03/2025-07-08T05-16-00Z.json", self.s3.keys)
+
+    def test_kinesis_bad_payload_is_reported_by_sequence_number(self):
+        good = base64.b64encode(json.dumps(load_test_input("valid_payload.json")).encode()).decode()
+        event = {"Records": [
+            {"kinesis": {"sequenceNumber": "seq-1", "data": good}},
+            {"kinesis": {"sequenceNumber": "seq-2", "data": base64.b64encode(b"not json").decode()}},
+            {"kinesis": {"sequenceNumber": "seq-3", "data": "%%%"}},
+        ]}
+        response = lambda_function.batch_handler(event, context={})
+        body = json.loads(response["body"])
+        self.assertEqual([r["id"] for r in body["results"]], ["seq-1", "seq-2", "seq-3"])
+        self.assertEqual([r["statusCode"] for r in body["results"]], [200, 400, 400])
+        self.assertEqual(response["batchItemFailures"], [])
+
+    def test_failed_side_effects_are_reported_per_record(self):
+        self.s3.fail_prefix = "alerts/"
+        event = [
+            load_test_input("valid_payload.json"),
+            load_test_input("high_vibration.json"),
+        ]
+        response = lambda_function.batch_handler(event, context={})
+        body = json.loads(response["body"])
+        self.assertNotIn("errors", body["results"][0])
+        self.assertEqual(list(body["results"][1]["errors"]), ["alerts"])
+        # The raw copy still landed and only the failed record is retried
+        self.assertIn("raw/rack-02/2025-07-08T05-15-00Z.json", self.s3.keys)
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": "1"}])
+
+    def test_sink_mode_writes_one_chunk_per_partition(self):
+        lambda_function.sink = BufferedS3Sink()
+        try:
+            event = [
+                load_test_input("valid_payload.json"),
+                load_test_input("edge_humidity.json"),
+                dict(load_test_input("valid_payload.json"),
+                     timestamp="2025-07-08T05:20:00Z"),
+            ]
+            response = lambda_function.batch_handler(event, context={})
+        finally:
+            lambda_function.sink = None
+        body = json.loads(response["body"])
+        self.assertEqual([r["statusCode"] for r in body["results"]], [200, 200, 200])
+        self.assertEqual(
+            sorted(key.rsplit("/", 1)[0] for key in self.s3.keys),
+            ["raw/rack-01/2025-07-08T05", "raw/rack-edge-humidity/2025-07-08T05"]
+        )
+
+    def test_failed_chunk_marks_its_records_for_retry(self):
+        lambda_function.sink = BufferedS3Sink()
+        self.s3.fail_prefix = "alerts/"
+        try:
+            event = [
+                load_test_input("valid_payload.json"),
+                load_test_input("high_temp.json"),
+            ]
+            response = lambda_function.batch_handler(event, context={})
+        finally:
+            lambda_function.sink = None
+        body = json.loads(response["body"])
+        self.assertEqual(list(body["results"][1]["errors"]), ["sink"])
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": "1"}])
+
+    def test_buffered_records_from_earlier_batches_are_not_reported(self):
+        # A partition holds one reading across invocations and drains with two
+        lambda_function.sink = BufferedS3Sink(max_bytes=300, max_age_seconds=3600)
+        self.s3.fail_prefix = "alerts/"
+        try:
+            first = lambda_function.batch_handler(
+                [load_test_input("valid_payload.json"), load_test_input("high_temp.json")],
+                context={})
+            # The alert of record "1" is still buffered
+            self.assertEqual(lambda_function.sink.pending(), 1)
+            second = lambda_function.batch_handler(
+                [load_test_input("high_temp.json"), load_test_input("valid_payload.json")],
+                context={})
+        finally:
+            lambda_function.sink = None
+        self.assertEqual(first["batchItemFailures"], [])
+        # The failed alerts chunk also carried record "1" of the first batch
+        self.assertEqual(second["batchItemFailures"], [{"itemIdentifier": "0"}])
+        self.assertNotIn("errors", json.loads(second["body"])["results"][1])
+
+    def test_vectorized_batch_matches_single_record_path(self):
+        files = ["valid_payload.json", "high_temp.json", "high_vibration.json",
+                 "low_humidity.json", "high_humidity.json", "multi_anomaly.json",
+                 "edge_case_payload.json", "edge_humidity.json",
+                 "malformed_payload.json", "missing_input.json"]
+        out_of_range = dict(load_test_input("valid_payload.json"), humidity=140.0)
+        event = [load_test_input(f) for f in files] * 2 + [out_of_range]
+        expected = [lambda_function.lambda_handler(e, context={}) for e in event]
+        response = lambda_function.batch_handler(event, context={})
+        results = json.loads(response["body"])["results"]
+        for result, single in zip(results, expected):
+            self.assertEqual(result["statusCode"], single["statusCode"])
+            single_body = json.loads(single["body"])
+            if "saved_as" in single_body:
+                # invalid-type keys are stamped with the current time
+                single_body.pop("saved_as")
+                result["body"].pop("saved_as")
+            self.assertEqual(result["body"], single_body)
+
+
+if __name__ == "__main__":
+    unittest.main()
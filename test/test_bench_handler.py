@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import logging
+import unittest
+from bench_handler import WORKLOADS, compare, make_workload, run_benchmark
+import lambda_deploy.lambda_function as lambda_function
+from utils import aws_clients
+
+
+class TestHandlerBenchmark(unittest.TestCase):
+    def tearDown(self):
+        # run_benchmark leaves its offline AWS clients installed
+        aws_clients.reset_clients()
+
+    def test_workloads_are_reproducible(self):
+        self.assertEqual(make_workload("mixed", 50, seed=3), make_workload("mixed", 50, seed=3))
+        self.assertNotEqual(make_workload("mixed", 50, seed=3), make_workload("mixed", 50, seed=4))
+
+    def test_small_run_covers_every_workload_offline(self):
+        results = run_benchmark(count=40, batch_size=10, warmup=5, alloc_sample=10, runs=1)
+        self.assertEqual(set(results["workloads"]), set(WORKLOADS))
+        self.assertEqual(results["workloads"]["normal"]["statuses"].get("400", 0), 0)
+        self.assertEqual(results["workloads"]["invalid"]["statuses"], {"400": 40})
+        self.assertEqual(results["workloads"]["mixed_batch"]["invocations"], 4)
+        self.assertGreater(results["aws_calls"]["sns"]["publish"], 0)
+        for result in results["workloads"].values():
+            self.assertGreater(result["readings_per_sec"], 0)
+            self.assertLessEqual(result["p50_us"], result["p99_us"])
+
+    def test_logging_setup_is_restored(self):
+        root = logging.getLogger()
+        level = root.level
+        log_handler = logging.StreamHandler(sys.stderr)
+        root.addHandler(log_handler)
+        try:
+            run_benchmark(workloads=["normal"], count=10, warmup=1, alloc_sample=5,
+                          runs=1, log_level="ERROR")
+            self.assertIs(log_handler.stream, sys.stderr)
+            self.assertEqual(root.level, level)
+        finally:
+            root.removeHandler(log_handler)
+
+    def test_handler_setup_is_restored(self):
+        load_config = lambda_function.load_config
+        os.environ["SNS_TOPIC_ARN"] = "arn:aws:sns:us-east-1:000000000000:mine"
+        try:
+            run_benchmark(workloads=["normal"], count=10, warmup=1, alloc_sample=5, runs=1)
+            self.assertIs(lambda_function.load_config, load_config)
+            self.assertEqual(os.environ["SNS_TOPIC_ARN"], "arn:aws:sns:us-east-1:000000000000:mine")
+        finally:
+            os.environ.pop("SNS_TOPIC_ARN", None)
+        run_benchmark(workloads=["normal"], count=10, warmup=1, alloc_sample=5, runs=1)
+        self.assertNotIn("SNS_TOPIC_ARN", os.environ)
+
+    def test_compare_flags_slower_results(self):
+        old = {"workloads": {"normal": {"readings_per_sec": 1000, "p50_us": 100, "p90_us": 150,
+                                        "p99_us": 200, "alloc_peak_bytes_per_reading": 5000,
+                                        "retained_bytes_per_reading": 0}},
+               "peak_rss_bytes": 100}
+        new = {"workloads": {"normal": dict(old["workloads"]["normal"],
+                                            readings_per_sec=500, p99_us=400)},
+               "peak_rss_bytes": 100}
+        problems = compare(new, old, tolerance=1.5)
+        self.assertEqual(len(problems), 2)
+        self.assertEqual(compare(old, old, tolerance=1.5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import json
+import random
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+    from simulator import bulk_generate
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestBulkGenerate(unittest.TestCase):
+    def test_triangular_matches_stdlib(self):
+        # Same uniforms in, same values out, including mode outside [low, high]
+        for low, high, mode in [(65.0, 72.0, 95.0), (0.0, 1.0, 0.3), (25.0, 45.0, 70.0)]:
+            # triangular() draws exactly one uniform per call
+            us = [random.Random(seed).random() for seed in range(50)]
+            expected = [random.Random(seed).triangular(low, high, mode) for seed in range(50)]
+            got = bulk_generate.triangular(np.array(us), low, high, mode)
+            np.testing.assert_allclose(got, expected)
+
+    def test_columns_and_ranges(self):
+        columns = bulk_generate.generate_payloads(
+            10000, anomaly_rate=0.0, rng=np.random.default_rng(1)
+        )
+        self.assertEqual(len(columns["temperature"]), 10000)
+        self.assertTrue(((columns["temperature"] >= 65) & (columns["temperature"] <= 80)).all())
+        self.assertTrue(((columns["humidity"] >= 25) & (columns["humidity"] <= 55)).all())
+        self.assertTrue(((columns["vibration"] >= 0) & (columns["vibration"] <= 0.4)).all())
+        self.assertFalse(columns["anomaly"].any())
+
+    def test_anomaly_injection(self):
+        columns = bulk_generate.generate_payloads(
+            20000, anomaly_rate=1.0, rng=np.random.default_rng(2)
+        )
+        hot = columns["temperature"] >= 90
+        dry_or_wet = (columns["humidity"] < 20) | (columns["humidity"] >= 65)
+        shaky = columns["vibration"] >= 0.6
+        self.assertTrue((hot | dry_or_wet | shaky).all())
+        self.assertTrue(hot.any() and dry_or_wet.any() and shaky.any())
+
+    def test_devices_and_timestamps(self):
+        start = datetime(2025, 7, 1, 12, 0, tzinfo=timezone.utc)
+        columns = bulk_generate.generate_payloads(
+            5, device_ids=["rack-01", "rack-02"], start_time=start, interval=5.0
+        )
+        self.assertEqual(list(columns["device_id"]),
+                         ["rack-01", "rack-02", "rack-01", "rack-02", "rack-01"])
+        self.assertEqual(columns["timestamp"][0], "2025-07-01T12:00:00.000000Z")
+        self.assertEqual(columns["timestamp"][2], "2025-07-01T12:00:05.000000Z")
+
+    def test_json_lines_match_json_dumps(self):
+        columns = bulk_generate.generate_payloads(100, device_ids=["rack-01", "rack-02"])
+        lines = bulk_generate.to_json_lines(columns).decode("utf-8").splitlines()
+        payloads = bulk_generate.to_payloads(columns)
+        self.assertEqual(lines, [json.dumps(p) for p in payloads])
+
+    def test_iter_json_batches_continues_across_batches(self):
+        start = datetime(2025, 7, 1, tzinfo=timezone.utc)
+        batches = list(bulk_generate.iter_json_batches(
+            7, batch_size=3, device_ids=["a", "b"], start_time=start, interval=1.0
+        ))
+        self.assertEqual(len(batches), 3)
+        rows = [json.loads(line) for b in batches for line in b.splitlines()]
+        self.assertEqual([r["device_id"] for r in rows], ["a", "b"] * 3 + ["a"])
+        self.assertEqual(rows[6]["timestamp"], "2025-07-01T00:00:03.000000Z")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import random
+import unittest
+from utils import classifier
+from utils.classifier import classify_batch, classify_reading, in_expected_range
+
+
+@unittest.skipIf(not classifier.HAS_NUMPY, "numpy not installed")
+class TestVectorizedClassifier(unittest.TestCase):
+    def assert_matches_scalar(self, readings):
+        result = classify_batch(*zip(*readings))
+        for i, (t, h, v) in enumerate(readings):
+            num_anomalies, note = classify_reading(t, h, v)
+            self.assertEqual(bool(result["in_range"][i]), in_expected_range(t, h, v), (t, h, v))
+            self.assertEqual(int(result["num_anomalies"][i]), num_anomalies, (t, h, v))
+            self.assertEqual(result["note"][i], note, (t, h, v))
+
+    def test_threshold_edges_match_scalar_path(self):
+        temps = [0.0, 84.99, 85.0, 85.01, 200.0, 200.01, -0.01, float("nan")]
+        hums = [0.0, 19.99, 20.0, 60.0, 60.01, 100.0, 100.5, float("nan")]
+        vibs = [0.0, 0.5, 0.51, 5.0, 5.01, float("nan")]
+        self.assert_matches_scalar([(t, h, v) for t in temps for h in hums for v in vibs])
+
+    def test_random_readings_match_scalar_path(self):
+        rng = random.Random(1234)
+        readings = [(rng.uniform(-10, 210), rng.uniform(-5, 105), rng.uniform(-0.5, 5.5))
+                     for _ in range(5000)]
+        self.assert_matches_scalar(readings)
+
+    def test_rule_masks(self):
+        result = classify_batch([95.0, 70.0], [15.0, 75.0], [0.1, 0.9])
+        self.assertEqual(result["high_temperature"].tolist(), [True, False])
+        self.assertEqual(result["low_humidity"].tolist(), [True, False])
+        self.assertEqual(result["high_humidity"].tolist(), [False, True])
+        self.assertEqual(result["excessive_vibration"].tolist(), [False, True])
+        self.assertEqual(result["note"][0], "2 Anomalies Detected: High temperature, Low humidity")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+import threading
+import unittest
+from datetime import datetime, timezone
+from clean_s3_prefixes import PrefixCleaner, RetentionFilter, delete_prefix_objects, parse_key
+
+
+class FakeS3:
+    """In-memory bucket with list_objects_v2 paging and flaky deletes."""
+
+    def __init__(self, keys, page_size=100, flaky_keys=(), denied_keys=()):
+        self.keys = set(keys)
+        self.page_size = page_size
+        self.flaky = set(flaky_keys)
+        self.denied = set(denied_keys)
+        self.delete_calls = 0
+        self.listed_prefixes = []
+        self.start_after = []
+        self.listed_keys = 0
+        self._lock = threading.Lock()
+
+    def list_objects_v2(self, Bucket, Prefix, Delimiter=None, ContinuationToken=None,
+                        StartAfter=None):
+        with self._lock:
+            self.listed_prefixes.append(Prefix)
+            if StartAfter:
+                self.start_after.append(StartAfter)
+            keys = sorted(k for k in self.keys
+                          if k.startswith(Prefix) and (not StartAfter or k > StartAfter))
+        entries = []
+        for key in keys:
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                sub = Prefix + rest.split(Delimiter)[0] + Delimiter
+                if not entries or entries[-1] != ("prefix", sub):
+                    entries.append(("prefix", sub))
+            else:
+                entries.append(("key", key))
+        # Like S3, the token marks a position in key order, so deletes
+        # made between pages don't shift the next page
+        if ContinuationToken:
+            entries = [e for e in entries if e[1] > ContinuationToken]
+        chunk = entries[:self.page_size]
+        page = {
+            "Contents": [{"Key": v} for t, v in chunk if t == "key"],
+            "CommonPrefixes": [{"Prefix": v} for t, v in chunk if t == "prefix"],
+            "IsTruncated": len(entries) > self.page_size,
+        }
+        if page["IsTruncated"]:
+            page["NextContinuationToken"] = chunk[-1][1]
+        for obj in page["Contents"]:
+            obj["Size"] = 100
+        with self._lock:
+            self.listed_keys += len(page["Contents"])
+        return page
+
+    def delete_objects(self, Bucket, Delete):
+        objects = Delete["Objects"]
+        assert len(objects) <= 1000
+        errors = []
+        with self._lock:
+            self.delete_calls += 1
+            for obj in objects:
+                key = obj["Key"]
+                if key in self.denied:
+                    errors.append({"Key": key, "Code": "AccessDenied"})
+                elif key in self.flaky:
+                    # Fails once, then succeeds
+                    self.flaky.discard(key)
+                    errors.append({"Key": key, "Code": "SlowDown"})
+                else:
+                    self.keys.discard(key)
+        return {"Errors": errors}
+
+
+def make_keys(devices=5, per_device=450):
+    keys = [f"raw/rack-{d:02d}/2025-07-08T05-13-{i:04d}Z.json"
+            for d in range(devices) for i in range(per_device)]
+    return keys + ["raw/loose.json", "alerts/rack-01/a.json", "other/keep.json"]
+
+
+class TestPrefixCleaner(unittest.TestCase):
+    def test_deletes_everything_under_prefixes(self):
+        s3 = FakeS3(make_keys())
+        progress = PrefixCleaner("bucket", s3=s3, workers=4, list_workers=3,
+                                 report_interval=0).clean(["raw/", "alerts/"])
+        self.assertEqual(s3.keys, {"other/keep.json"})
+        self.assertEqual(progress.deleted, 5 * 450 + 2)
+        self.assertEqual(progress.failed, 0)
+        # Each device subprefix was walked as its own shard
+        self.assertIn("raw/rack-03/", s3.listed_prefixes)
+
+    def test_retries_error_keys(self):
+        keys = make_keys(devices=2, per_device=50)
+        s3 = FakeS3(keys, flaky_keys=keys[:10], denied_keys=keys[10:12])
+        cleaner = PrefixCleaner("bucket", s3=s3, workers=2, backoff=0, report_interval=0)
+        progress = cleaner.clean(["raw/"])
+        self.assertEqual(progress.failed, 2)
+        self.assertEqual(progress.retried, 10)
+        self.assertEqual(s3.keys, {"alerts/rack-01/a.json", "other/keep.json"} | set(keys[10:12]))
+
+    def test_delete_prefix_objects_returns_count(self):
+        s3 = FakeS3(make_keys(devices=1, per_device=20))
+        self.assertEqual(delete_prefix_objects("bucket", "alerts/", s3=s3, report_interval=0), 1)
+
+
+def hourly_keys(devices=("rack-01", "rack-02"), days=3):
+    return [f"raw/{device}/2025-07-{day:02d}T{hour:02d}-15-00.123456Z.json"
+            for device in devices for day in range(1, days + 1) for hour in range(24)]
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestRetention(unittest.TestCase):
+    def clean(self, s3, **kwargs):
+        dry_run = kwargs.pop("dry_run", False)
+        return PrefixCleaner("bucket", s3=s3, workers=2, list_workers=2, report_interval=0,
+                             key_filter=RetentionFilter(**kwargs), dry_run=dry_run).clean(["raw/"])
+
+    def test_parse_key_layouts(self):
+        self.assertEqual(parse_key("raw/rack-01/2025-07-08T05-13-21.622484Z.json", "raw/"),
+                         ("rack-01", utc(2025, 7, 8, 5, 13, 21, 622484),
+                          utc(2025, 7, 8, 5, 13, 21, 622484)))
+        self.assertEqual(
+            parse_key("raw/rack-01/2025-07-08T05/2025-07-08T05-13-21Z_1a2b3c4d.ndjson.gz", "raw/"),
+            ("rack-01", utc(2025, 7, 8, 5, 13, 21), utc(2025, 7, 8, 6, 0)))
+        self.assertEqual(
+            parse_key("raw/date=2025-07-08/device_id=rack-01/2025-07-08T05-13-21Z_1a2b.parquet",
+                      "raw/"),
+            ("rack-01", utc(2025, 7, 8, 5, 13, 21), utc(2025, 7, 9, 0, 0)))
+        self.assertEqual(parse_key("raw/loose.json", "raw/"), (None, None, None))
+
+    def test_deletes_only_older_objects_and_stops_listing_early(self):
+        s3 = FakeS3(hourly_keys(), page_size=10)
+        progress = self.clean(s3, before=utc(2025, 7, 2, 0, 0))
+        self.assertEqual(progress.deleted, 48)
+        self.assertTrue(all("2025-07-01" not in key for key in s3.keys))
+        self.assertEqual(len(s3.keys), 96)
+        # Listing stopped at the cutoff hour instead of walking all 144 keys
+        self.assertLess(s3.listed_keys, 144 - 60)
+
+    def test_cutoff_inside_an_hour(self):
+        s3 = FakeS3(hourly_keys(devices=("rack-01",), days=1))
+        self.clean(s3, before=utc(2025, 7, 1, 5, 30))
+        # 05:15 is before 05:30, so hours 00..05 go
+        self.assertEqual(len(s3.keys), 18)
+
+    def test_chunk_straddling_cutoff_is_kept(self):
+        # The 05 chunk starts at 05:10 but can hold readings up to 06:00
+        keys = [f"raw/rack-01/2025-07-01T{hour:02d}/2025-07-01T{hour:02d}-10-00Z_ab.ndjson.gz"
+                for hour in range(4, 7)]
+        s3 = FakeS3(keys)
+        self.clean(s3, before=utc(2025, 7, 1, 5, 30))
+        self.assertEqual(s3.keys, set(keys[1:]))
+        self.clean(s3, before=utc(2025, 7, 1, 6, 0))
+        self.assertEqual(s3.keys, {keys[2]})
+
+    def test_parquet_chunk_straddling_cutoff_is_kept(self):
+        keys = [f"raw/date=2025-07-0{day}/device_id=rack-01/2025-07-0{day}T01-00-00Z_ab.parquet"
+                for day in (1, 2)]
+        s3 = FakeS3(keys)
+        self.clean(s3, before=utc(2025, 7, 2, 12, 0))
+        self.assertEqual(s3.keys, {keys[1]})
+
+    def test_after_uses_start_after(self):
+        s3 = FakeS3(hourly_keys(devices=("rack-01",)))
+        progress = self.clean(s3, after=utc(2025, 7, 3, 0, 0))
+        self.assertEqual(progress.deleted, 24)
+        self.assertIn("raw/rack-01/2025-07-03T00", s3.start_after)
+        self.assertEqual(s3.listed_keys, 24)
+
+    def test_device_filter_skips_other_folders(self):
+        s3 = FakeS3(hourly_keys(devices=("rack-01", "rack-02", "rack-03")))
+        self.clean(s3, devices=["rack-02"])
+        self.assertFalse(any(key.startswith("raw/rack-02/") for key in s3.keys))
+        self.assertEqual(len(s3.keys), 144)
+        self.assertNotIn("raw/rack-01/", s3.listed_prefixes)
+
+    def test_parquet_date_partitions(self):
+        keys = [f"raw/date=2025-07-{day:02d}/device_id=rack-01/2025-07-{day:02d}T01-00-00Z_ab.parquet"
+                for day in range(1, 6)]
+        s3 = FakeS3(keys)
+        self.clean(s3, before=utc(2025, 7, 3, 0, 0))
+        self.assertEqual(len(s3.keys), 3)
+        self.assertNotIn("raw/date=2025-07-05/", s3.listed_prefixes)
+
+    def test_dry_run_reports_without_deleting(self):
+        s3 = FakeS3(hourly_keys())
+        progress = self.clean(s3, before=utc(2025, 7, 2, 0, 0), dry_run=True)
+        self.assertEqual(len(s3.keys), 144)
+        self.assertEqual(s3.delete_calls, 0)
+        self.assertEqual(progress.matched, 48)
+        self.assertEqual(progress.matched_bytes, 4800)
+        self.assertIn("would delete 48 of", progress.summary(dry_run=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import io
+import unittest
+from handler_stubs import HandlerTestCase, lambda_function
+from utils import columnar_sink
+from utils.columnar_sink import ParquetS3Sink
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+def payload(device_id, timestamp, temperature=72.5, alert=False):
+    return {"device_id": device_id, "timestamp": timestamp, "temperature": temperature,
+            "humidity": 45.2, "vibration": 0.12, "alert": alert,
+            "note": "1 Anomalies Detected: High temperature" if alert else "Normal"}
+
+
+@unittest.skipIf(columnar_sink.pa is None, "pyarrow not installed")
+class TestParquetS3Sink(unittest.TestCase):
+    def test_hive_partitioned_typed_chunks(self):
+        sink = ParquetS3Sink()
+        for ts, temp in (("2025-07-08T05-13-21.622484Z", 72.5), ("2025-07-08T23-59-59Z", 96.0)):
+            sink.add("raw/", payload("rack-01", ts, temp, alert=temp > 85), ts, "rack-01", tag="a")
+        sink.add("raw/", payload("rack-01", "x"), "2025-07-09T00-00-01Z", "rack-01")
+        chunks = sorted(sink.drain(), key=lambda c: c["key"])
+        self.assertEqual(
+            [c["key"].rsplit("/", 1)[0] for c in chunks],
+            ["raw/date=2025-07-08/device_id=rack-01", "raw/date=2025-07-09/device_id=rack-01"]
+        )
+        self.assertTrue(chunks[0]["key"].endswith(".parquet"))
+        table = pq.read_table(io.BytesIO(chunks[0]["body"]))
+        self.assertEqual(table.schema.names,
+                         ["timestamp", "temperature", "humidity", "vibration", "alert", "note"])
+        self.assertEqual(str(table.schema.field("timestamp").type), "timestamp[us, tz=UTC]")
+        self.assertEqual(table.column("alert").to_pylist(), [False, True])
+        self.assertEqual(chunks[0]["tags"], ["a", "a"])
+
+    def test_untyped_prefixes_fall_back_to_ndjson(self):
+        sink = ParquetS3Sink()
+        sink.add("invalid/", {"device_id": "rack-03", "temperature": "too hot"},
+                 "2025-07-08T05-13-21Z", "rack-03")
+        chunks = sink.drain()
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0]["key"].startswith("invalid/rack-03/2025-07-08T05/"))
+        self.assertTrue(chunks[0]["key"].endswith(".ndjson.gz"))
+
+
+@unittest.skipIf(columnar_sink.pa is None, "pyarrow not installed")
+class TestUnbatchedParquetWarning(HandlerTestCase):
+    saved_globals = ("sink", "PARQUET_SINK_UNBATCHED")
+
+    def test_single_reading_handler_warns_once(self):
+        lambda_function.sink = ParquetS3Sink()
+        lambda_function.PARQUET_SINK_UNBATCHED = True
+        reading = {"device_id": "rack-01", "temperature": 72.5, "humidity": 45.2,
+                   "vibration": 0.12, "timestamp": "2025-07-08T05:13:21Z"}
+        with self.assertLogs(lambda_function.logger, "WARNING") as logs:
+            lambda_function.lambda_handler(reading, None)
+            lambda_function.lambda_handler(reading, None)
+        warnings = [r for r in logs.records if "one Parquet object per reading" in r.getMessage()]
+        self.assertEqual(len(warnings), 1)
+        # Readings are still stored, one object each
+        self.assertEqual(len(self.s3.keys), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import tempfile
+import utils.config_loader as config_loader
 from utils.config_loader import load_env, load_config
 
 def test_load_env():
@@ -19,6 +22,54 @@ def test_load_config():
         print(f"{key}: {value}")
 
 
+def _write_temp_config(data):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    return path
+
+
+def test_load_config_is_cached():
+    """Warm loads should be served from the cache without re-reading the file."""
+    path = _write_temp_config({"s3_bucket": "first"})
+    original_path = config_loader.CONFIG_PATH
+    config_loader.CONFIG_PATH = path
+    config_loader.clear_config_cache()
+    try:
+        before = config_loader.config_cache_stats()
+        assert load_config(ttl=0, check_mtime=False)["s3_bucket"] == "first"
+        with open(path, "w") as f:
+            json.dump({"s3_bucket": "second"}, f)
+        # Without ttl/mtime checks the cached copy is still served
+        assert load_config(ttl=0, check_mtime=False)["s3_bucket"] == "first"
+        after = config_loader.config_cache_stats()
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 1
+    finally:
+        config_loader.CONFIG_PATH = original_path
+        config_loader.clear_config_cache()
+        os.remove(path)
+
+
+def test_load_config_reloads_on_mtime_change():
+    """With mtime checks enabled, edits to config.json are picked up."""
+    path = _write_temp_config({"s3_bucket": "first"})
+    original_path = config_loader.CONFIG_PATH
+    config_loader.CONFIG_PATH = path
+    config_loader.clear_config_cache()
+    try:
+        assert load_config(check_mtime=True)["s3_bucket"] == "first"
+        with open(path, "w") as f:
+            json.dump({"s3_bucket": "second"}, f)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert load_config(check_mtime=True)["s3_bucket"] == "second"
+    finally:
+        config_loader.CONFIG_PATH = original_path
+        config_loader.clear_config_cache()
+        os.remove(path)
+
+
 if __name__ == "__main__":
     test_load_env()
     test_load_config()
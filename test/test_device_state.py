@@ -0,0 +1,144 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import json
+import random
+import statistics
+import unittest
+from handler_stubs import HandlerTestCase, lambda_function
+from utils.classifier import add_labels
+from utils.device_state import DeviceStateStore, RollingWindow
+
+
+def least_squares_slope(samples):
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    num = sum((t - mean_t) * (v - mean_v) for t, v in samples)
+    return num / sum((t - mean_t) ** 2 for t, _ in samples)
+
+
+class TestRollingWindow(unittest.TestCase):
+    def test_statistics_match_direct_computation_after_wrapping(self):
+        rng = random.Random(7)
+        window = RollingWindow(16)
+        history = []
+        # Epoch-sized times and many evictions exercise the rebasing
+        for i in range(500):
+            sample = (1.75e9 + 5 * i + rng.random(), 70 + rng.gauss(0, 3) + 0.01 * i)
+            window.add(*sample)
+            history.append(sample)
+            recent = history[-16:]
+            if len(recent) >= 2:
+                values = [v for _, v in recent]
+                self.assertAlmostEqual(window.mean(), statistics.fmean(values), places=9)
+                self.assertAlmostEqual(window.variance(), statistics.variance(values), places=6)
+                self.assertAlmostEqual(window.slope(), least_squares_slope(recent), places=6)
+        self.assertEqual(window.samples(), history[-16:])
+
+    def test_old_samples_expire(self):
+        window = RollingWindow(32, max_age=60)
+        for i in range(10):
+            window.add(i * 10.0, float(i))
+        self.assertEqual(window.count, 7)
+        self.assertEqual(window.span(), 60.0)
+        window.add(1000.0, 1.0)
+        self.assertEqual(window.samples(), [(1000.0, 1.0)])
+        self.assertEqual(window.variance(), 0.0)
+
+
+class TestDeviceStateStore(unittest.TestCase):
+    def test_rapid_rise_below_static_threshold(self):
+        store = DeviceStateStore(window=24, zscore_threshold=0)
+        labels = []
+        # 70F to 80F over two minutes, every reading under the 85F limit
+        for i in range(25):
+            labels = store.observe("rack-01", 1000.0 + 5 * i, 70 + i * 10 / 24, 40.0, 0.1)
+        self.assertEqual(labels, ["Rapid temperature rise"])
+
+    def test_noisy_but_flat_readings_do_not_fire(self):
+        store = DeviceStateStore(window=32)
+        rng = random.Random(3)
+        fired = []
+        for i in range(2000):
+            fired += store.observe("rack-01", 5.0 * i, rng.gauss(72, 1.5),
+                                   rng.gauss(45, 2), abs(rng.gauss(0.15, 0.03)))
+        self.assertEqual(fired, [])
+
+    def test_zscore_outlier(self):
+        store = DeviceStateStore(window=32, temp_rise_per_minute=0)
+        for i in range(20):
+            store.observe("rack-01", 5.0 * i, 72 + (i % 3) * 0.5, 45.0 + i % 2, 0.15)
+        self.assertEqual(store.observe("rack-01", 100.0, 72.0, 45.0, 0.9),
+                         ["Unusual vibration"])
+
+    def test_least_recently_seen_device_is_evicted(self):
+        store = DeviceStateStore(window=4, max_devices=2)
+        store.observe("rack-01", 0.0, 70.0, 40.0, 0.1)
+        store.observe("rack-02", 0.0, 70.0, 40.0, 0.1)
+        store.observe("rack-01", 5.0, 70.0, 40.0, 0.1)
+        store.observe("rack-03", 5.0, 70.0, 40.0, 0.1)
+        self.assertEqual(list(store.devices), ["rack-01", "rack-03"])
+
+    def test_snapshot_round_trip(self):
+        store = DeviceStateStore(window=8)
+        for i in range(12):
+            store.observe("rack-01", 5.0 * i, 70.0 + i, 40.0, 0.1)
+        restored = DeviceStateStore(window=8)
+        self.assertEqual(restored.loads(store.dumps()), 1)
+        self.assertEqual(restored.get("rack-01").temperature.samples(),
+                         store.get("rack-01").temperature.samples())
+        self.assertEqual(restored.loads(json.dumps({"version": 99})), 0)
+
+    def test_add_labels_extends_note(self):
+        self.assertEqual(add_labels(0, "Normal", ["Unusual humidity"]),
+                         (1, "1 Anomalies Detected: Unusual humidity"))
+        self.assertEqual(
+            add_labels(1, "1 Anomalies Detected: High temperature", ["Rapid temperature rise"]),
+            (2, "2 Anomalies Detected: High temperature, Rapid temperature rise")
+        )
+
+
+class TestHandlerTrendRules(HandlerTestCase):
+    saved_globals = ("device_state", "DEVICE_STATE_S3_KEY")
+
+    def setUp(self):
+        super().setUp()
+        lambda_function.device_state = DeviceStateStore(window=24, zscore_threshold=0)
+
+    def readings(self, device_id="rack-01"):
+        return [{
+            "device_id": device_id,
+            "temperature": round(70 + i * 10 / 24, 2),
+            "humidity": 40.0,
+            "vibration": 0.1,
+            "timestamp": f"2025-07-08T05:{i * 5 // 60:02d}:{i * 5 % 60:02d}Z",
+        } for i in range(25)]
+
+    def test_single_invocations_flag_rise(self):
+        bodies = [json.loads(lambda_function.lambda_handler(r, None)["body"])
+                  for r in self.readings()]
+        self.assertFalse(bodies[0]["alert"])
+        self.assertTrue(bodies[-1]["alert"])
+        self.assertEqual(bodies[-1]["note"], "1 Anomalies Detected: Rapid temperature rise")
+
+    def test_batch_matches_single_invocations(self):
+        response = lambda_function.batch_handler(self.readings("rack-02"), None)
+        results = json.loads(response["body"])["results"]
+        self.assertTrue(results[-1]["body"]["alert"])
+        self.assertIn("Rapid temperature rise", results[-1]["body"]["note"])
+
+    def test_state_is_saved_and_restored_through_s3(self):
+        lambda_function.DEVICE_STATE_S3_KEY = "state/devices.json"
+        lambda_function.device_state.last_saved = float("-inf")
+        lambda_function.lambda_handler(self.readings()[0], None)
+        self.assertIn("state/devices.json", self.s3.objects)
+
+        lambda_function.device_state = DeviceStateStore(window=24)
+        lambda_function.lambda_handler(self.readings()[1], None)
+        samples = lambda_function.device_state.get("rack-01").temperature.samples()
+        self.assertEqual([v for _, v in samples], [70.0, 70.42])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import json
+import unittest
+from bench_import_time import BASELINE_PATH, measure_imports, summarize
+
+
+class TestHandlerImports(unittest.TestCase):
+    def test_cold_start_imports_match_baseline(self):
+        summary = summarize(measure_imports())
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        self.assertEqual(summary["lazy_modules_loaded"], [])
+        self.assertEqual(
+            sorted(set(summary["direct_imports"]) - set(baseline["direct_imports"])), []
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import math
+import random
+import time
+import unittest
+from contextlib import redirect_stdout
+from simulator.instrumentation import LatencyHistogram, PublishMonitor, RateLimitedLog
+
+
+class FakeInfo:
+    def __init__(self, mid, rc=0):
+        self.mid = mid
+        self.rc = rc
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_relative_error(self):
+        values = [random.Random(i).randint(1, 5_000_000) for i in range(5000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for percent in (50, 90, 99, 99.9):
+            exact = values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+            self.assertLessEqual(abs(histogram.percentile(percent) - exact), exact * 2 / 128 + 1)
+        self.assertEqual(histogram.percentile(100), values[-1])
+        self.assertEqual(histogram.min, values[0])
+
+    def test_small_values_are_exact_and_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for value in range(100):
+            first.record(value)
+        second.record(1000)
+        first.merge(second)
+        self.assertEqual(first.count, 101)
+        self.assertEqual(first.percentile(50), 50)
+        self.assertEqual(first.max, 1000)
+
+    def test_empty(self):
+        self.assertEqual(LatencyHistogram().percentile(99), 0)
+        self.assertEqual(LatencyHistogram().summary(), "n=0")
+
+
+class TestPublishMonitor(unittest.TestCase):
+    def test_ack_latency_and_counters(self):
+        monitor = PublishMonitor()
+        client = object()
+        started = time.perf_counter()
+        monitor.sent("rack-01", "t", "{}", FakeInfo(1), started, client)
+        monitor.sent("rack-02", "t", "{}", FakeInfo(1), started, object())
+        with redirect_stdout(io.StringIO()):
+            monitor.sent("rack-01", "t", "{}", FakeInfo(2, rc=4), started, client)
+        monitor.on_publish(client, None, 1)
+        totals = monitor.totals()
+        self.assertEqual(totals, {"racks": 2, "published": 2, "failed": 1,
+                                  "acked": 1, "unacked": 1})
+        self.assertEqual(monitor.racks["rack-01"].ack_latency.count, 1)
+        self.assertEqual(monitor.call_latency.count, 3)
+
+    def test_ack_before_sent_is_matched(self):
+        monitor = PublishMonitor()
+        client = object()
+        started = time.perf_counter()
+        monitor.on_publish(client, None, 7)
+        monitor.sent("rack-01", "t", "{}", FakeInfo(7), started, client)
+        self.assertEqual(monitor.totals()["acked"], 1)
+        self.assertEqual(monitor.totals()["unacked"], 0)
+
+    def test_final_summary_limits_racks(self):
+        monitor = PublishMonitor()
+        for i in range(20):
+            monitor.sent(f"rack-{i:02d}", "t", "{}", FakeInfo(i), time.perf_counter())
+        lines = monitor.summary_lines(final=True, max_racks=5)
+        self.assertIn("20 published", lines[0])
+        self.assertIn("[Stats] Slowest 5 of 20 racks:", lines)
+        self.assertEqual(len([line for line in lines if line.startswith("[Stats] rack-")]), 5)
+
+
+class TestRateLimitedLog(unittest.TestCase):
+    def test_suppresses_beyond_rate(self):
+        log = RateLimitedLog(rate=5)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            for i in range(100):
+                log(f"line {i}")
+        self.assertLessEqual(len(out.getvalue().splitlines()), 6)
+        self.assertGreaterEqual(log.suppressed, 94)
+
+
+if __name__ == "__main__":
+    unittest.main()
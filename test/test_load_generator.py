@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from simulator.load_generator import LoadGenerator, RateProfile
+
+
+class FakeResult:
+    rc = 0
+
+
+class CountingPublisher:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, qos=0):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.count += 1
+        return FakeResult()
+
+
+class TestRateProfile(unittest.TestCase):
+    def test_profiles(self):
+        self.assertEqual(RateProfile("constant", 100).rate_at(42), 100)
+        ramp = RateProfile("ramp", 100, ramp_seconds=10)
+        self.assertEqual(ramp.rate_at(5), 50)
+        self.assertEqual(ramp.rate_at(20), 100)
+        step = RateProfile("step", 100, steps=4, step_seconds=10)
+        self.assertEqual([step.rate_at(t) for t in (0, 10, 25, 99)], [25, 50, 75, 100])
+        spike = RateProfile("spike", 100, spike_factor=3, spike_seconds=2, spike_every=10)
+        self.assertEqual([spike.rate_at(t) for t in (1, 5, 11)], [300, 100, 300])
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            RateProfile("sine")
+
+    def test_zero_periods_are_rejected(self):
+        for bad in ({"step_seconds": 0}, {"spike_every": 0}, {"spike_every": -5}):
+            with self.assertRaises(ValueError, msg=bad):
+                RateProfile("spike", 100, **bad)
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def run_load(self, publisher, rate, duration, **kwargs):
+        generator = LoadGenerator(publisher, ["rack-01", "rack-02"],
+                                  RateProfile("constant", rate), duration=duration,
+                                  report_interval=0, **kwargs)
+        with redirect_stdout(io.StringIO()):
+            return generator.run(threading.Event())
+
+    def test_holds_target_rate(self):
+        publisher = CountingPublisher()
+        report = self.run_load(publisher, 1000, 1.0)
+        self.assertAlmostEqual(report["sent"], 1000, delta=50)
+        self.assertEqual(publisher.count, report["published"])
+        self.assertAlmostEqual(report["achieved_rate"], 1000, delta=100)
+
+    def test_slow_publisher_does_not_slow_the_schedule(self):
+        # 10 ms per publish on 4 workers tops out around 400/s
+        report = self.run_load(CountingPublisher(delay=0.01), 1000, 0.5, workers=4)
+        self.assertAlmostEqual(report["sent"], 500, delta=50)
+        self.assertLess(report["achieved_rate"], report["target_rate"])
+
+    def test_sheds_beyond_backlog(self):
+        report = self.run_load(CountingPublisher(delay=0.01), 2000, 0.5,
+                               workers=1, max_backlog=50)
+        self.assertGreater(report["shed"], 0)
+        self.assertAlmostEqual(report["sent"] + report["shed"], report["target"], delta=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+from utils import aws_clients
+from utils.metrics import MetricsBuffer
+
+
+class RecordingCloudWatch:
+    def __init__(self):
+        self.calls = []
+
+    def put_metric_data(self, Namespace, MetricData):
+        # botocore only accepts strings as dimension values
+        for datum in MetricData:
+            for dimension in datum["Dimensions"]:
+                if not isinstance(dimension["Value"], str):
+                    raise TypeError("Invalid type for parameter Dimensions.Value")
+        self.calls.append(MetricData)
+
+
+class TestMetricsBuffer(unittest.TestCase):
+    def setUp(self):
+        self.cloudwatch = RecordingCloudWatch()
+        aws_clients.set_client("cloudwatch", self.cloudwatch)
+
+    def tearDown(self):
+        aws_clients.reset_clients()
+
+    def test_points_are_aggregated_into_one_call(self):
+        buffer = MetricsBuffer(mode="api")
+        for _ in range(5):
+            buffer.add("LambdaExecutions", 1, {"DeviceId": "rack-01"})
+        buffer.add("AnomaliesDetected", 2, {"DeviceId": "rack-01"})
+        buffer.add("AnomaliesDetected", 1, {"DeviceId": "rack-01"})
+        self.assertEqual(buffer.flush(), 1)
+        datums = {d["MetricName"]: d for d in self.cloudwatch.calls[0]}
+        self.assertEqual(datums["LambdaExecutions"]["Values"], [1])
+        self.assertEqual(datums["LambdaExecutions"]["Counts"], [5])
+        self.assertEqual(sorted(datums["AnomaliesDetected"]["Values"]), [1, 2])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_non_string_dimension_values_do_not_sink_the_call(self):
+        buffer = MetricsBuffer(mode="api")
+        buffer.add("LambdaExecutions", 1, {"DeviceId": "rack-01"})
+        buffer.add("LambdaExecutions", 1, {"DeviceId": None})
+        buffer.add("LambdaExecutions", 1, {"DeviceId": 5})
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(sorted(d["Dimensions"][0]["Value"] for d in self.cloudwatch.calls[0]),
+                         ["5", "None", "rack-01"])
+
+    def test_many_distinct_values_use_statistic_set(self):
+        buffer = MetricsBuffer(mode="api")
+        for i in range(200):
+            buffer.add("Latency", float(i), {"DeviceId": "rack-01"}, unit="Milliseconds")
+        buffer.flush()
+        stats = self.cloudwatch.calls[0][0]["StatisticValues"]
+        self.assertEqual(stats["SampleCount"], 200)
+        self.assertEqual(stats["Minimum"], 0.0)
+        self.assertEqual(stats["Maximum"], 199.0)
+
+    def test_emf_mode_makes_no_api_calls(self):
+        buffer = MetricsBuffer(mode="emf")
+        buffer.add("LambdaExecutions", 1, {"DeviceId": "rack-01"})
+        buffer.add("LambdaExecutions", 1, {"DeviceId": "rack-01"})
+        out = io.StringIO()
+        with redirect_stdout(out):
+            buffer.flush()
+        self.assertEqual(self.cloudwatch.calls, [])
+        document = json.loads(out.getvalue())
+        self.assertEqual(document["DeviceId"], "rack-01")
+        self.assertEqual(document["LambdaExecutions"], [1, 1])
+        directive = document["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual(directive["Namespace"], "ServerRoomMonitor")
+        self.assertEqual(directive["Dimensions"], [["DeviceId"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
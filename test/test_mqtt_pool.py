@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import unittest
+import paho.mqtt.client as mqtt
+from simulator.instrumentation import PublishMonitor
+from simulator.mqtt_pool import MQTTConnectionPool
+from simulator.simulate_sensors import simulate_rack
+
+
+class FakeInfo:
+    def __init__(self, mid, rc=0):
+        self.rc = rc
+        self.mid = mid
+
+
+class FakeClient:
+    def __init__(self, env_vars):
+        self.published = []
+        self.on_publish = None
+        self.closed = False
+        self.rc = 0
+        self.ack_immediately = False
+
+    def max_inflight_messages_set(self, n):
+        self.max_inflight = n
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append(topic)
+        if self.ack_immediately:
+            self.ack()
+        return FakeInfo(len(self.published), self.rc)
+
+    def ack(self, mid=None):
+        self.on_publish(self, None, mid or len(self.published))
+
+    def loop_stop(self):
+        self.closed = True
+
+    def disconnect(self):
+        pass
+
+
+class TestMQTTConnectionPool(unittest.TestCase):
+    def test_many_racks_share_few_connections(self):
+        pool = MQTTConnectionPool({}, size=3, max_inflight=1000, client_factory=FakeClient)
+        topics = [f"sensors/server-room/rack-{i:04d}" for i in range(500)]
+        for topic in topics * 2:
+            pool.publish(topic, "{}")
+        self.assertEqual(len(pool.clients), 3)
+        for client in pool.clients:
+            # Each topic always lands on the same connection
+            self.assertTrue(all(pool.clients[pool.connection_for(t)] is client
+                                for t in client.published))
+        self.assertEqual(sum(len(c.published) for c in pool.clients), 1000)
+        pool.close()
+        self.assertTrue(all(c.closed for c in pool.clients))
+
+    def test_inflight_limit_per_connection(self):
+        pool = MQTTConnectionPool({}, size=1, max_inflight=2, client_factory=FakeClient)
+        self.assertIsNotNone(pool.try_publish("a", "{}"))
+        self.assertIsNotNone(pool.try_publish("a", "{}"))
+        self.assertIsNone(pool.try_publish("a", "{}"))
+        self.assertEqual(pool.inflight(), [2])
+        pool.clients[0].ack()
+        self.assertEqual(pool.inflight(), [1])
+        self.assertIsNotNone(pool.try_publish("a", "{}"))
+        self.assertIsNone(pool.publish("a", "{}", timeout=0.01))
+
+    def test_queued_while_disconnected_releases_once(self):
+        pool = MQTTConnectionPool({}, size=1, max_inflight=2, client_factory=FakeClient)
+        client = pool.clients[0]
+        client.rc = mqtt.MQTT_ERR_NO_CONN
+        # QoS 0 is dropped, so its slot comes straight back
+        pool.try_publish("a", "{}", qos=0)
+        self.assertEqual(pool.inflight(), [0])
+        # QoS 1 is queued by paho and acked after reconnecting
+        pool.try_publish("a", "{}", qos=1)
+        self.assertEqual(pool.inflight(), [1])
+        client.ack(2)
+        client.ack(2)
+        client.ack(1)
+        self.assertEqual(pool.inflight(), [0])
+        client.rc = 0
+        self.assertIsNotNone(pool.try_publish("a", "{}"))
+        self.assertIsNotNone(pool.try_publish("a", "{}"))
+        self.assertIsNone(pool.try_publish("a", "{}"))
+
+    def test_ack_before_publish_returns(self):
+        pool = MQTTConnectionPool({}, size=1, max_inflight=1, client_factory=FakeClient)
+        pool.clients[0].ack_immediately = True
+        for _ in range(3):
+            self.assertIsNotNone(pool.try_publish("a", "{}"))
+        self.assertEqual(pool.inflight(), [0])
+
+    def test_monitor_ignores_acks_for_failed_publishes(self):
+        monitor = PublishMonitor()
+        client = FakeClient({})
+        client.on_publish = monitor.on_publish
+        client.rc = mqtt.MQTT_ERR_NO_CONN
+        monitor.sent("rack-01", "a", "{}", client.publish("a", "{}", qos=1), 0.0, client)
+        client.ack()
+        self.assertEqual(monitor._early_acks, {})
+        totals = monitor.totals()
+        self.assertEqual((totals["failed"], totals["acked"]), (1, 0))
+
+    def test_threaded_racks_use_the_shared_pool(self):
+        pool = MQTTConnectionPool({}, size=2, max_inflight=100, client_factory=FakeClient)
+        stop = threading.Event()
+        simulate_rack("rack-01", {}, 0, 0, stop, num_messages=3, publisher=pool)
+        self.assertEqual(sum(len(c.published) for c in pool.clients), 3)
+        self.assertFalse(any(c.closed for c in pool.clients))
+
+    def test_acks_reach_the_monitor(self):
+        monitor = PublishMonitor()
+        pool = MQTTConnectionPool({}, size=1, max_inflight=100, client_factory=FakeClient,
+                                  on_publish=monitor.on_publish)
+        stop = threading.Event()
+        simulate_rack("rack-01", {}, 0, 0, stop, num_messages=1, publisher=pool,
+                      qos=1, monitor=monitor)
+        pool.clients[0].ack()
+        totals = monitor.totals()
+        self.assertEqual((totals["published"], totals["acked"], totals["unacked"]), (1, 1, 0))
+        self.assertEqual(monitor.racks["rack-01"].ack_latency.count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
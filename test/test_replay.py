@@ -0,0 +1,159 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+import simulator.replay as replay_module
+from simulator.replay import iter_recording, replay, to_sensor_reading
+
+try:
+    from utils.columnar_sink import ParquetS3Sink, pa
+except ImportError:
+    pa = None
+
+TEST_INPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'test_inputs')
+
+
+class FakeResult:
+    rc = 0
+
+
+class CollectingPublisher:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, topic, payload, qos=0):
+        self.messages.append((topic, json.loads(payload)))
+        return FakeResult()
+
+
+def reading(device_id, second):
+    return {"device_id": device_id, "temperature": 70.0, "humidity": 40.0,
+            "vibration": 0.1, "timestamp": f"2025-07-08T05:13:{second:06.3f}Z"}
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_ndjson(self, readings):
+        path = os.path.join(self.tmp.name, "capture.ndjson.gz")
+        with gzip.open(path, "wt") as f:
+            for r in readings:
+                f.write(json.dumps(r) + "\n")
+        return path
+
+    def run_replay(self, path, speed):
+        publisher = CollectingPublisher()
+        start = time.monotonic()
+        replay(iter_recording(path), publisher, threading.Event(), speed=speed)
+        return publisher.messages, time.monotonic() - start
+
+    def test_keeps_inter_arrival_times_scaled(self):
+        path = self.write_ndjson([reading("rack-01", i * 0.1) for i in range(5)])
+        messages, elapsed = self.run_replay(path, speed=2)
+        self.assertEqual(len(messages), 5)
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertLess(elapsed, 1.0)
+        _, fast = self.run_replay(path, speed=0)
+        self.assertLess(fast, 0.1)
+
+    def test_stored_raw_payloads_replay_as_sensor_messages(self):
+        for device_id, seconds in (("rack-01", (0, 2)), ("rack-02", (1, 3))):
+            folder = os.path.join(self.tmp.name, "raw", device_id)
+            os.makedirs(folder)
+            for second in seconds:
+                stored = reading(device_id, second)
+                stored["timestamp"] = f"2025-07-08T05-13-{second:02d}Z"
+                stored.update(alert=False, note="Normal")
+                with open(os.path.join(folder, f"{stored['timestamp']}.json"), "w") as f:
+                    json.dump(stored, f)
+        messages, _ = self.run_replay(os.path.join(self.tmp.name, "raw"), speed=0)
+        # Devices are merged back into time order
+        self.assertEqual([m["device_id"] for _, m in messages],
+                         ["rack-01", "rack-02", "rack-01", "rack-02"])
+        self.assertEqual(messages[0][1]["timestamp"], "2025-07-08T05:13:00Z")
+        self.assertNotIn("alert", messages[0][1])
+        self.assertEqual(messages[1][0], "sensors/server-room/rack-02")
+
+    def test_directory_opens_chunks_as_the_replay_reaches_them(self):
+        for device_id in ("rack-01", "rack-02", "rack-03"):
+            for hour in range(10):
+                folder = os.path.join(self.tmp.name, "raw", device_id, f"2025-07-08T{hour:02d}")
+                os.makedirs(folder)
+                with open(os.path.join(folder, f"2025-07-08T{hour:02d}-10-00Z_ab.ndjson"), "w") as f:
+                    for minute in (10, 30, 50):
+                        stored = reading(device_id, 0)
+                        stored["timestamp"] = f"2025-07-08T{hour:02d}:{minute}:00Z"
+                        f.write(json.dumps(stored) + "\n")
+        open_files = []
+        peak = []
+        original = replay_module.iter_file
+
+        def counting(path):
+            open_files.append(path)
+            peak.append(len(open_files))
+            try:
+                yield from original(path)
+            finally:
+                open_files.remove(path)
+
+        replay_module.iter_file = counting
+        try:
+            records = list(iter_recording(os.path.join(self.tmp.name, "raw")))
+        finally:
+            replay_module.iter_file = original
+        self.assertEqual(len(records), 90)
+        times = [when for when, _ in records]
+        self.assertEqual(times, sorted(times))
+        # One hour chunk per device at a time, not one per folder
+        self.assertEqual(max(peak), 3)
+
+    def test_test_inputs_directory(self):
+        with redirect_stdout(io.StringIO()):
+            messages, _ = self.run_replay(TEST_INPUT_DIR, speed=0)
+        self.assertEqual(len(messages), len(os.listdir(TEST_INPUT_DIR)))
+
+    def test_stop_event_interrupts_a_wait(self):
+        path = self.write_ndjson([reading("rack-01", 0), reading("rack-01", 30)])
+        stop = threading.Event()
+        threading.Timer(0.1, stop.set).start()
+        publisher = CollectingPublisher()
+        start = time.monotonic()
+        count = replay(iter_recording(path), publisher, stop, speed=1)
+        self.assertEqual(count, 1)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_unparsable_timestamp_is_sent_immediately(self):
+        when, message = to_sensor_reading({"device_id": "x", "timestamp": "garbage"})
+        self.assertIsNone(when)
+        self.assertEqual(message["timestamp"], "garbage")
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed")
+    def test_parquet_partition(self):
+        sink = ParquetS3Sink()
+        for i in range(3):
+            payload = dict(reading("rack-07", i), alert=False, note="Normal")
+            sink.add("raw/", payload, f"2025-07-08T05-13-{i:02d}Z", "rack-07")
+        chunk = sink.drain(force=True)[0]
+        path = os.path.join(self.tmp.name, chunk["key"])
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(chunk["body"])
+        messages, _ = self.run_replay(self.tmp.name, speed=0)
+        self.assertEqual([m["device_id"] for _, m in messages], ["rack-07"] * 3)
+        self.assertEqual(messages[2][1]["timestamp"], "2025-07-08T05:13:02Z")
+        self.assertEqual(messages[0][1]["temperature"], 70.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
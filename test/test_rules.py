@@ -0,0 +1,136 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import json
+import random
+import unittest
+from handler_stubs import HandlerTestCase, lambda_function
+from utils import classifier
+from utils.classifier import classify_batch, classify_reading
+from utils.rules import DEFAULT_INDEX, DEFAULT_RULES, RuleIndex, rules_from_config
+
+OVERRIDES = {
+    "lab-": {"High temperature": {"bound": 90}},
+    "lab-7": {"Excessive vibration": {"enabled": False}},
+    "rack-": {"Hot spot": {"metric": "temperature", "comparator": ">=", "bound": 80}},
+}
+
+
+def hard_coded(temperature, humidity, vibration):
+    # The checks the rule engine replaced
+    note = []
+    if temperature > 85:
+        note.append("High temperature")
+    if humidity < 20:
+        note.append("Low humidity")
+    elif humidity > 60:
+        note.append("High humidity")
+    if vibration > 0.5:
+        note.append("Excessive vibration")
+    if not note:
+        return 0, "Normal"
+    return len(note), f"{len(note)} Anomalies Detected: {', '.join(note)}"
+
+
+class TestRules(unittest.TestCase):
+    def test_default_rules_match_hard_coded_checks(self):
+        temps = [0.0, 84.99, 85.0, 85.01, 200.0, float("nan")]
+        hums = [0.0, 19.99, 20.0, 60.0, 60.01, 100.0, float("nan")]
+        vibs = [0.0, 0.5, 0.51, 5.0, float("nan")]
+        for t in temps:
+            for h in hums:
+                for v in vibs:
+                    self.assertEqual(classify_reading(t, h, v), hard_coded(t, h, v), (t, h, v))
+
+    def test_overrides_by_prefix(self):
+        index = RuleIndex(DEFAULT_RULES, OVERRIDES)
+        self.assertEqual(index.for_device("lab-1").classify(88.0, 40.0, 0.9),
+                         (1, "1 Anomalies Detected: Excessive vibration"))
+        # lab-7x gets both lab- and lab-7 overrides
+        self.assertEqual(index.for_device("lab-71").classify(88.0, 40.0, 0.9), (0, "Normal"))
+        self.assertEqual(index.for_device("rack-01").classify(82.0, 40.0, 0.1),
+                         (1, "1 Anomalies Detected: Hot spot"))
+        self.assertIs(index.for_device("room-2"), index.default)
+        self.assertIs(index.for_device(None), index.default)
+
+    def test_identical_rule_lists_share_one_rule_set(self):
+        index = RuleIndex(DEFAULT_RULES, {
+            "lab-": {"High temperature": {"bound": 90}},
+            "lab-9": {"Excessive vibration": {"bound": 0.5}},
+            "cold-": {"High temperature": {"bound": 90.0}},
+            "rack-": {"Hot spot": {"metric": "temperature", "comparator": ">", "bound": 80,
+                                   "enabled": False}},
+        })
+        self.assertIs(index.for_device("lab-1"), index.for_device("lab-91"))
+        self.assertIs(index.for_device("lab-1"), index.for_device("cold-1"))
+        self.assertIs(index.for_device("rack-01"), index.default)
+
+    def test_group_keeps_elif_semantics(self):
+        index = RuleIndex(DEFAULT_RULES, {"wet-": {"Low humidity": {"bound": 70}}})
+        self.assertEqual(index.for_device("wet-1").classify(70.0, 65.0, 0.1),
+                         (1, "1 Anomalies Detected: Low humidity"))
+
+    def test_invalid_rules_are_rejected(self):
+        bad = [
+            {"label": "x", "metric": "pressure", "comparator": ">", "bound": 1},
+            {"label": "x", "metric": "temperature", "comparator": "==", "bound": 1},
+            {"label": "x", "metric": "temperature", "comparator": ">", "bound": "85"},
+            {"label": "x", "metric": "temperature", "comparator": ">", "bound": float("inf")},
+            {"label": "x", "metric": "temperature", "comparator": ">", "bound": 1, "extra": 1},
+        ]
+        for rule in bad:
+            with self.assertRaises(ValueError, msg=rule):
+                RuleIndex([rule])
+        with self.assertRaises(ValueError):
+            RuleIndex(DEFAULT_RULES, {"lab-": {"High temperature": {"metric": "__import__"}}})
+
+    def test_config_is_compiled_once(self):
+        config = {"rules": list(DEFAULT_RULES), "rule_overrides": OVERRIDES}
+        self.assertIs(rules_from_config(config), rules_from_config(config))
+        self.assertIsNot(rules_from_config(dict(config)), rules_from_config(config))
+        self.assertIs(rules_from_config({"s3_bucket": "b"}), DEFAULT_INDEX)
+
+    @unittest.skipIf(not classifier.HAS_NUMPY, "numpy not installed")
+    def test_batch_with_overrides_matches_scalar(self):
+        index = RuleIndex(DEFAULT_RULES, dict(OVERRIDES, **{
+            f"rack-{i:02d}": {"High humidity": {"bound": 50 + i}} for i in range(20)}))
+        rng = random.Random(99)
+        devices = [f"rack-{i:02d}" for i in range(25)] + ["lab-1", "lab-71", "room-1"]
+        readings = [(rng.uniform(60, 100), rng.uniform(10, 80), rng.uniform(0, 1),
+                     rng.choice(devices)) for _ in range(3000)]
+        t, h, v, ids = zip(*readings)
+        result = classify_batch(t, h, v, rules=index, device_ids=ids)
+        for i, (temperature, humidity, vibration, device_id) in enumerate(readings):
+            expected = index.for_device(device_id).classify(temperature, humidity, vibration)
+            self.assertEqual((int(result["num_anomalies"][i]), result["note"][i]), expected)
+            self.assertEqual(bool(result["hot_spot"][i]),
+                             "Hot spot" in expected[1], device_id)
+
+
+class TestHandlerRules(HandlerTestCase):
+    config = {"s3_bucket": "test-bucket", "rule_overrides": OVERRIDES}
+
+    def reading(self, device_id, temperature):
+        return {"device_id": device_id, "temperature": temperature, "humidity": 40.0,
+                "vibration": 0.1, "timestamp": "2025-07-08T05:13:21Z"}
+
+    def test_single_and_batch_use_device_rules(self):
+        body = json.loads(lambda_function.lambda_handler(self.reading("lab-1", 88.0), None)["body"])
+        self.assertFalse(body["alert"])
+        event = [self.reading(device_id, 88.0)
+                 for device_id in ["lab-1", "room-1", "rack-01"] * 10]
+        results = json.loads(lambda_function.batch_handler(event, None)["body"])["results"]
+        self.assertEqual([r["body"]["note"] for r in results[:3]], [
+            "Normal",
+            "1 Anomalies Detected: High temperature",
+            "2 Anomalies Detected: High temperature, Hot spot",
+        ])
+
+    def test_invalid_rules_fail_the_invocation(self):
+        self.config = {"rules": [{"label": "x", "metric": "temperature"}]}
+        response = lambda_function.lambda_handler(self.reading("lab-1", 88.0), None)
+        self.assertEqual(response["statusCode"], 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gzip
+import json
+import unittest
+from utils.s3_sink import BufferedS3Sink
+
+
+def reading(device_id, timestamp, temperature=72.5):
+    return {"device_id": device_id, "timestamp": timestamp, "temperature": temperature}
+
+
+class TestBufferedS3Sink(unittest.TestCase):
+    def test_records_are_partitioned_by_prefix_device_and_hour(self):
+        sink = BufferedS3Sink()
+        for ts in ("2025-07-08T05-13-21Z", "2025-07-08T05-14-21Z", "2025-07-08T06-00-01Z"):
+            sink.add("raw/", reading("rack-01", ts), ts, "rack-01")
+        sink.add("alerts/", reading("rack-01", "2025-07-08T05-13-21Z"),
+                 "2025-07-08T05-13-21Z", "rack-01")
+        chunks = sorted(sink.drain(), key=lambda c: c["key"])
+        self.assertEqual(
+            [c["key"].rsplit("/", 1)[0] for c in chunks],
+            ["alerts/rack-01/2025-07-08T05", "raw/rack-01/2025-07-08T05",
+             "raw/rack-01/2025-07-08T06"]
+        )
+        self.assertEqual([c["records"] for c in chunks], [1, 2, 1])
+        self.assertTrue(chunks[1]["key"].split("/")[-1].startswith("2025-07-08T05-13-21Z_"))
+        lines = chunks[1]["body"].decode().splitlines()
+        self.assertEqual([json.loads(line)["timestamp"] for line in lines],
+                         ["2025-07-08T05-13-21Z", "2025-07-08T05-14-21Z"])
+        self.assertEqual(sink.pending(), 0)
+
+    def test_gzip_chunks(self):
+        sink = BufferedS3Sink(compress=True)
+        sink.add("raw/", reading("rack-01", "t"), "2025-07-08T05-13-21Z", "rack-01", tag="m-1")
+        chunk = sink.drain()[0]
+        self.assertTrue(chunk["key"].endswith(".ndjson.gz"))
+        self.assertEqual(json.loads(gzip.decompress(chunk["body"]))["device_id"], "rack-01")
+        self.assertEqual(chunk["tags"], ["m-1"])
+
+    def test_partitions_are_held_until_size_or_age_threshold(self):
+        sink = BufferedS3Sink(max_bytes=200, max_age_seconds=3600)
+        sink.add("raw/", reading("rack-01", "t"), "2025-07-08T05-13-21Z", "rack-01")
+        self.assertEqual(sink.drain(), [])
+        for _ in range(5):
+            sink.add("raw/", reading("rack-01", "t"), "2025-07-08T05-13-21Z", "rack-01")
+        chunks = sink.drain()
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]["records"], 6)
+        sink.add("raw/", reading("rack-02", "t"), "2025-07-08T05-13-21Z", "rack-02")
+        self.assertEqual(len(sink.drain(force=True)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import json
+import threading
+import time
+import unittest
+from handler_stubs import HandlerTestCase, lambda_function
+from utils.side_effects import run_side_effects
+
+
+class TestSideEffects(unittest.TestCase):
+    def test_effects_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=2)
+        effects = [(name, barrier.wait, ()) for name in ("raw", "alerts", "sns")]
+        # Would time out on the barrier if the effects ran one after another
+        self.assertEqual(run_side_effects(effects), {})
+
+    def test_errors_are_collected_per_effect(self):
+        done = []
+
+        def fail():
+            raise RuntimeError("AccessDenied")
+
+        def slow():
+            time.sleep(0.05)
+            done.append("raw")
+
+        errors = run_side_effects([("raw", slow, ()), ("sns", fail, ())])
+        self.assertEqual(list(errors), ["sns"])
+        self.assertIsInstance(errors["sns"], RuntimeError)
+        self.assertEqual(done, ["raw"])
+
+    def test_single_effect_runs_inline(self):
+        caller = []
+        run_side_effects([("raw", lambda: caller.append(threading.current_thread()), ())])
+        self.assertIs(caller[0], threading.current_thread())
+
+
+class TestHandlerSideEffectErrors(HandlerTestCase):
+    def test_failed_put_object_fails_the_invocation(self):
+        self.s3.fail_prefix = "alerts/"
+        reading = {"device_id": "rack-01", "temperature": 96.0, "humidity": 40.0,
+                   "vibration": 0.1, "timestamp": "2025-07-08T05:13:21Z"}
+        response = lambda_function.lambda_handler(reading, None)
+        self.assertEqual(response["statusCode"], 500)
+        body = json.loads(response["body"])
+        self.assertEqual(body["errors"], {"alerts": "SlowDown"})
+        self.assertTrue(body["alert"])
+
+
+if __name__ == "__main__":
+    unittest.main()
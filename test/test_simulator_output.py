@@ -3,7 +3,9 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import unittest
 import json
-from simulator.simulate_sensors import generate_payload
+import random
+from datetime import datetime, timezone
+from simulator.simulate_sensors import generate_payload, rack_rng
 
 
 class TestSensorSimulator(unittest.TestCase):
@@ -37,6 +39,18 @@ class TestSensorSimulator(unittest.TestCase):
         except TypeError:
             self.fail("Payload is not JSON serializable")
 
+    def test_seeded_payload_is_reproducible(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        first = [generate_payload("rack-01", 0.5, rack_rng(42, "rack-01"), now) for _ in range(3)]
+        second = [generate_payload("rack-01", 0.5, rack_rng(42, "rack-01"), now) for _ in range(3)]
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]["timestamp"], "2025-01-01T00:00:00Z")
+
+    def test_rack_streams_are_independent(self):
+        self.assertIs(rack_rng(None, "rack-01"), random)
+        self.assertNotEqual(rack_rng(42, "rack-01").random(), rack_rng(42, "rack-02").random())
+        self.assertNotEqual(rack_rng(42, "rack-01").random(), rack_rng(43, "rack-01").random())
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+import unittest
+import lambda_deploy.lambda_function as lambda_function
+from simulator.simulate_sensors import generate_payload
+from simulator.sinks import FileSink, HandlerSink, open_sink
+from utils import aws_clients
+
+
+class TestFileSink(unittest.TestCase):
+    def test_gzip_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.ndjson.gz")
+            sink = FileSink(path)
+            payloads = [json.dumps(generate_payload(f"rack-{i:02d}")) for i in range(5)]
+            mids = [sink.publish("t", payload).mid for payload in payloads]
+            sink.close()
+            with gzip.open(path, "rt") as f:
+                self.assertEqual(f.read().splitlines(), payloads)
+        self.assertEqual(mids, [1, 2, 3, 4, 5])
+
+    def test_stream(self):
+        stream = io.BytesIO()
+        sink = FileSink(stream=stream)
+        self.assertEqual(sink.publish("t", '{"a": 1}').rc, 0)
+        sink.close()
+        self.assertEqual(stream.getvalue(), b'{"a": 1}\n')
+
+    def test_unknown_sink(self):
+        with self.assertRaises(ValueError):
+            open_sink("kafka://localhost")
+
+
+class TestHandlerSink(unittest.TestCase):
+    def setUp(self):
+        self.original_load_config = lambda_function.load_config
+        os.environ.pop("SNS_TOPIC_ARN", None)
+
+    def tearDown(self):
+        aws_clients.reset_clients()
+        lambda_function.load_config = self.original_load_config
+
+    def test_invokes_handler_per_message(self):
+        sink = HandlerSink(config={"s3_bucket": "offline"})
+        for i in range(3):
+            result = sink.publish("t", json.dumps(generate_payload(anomaly_rate=0.0)))
+            self.assertEqual(result.rc, 0)
+        self.assertEqual(sink.invocations, 3)
+        self.assertEqual(sink.aws_clients["s3"].calls["put_object"], 3)
+
+    def test_handler_calls_do_not_overlap(self):
+        sink = HandlerSink(config={"s3_bucket": "offline"})
+        original = lambda_function.lambda_handler
+        running = []
+        peak = []
+
+        def tracked(event, context):
+            running.append(1)
+            peak.append(len(running))
+            time.sleep(0.001)
+            running.pop()
+            return original(event, context)
+
+        lambda_function.lambda_handler = tracked
+        try:
+            threads = [threading.Thread(target=lambda: [
+                sink.publish("t", json.dumps(generate_payload())) for _ in range(5)])
+                for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            lambda_function.lambda_handler = original
+        self.assertEqual(sink.invocations, 40)
+        self.assertEqual(max(peak), 1)
+
+    def test_batches(self):
+        sink = HandlerSink(batch_size=4, config={"s3_bucket": "offline"})
+        for i in range(10):
+            sink.publish("t", json.dumps(generate_payload()))
+        self.assertEqual(sink.invocations, 2)
+        sink.close()
+        self.assertEqual(sink.invocations, 3)
+        self.assertEqual(sink.errors, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+from datetime import datetime, timezone
+import dateutil.parser
+from dateutil.parser import parse as parse_datetime
+from utils.timestamps import normalize_timestamp, parse_key_timestamp
+
+
+def dateutil_key(raw):
+    """The original handler path."""
+    return (
+        parse_datetime(raw)
+        .astimezone(timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z")
+        .replace(":", "-")
+    )
+
+
+class TestNormalizeTimestamp(unittest.TestCase):
+    def test_matches_dateutil(self):
+        samples = [
+            "2025-07-08T05:13:21.622484Z",
+            "2025-07-08T05:17:00.000000Z",
+            "2025-07-08T05:17:00Z",
+            "2025-07-08T05:17:00.5Z",
+            "2025-07-08T05:17:00.123Z",
+            "2025-07-08T05:17:00+00:00",
+            "2025-07-08T07:17:00.250+02:00",
+            "2025-07-07T23:47:00-05:30",
+            "2025-07-08 05:17:00Z",
+            "2025-07-08T05:17Z",
+            "July 8 2025 5:17am UTC",
+            "2025/07/08 05:17:00Z",
+        ]
+        for raw in samples:
+            self.assertEqual(normalize_timestamp(raw), dateutil_key(raw), raw)
+
+    def test_unparseable_timestamps_still_raise(self):
+        for raw in ("not a timestamp", "2025-13-08T05:17:00Z", "2025-07-08T24:17:00Z", None):
+            with self.assertRaises(Exception):
+                normalize_timestamp(raw)
+
+    def test_fallback_results_are_not_cached(self):
+        # dateutil fills a bare time in from today's date
+        original = dateutil.parser.parse
+        try:
+            for day in (8, 9):
+                dateutil.parser.parse = lambda raw: datetime(2025, 7, day, 10, 30,
+                                                             tzinfo=timezone.utc)
+                self.assertEqual(normalize_timestamp("10:30 UTC"), f"2025-07-0{day}T10-30-00Z")
+        finally:
+            dateutil.parser.parse = original
+
+    def test_parse_key_timestamp_round_trip(self):
+        self.assertEqual(parse_key_timestamp("2025-07-08T05-13-21.622484Z").microsecond, 622484)
+        self.assertEqual(parse_key_timestamp("2025-07-08T05-16-00Z").minute, 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+# Alert aggregation for SNS. Instead of one Publish per anomalous reading,
+# alerts are buffered per topic and drained at the end of an invocation
+# or batch as:
+#
+#   - digests: one message per topic holding every alert, split so each
+#     message stays under the SNS size limit (ALERT_DIGEST=1), and/or
+#   - PublishBatch calls carrying up to 10 messages each
+#     (SNS_PUBLISH_BATCH=1), where the whole request must also fit in
+#     the size limit.
+#
+# A CRAC failure that trips 200 racks in one batch then costs one or a few
+# API calls instead of 200.
+
+# SNS limit for a message, and for all entries of a PublishBatch request
+MAX_MESSAGE_BYTES = 256 * 1024
+# Room left for the subject, entry ids and request framing
+MESSAGE_MARGIN_BYTES = 1024
+PUBLISH_BATCH_SIZE = 10
+
+ALERT_SUBJECT = "⚠️ Sensor Alert Detected"
+
+
+def _size(text):
+    return len(text.encode("utf-8"))
+
+
+class AlertAggregator:
+    """Buffers alerts per topic and hands them out as ready-to-send messages.
+
+    With ``digest`` every drained topic becomes as few messages as the
+    size limit allows; without it each alert stays its own message. A
+    topic is drained once its oldest alert is ``max_age_seconds`` old, so
+    with the default of 0 every drain() empties the buffer, which is the
+    safe choice in Lambda where a frozen container may never run again.
+    """
+
+    def __init__(self, digest=True, max_bytes=MAX_MESSAGE_BYTES - MESSAGE_MARGIN_BYTES,
+                 max_age_seconds=0):
+        self.digest = digest
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def add(self, topic_arn, subject, alert, tag=None):
+        """Buffer one alert (a JSON-serializable dict). ``tag`` identifies its record."""
+        body = json.dumps(alert, separators=(",", ":"))
+        with self._lock:
+            pending = self._topics.get(topic_arn)
+            if pending is None:
+                pending = {"alerts": [], "opened_at": time.monotonic()}
+                self._topics[topic_arn] = pending
+            pending["alerts"].append((subject, body, tag, alert.get("device_id")))
+
+    def pending(self):
+        """Return the number of buffered alerts."""
+        with self._lock:
+            return sum(len(p["alerts"]) for p in self._topics.values())
+
+    def drain(self, force=False):
+        """Remove ready topics from the buffer and return their messages.
+
+        Each message is a dict with ``topic_arn``, ``subject``, ``message``,
+        ``alerts`` (how many it carries) and the ``tags`` of those alerts.
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for topic_arn, pending in list(self._topics.items()):
+                if (force or not self.max_age_seconds
+                        or now - pending["opened_at"] >= self.max_age_seconds):
+                    ready.append((topic_arn, self._topics.pop(topic_arn)["alerts"]))
+        messages = []
+        for topic_arn, alerts in ready:
+            if self.digest:
+                messages.extend(self._pack(topic_arn, alerts))
+            else:
+                messages.extend(_message(topic_arn, subject, body, 1, [tag])
+                                for subject, body, tag, _ in alerts)
+        return messages
+
+    def _pack(self, topic_arn, alerts):
+        # Greedy packing in arrival order. Alerts are compact JSON, so the
+        # digest size is the sum of the parts plus the envelope.
+        messages = []
+        group = []
+        size = 0
+        for alert in alerts:
+            part_size = _size(alert[1]) + 1
+            if group and size + part_size + _envelope_size(len(group) + 1) > self.max_bytes:
+                messages.append(_digest(topic_arn, group))
+                group = []
+                size = 0
+            group.append(alert)
+            size += part_size
+        if group:
+            messages.append(_digest(topic_arn, group))
+        return messages
+
+
+def _envelope_size(count):
+    return len('{"count":,"devices":,"alerts":[]}') + len(str(count)) * 2
+
+
+def _digest(topic_arn, group):
+    tags = [alert[2] for alert in group]
+    if len(group) == 1:
+        return _message(topic_arn, group[0][0], group[0][1], 1, tags)
+    devices = {alert[3] for alert in group}
+    subjects = {alert[0] for alert in group}
+    subject = f"{len(group)} sensor alerts from {len(devices)} devices"
+    if ALERT_SUBJECT in subjects:
+        subject = f"⚠️ {subject}"
+    message = (f'{{"count":{len(group)},"devices":{len(devices)},"alerts":['
+               + ",".join(alert[1] for alert in group) + "]}")
+    return _message(topic_arn, subject, message, len(group), tags)
+
+
+def _message(topic_arn, subject, message, alerts, tags):
+    return {"topic_arn": topic_arn, "subject": subject, "message": message,
+            "alerts": alerts, "tags": [tag for tag in tags if tag is not None]}
+
+
+def group_calls(messages, use_batch, max_bytes=MAX_MESSAGE_BYTES - MESSAGE_MARGIN_BYTES):
+    """Split messages into the lists that go out in one SNS call each.
+
+    Without ``use_batch`` every message is its own call. With it, messages
+    for the same topic share a PublishBatch call, up to 10 per call and
+    within the request size limit.
+    """
+    if not use_batch:
+        return [[message] for message in messages]
+    calls = []
+    open_calls = {}
+    for message in messages:
+        size = _size(message["message"]) + _size(message["subject"])
+        current = open_calls.get(message["topic_arn"])
+        if (current is None or len(current[0]) >= PUBLISH_BATCH_SIZE
+                or current[1] + size > max_bytes):
+            current = [[], 0]
+            open_calls[message["topic_arn"]] = current
+            calls.append(current[0])
+        current[0].append(message)
+        current[1] += size
+    return calls
+
+
+def publish_call(sns_client, messages):
+    """Send one call's messages: Publish for one, PublishBatch for several.
+
+    Raises if SNS rejected any of them.
+    """
+    if len(messages) == 1:
+        message = messages[0]
+        sns_client.publish(TopicArn=message["topic_arn"], Subject=message["subject"],
+                           Message=message["message"])
+        return
+    response = sns_client.publish_batch(
+        TopicArn=messages[0]["topic_arn"],
+        PublishBatchRequestEntries=[
+            {"Id": str(index), "Subject": message["subject"], "Message": message["message"]}
+            for index, message in enumerate(messages)
+        ]
+    )
+    failed = response.get("Failed", [])
+    if failed:
+        codes = sorted({entry.get("Code", "unknown") for entry in failed})
+        raise RuntimeError(f"{len(failed)} of {len(messages)} SNS messages failed: "
+                           f"{', '.join(codes)}")
+
+
+def aggregator_from_env():
+    """Build the aggregator configured by ALERT_DIGEST / SNS_PUBLISH_BATCH, or None."""
+    digest = os.getenv("ALERT_DIGEST", "0") in ("1", "true", "True")
+    if not digest and not publish_batch_from_env():
+        return None
+    return AlertAggregator(
+        digest=digest,
+        max_age_seconds=float(os.getenv("ALERT_DIGEST_MAX_AGE_SECONDS", "0")),
+    )
+
+
+def publish_batch_from_env():
+    return os.getenv("SNS_PUBLISH_BATCH", "0") in ("1", "true", "True")
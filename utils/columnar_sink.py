@@ -0,0 +1,120 @@
+import io
+import threading
+import time
+import uuid
+from utils.s3_sink import BufferedS3Sink
+from utils.timestamps import parse_key_timestamp
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional: only needed when S3_SINK_MODE=parquet. Provide it through
+    # a Lambda layer (e.g. AWS SDK for pandas) rather than the bundle.
+    pa = None
+    pq = None
+
+# Columnar S3 sink. Processed payloads are written as Parquet files
+# partitioned Hive-style so Athena can prune by date and device:
+#
+#   {prefix}date=YYYY-MM-DD/device_id={device_id}/{first_timestamp}_{suffix}.parquet
+#
+# device_id is a partition column, so it is carried by the path and not
+# repeated inside the file (Athena rejects columns that shadow partitions).
+TYPED_PREFIXES = ("raw/", "alerts/")
+
+
+def parquet_schema():
+    """Return the Arrow schema of the columns stored in each Parquet file."""
+    return pa.schema([
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("temperature", pa.float64()),
+        ("humidity", pa.float64()),
+        ("vibration", pa.float64()),
+        ("alert", pa.bool_()),
+        ("note", pa.string()),
+    ])
+
+
+class ParquetS3Sink:
+    """Buffers processed payloads and hands them out as Parquet chunks.
+
+    Payloads under ``typed_prefixes`` (raw/ and alerts/) are stored
+    column-wise. Anything else, such as invalid/ payloads that do not fit
+    the schema, goes to an NDJSON ``fallback`` sink. Thresholds behave as in
+    BufferedS3Sink.
+    """
+
+    def __init__(self, compression="snappy", max_records=100000,
+                 max_age_seconds=0, typed_prefixes=TYPED_PREFIXES,
+                 fallback=None):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for the parquet sink")
+        self.compression = compression
+        self.max_records = max_records
+        self.max_age_seconds = max_age_seconds
+        self.typed_prefixes = tuple(typed_prefixes)
+        self.fallback = fallback or BufferedS3Sink(
+            compress=True, max_age_seconds=max_age_seconds
+        )
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    def add(self, prefix, payload, timestamp, device_id, tag=None):
+        """Buffer one payload. ``tag`` identifies the record in drained chunks."""
+        if prefix not in self.typed_prefixes:
+            self.fallback.add(prefix, payload, timestamp, device_id, tag=tag)
+            return
+        key = (prefix, timestamp[:10], device_id)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = {
+                    "columns": {name: [] for name in parquet_schema().names},
+                    "tags": [],
+                    "first_timestamp": timestamp,
+                    "opened_at": time.monotonic(),
+                }
+                self._partitions[key] = partition
+            columns = partition["columns"]
+            columns["timestamp"].append(parse_key_timestamp(timestamp))
+            columns["temperature"].append(payload["temperature"])
+            columns["humidity"].append(payload["humidity"])
+            columns["vibration"].append(payload["vibration"])
+            columns["alert"].append(payload["alert"])
+            columns["note"].append(payload["note"])
+            if tag is not None:
+                partition["tags"].append(tag)
+
+    def pending(self):
+        """Return the number of buffered records."""
+        with self._lock:
+            typed = sum(len(p["columns"]["timestamp"]) for p in self._partitions.values())
+        return typed + self.fallback.pending()
+
+    def drain(self, force=False):
+        """Remove ready partitions from the buffer and return them as chunks."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for key, partition in list(self._partitions.items()):
+                if (force or not self.max_age_seconds
+                        or len(partition["columns"]["timestamp"]) >= self.max_records
+                        or now - partition["opened_at"] >= self.max_age_seconds):
+                    ready.append((key, self._partitions.pop(key)))
+        chunks = [self._build_chunk(key, partition) for key, partition in ready]
+        return chunks + self.fallback.drain(force=force)
+
+    def _build_chunk(self, key, partition):
+        prefix, date, device_id = key
+        table = pa.Table.from_pydict(partition["columns"], schema=parquet_schema())
+        out = io.BytesIO()
+        pq.write_table(table, out, compression=self.compression)
+        name = f"{partition['first_timestamp']}_{uuid.uuid4().hex[:8]}.parquet"
+        return {
+            "key": f"{prefix}date={date}/device_id={device_id}/{name}",
+            "body": out.getvalue(),
+            "records": table.num_rows,
+            "tags": partition["tags"],
+            "content_type": "application/vnd.apache.parquet",
+        }
@@ -1,12 +1,21 @@
 import os
 import json
-from dotenv import load_dotenv
+import time
 
 CONFIG_PATH = "config.json"
 
+# Process-level config cache. In Lambda this lives for the lifetime of the
+# container, so warm invocations skip the file read and JSON parse.
+# CONFIG_TTL_SECONDS forces a reload after that many seconds and
+# CONFIG_CHECK_MTIME=1 reloads whenever the file changes on disk.
+_config_cache = {"path": None, "config": None, "loaded_at": 0.0, "mtime": None}
+_config_stats = {"hits": 0, "misses": 0}
+
 
 def load_env():
     """Load environment variables from .env file."""
+    # Only the simulator needs .env support, so the Lambda never imports it
+    from dotenv import load_dotenv
     load_dotenv()
     return {
         "endpoint": os.getenv("AWS_IOT_ENDPOINT"),
@@ -16,16 +25,66 @@ def load_env():
     }
 
 
-def load_config():
-    """Load runtime configuration from config.json."""
+def read_config(path=None):
+    """Read and parse config.json from disk, bypassing the cache."""
+    path = path or CONFIG_PATH
     try:
-        with open(CONFIG_PATH, "r") as f:
+        with open(path, "r") as f:
             return json.load(f)
     except FileNotFoundError:
-        raise RuntimeError(f"Missing config file: {CONFIG_PATH}")
+        raise RuntimeError(f"Missing config file: {path}")
+
+
+def load_config(ttl=None, check_mtime=None):
+    """Load runtime configuration from config.json, cached per process.
+
+    ``ttl`` (seconds) and ``check_mtime`` default to the CONFIG_TTL_SECONDS
+    and CONFIG_CHECK_MTIME environment variables. With neither set the file
+    is read once and reused until clear_config_cache() is called. The
+    cached dict is shared between callers and must not be mutated.
+    """
+    if ttl is None:
+        ttl = float(os.getenv("CONFIG_TTL_SECONDS", "0") or 0)
+    if check_mtime is None:
+        check_mtime = os.getenv("CONFIG_CHECK_MTIME", "") in ("1", "true", "True")
+
+    path = CONFIG_PATH
+    cache = _config_cache
+    now = time.monotonic()
+    mtime = None
+    if check_mtime:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise RuntimeError(f"Missing config file: {path}")
+
+    fresh = (
+        cache["config"] is not None
+        and cache["path"] == path
+        and not (ttl and now - cache["loaded_at"] >= ttl)
+        and not (check_mtime and mtime != cache["mtime"])
+    )
+    if fresh:
+        _config_stats["hits"] += 1
+        return cache["config"]
+
+    _config_stats["misses"] += 1
+    config = read_config(path)
+    cache.update(path=path, config=config, loaded_at=now, mtime=mtime)
+    return config
+
+
+def clear_config_cache():
+    """Drop the cached config so the next load_config() reads the file."""
+    _config_cache.update(path=None, config=None, loaded_at=0.0, mtime=None)
+
+
+def config_cache_stats():
+    """Return the config cache hit/miss counters."""
+    return dict(_config_stats)
     
 
 # def test_env_loader():
 #     """Prints .env config values for testing purposes."""
 #     env = load_env()
-#     print("[ENV TEST] Loaded AWS IoT config:", env)
\ No newline at end of file
+#     print("[ENV TEST] Loaded AWS IoT config:", env)
@@ -0,0 +1,60 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger()
+
+# Shared bounded pool for independent I/O (S3 puts, SNS publishes, metric
+# flushes). It is created on first use and reused across warm invocations.
+# Keep SIDE_EFFECT_WORKERS at or below AWS_MAX_POOL_CONNECTIONS so workers
+# never wait on the HTTP connection pool.
+SIDE_EFFECT_WORKERS = int(os.getenv("SIDE_EFFECT_WORKERS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared side-effect thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=SIDE_EFFECT_WORKERS,
+                    thread_name_prefix="side-effect"
+                )
+    return _executor
+
+
+def run_side_effects(effects):
+    """Run independent side effects concurrently.
+
+    ``effects`` is a list of (key, callable, args) tuples. Every effect runs
+    to completion even if others fail, so total latency is set by the
+    slowest call. Returns a dict mapping the key of each failed effect to
+    its exception; an empty dict means everything succeeded.
+    """
+    errors = {}
+    if not effects:
+        return errors
+    if len(effects) == 1:
+        # Not worth a thread hop for a single call
+        key, fn, args = effects[0]
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"Side effect {key} failed: {e}")
+            errors[key] = e
+        return errors
+
+    executor = get_executor()
+    futures = [(key, executor.submit(fn, *args)) for key, fn, args in effects]
+    for key, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f"Side effect {key} failed: {e}")
+            errors[key] = e
+    return errors
@@ -0,0 +1,103 @@
+import calendar
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# Timestamps are stored as S3-key friendly strings: ISO-8601 in UTC with
+# "Z" and with the colons replaced, e.g. 2025-07-08T05-13-21.622484Z.
+#
+# The simulator always sends "...Z" ISO-8601, so that layout is parsed
+# with one precompiled regex. Other ISO-8601 strings go through
+# datetime.fromisoformat, and only the rest fall back to dateutil, which
+# is slow and is imported on first use.
+_UTC_LAYOUT = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?Z"
+)
+_ISO_LAYOUT = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?(?:Z|[+-]\d{2}:?\d{2})?"
+)
+
+
+def to_key_timestamp(dt):
+    """Format a datetime as a UTC S3-key timestamp."""
+    return (
+        dt.astimezone(timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z")
+        .replace(":", "-")
+    )
+
+
+def now_key_timestamp():
+    """Return the current time as a UTC S3-key timestamp."""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z").replace(":", "-")
+
+
+# Only the ISO-8601 paths are cached: their result depends on the string
+# alone. dateutil fills missing fields from today's date, so "10:30"
+# would go stale in a warm container.
+@lru_cache(maxsize=4096)
+def _normalize_iso(raw):
+    match = _UTC_LAYOUT.fullmatch(raw)
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            dt = datetime(
+                int(year), int(month), int(day), int(hour), int(minute),
+                int(second), int(fraction.ljust(6, "0")) if fraction else 0,
+                tzinfo=timezone.utc
+            )
+            return dt.isoformat().replace("+00:00", "Z").replace(":", "-")
+        except ValueError:
+            pass
+
+    if _ISO_LAYOUT.fullmatch(raw):
+        try:
+            # fromisoformat only understands "Z" from Python 3.11
+            text = raw[:-1] + "+00:00" if raw.endswith("Z") else raw
+            return to_key_timestamp(datetime.fromisoformat(text))
+        except ValueError:
+            pass
+    return None
+
+
+def _normalize(raw):
+    normalized = _normalize_iso(raw)
+    if normalized is not None:
+        return normalized
+    from dateutil.parser import parse as parse_datetime
+    return to_key_timestamp(parse_datetime(raw))
+
+
+def normalize_timestamp(raw):
+    """Normalize a reading's timestamp to a UTC S3-key timestamp.
+
+    Gives the same result as dateutil's parse followed by conversion to
+    UTC, and raises if dateutil cannot parse it either. ISO-8601 results
+    are cached, so repeated timestamps within a batch are only parsed once.
+    """
+    if not isinstance(raw, str):
+        from dateutil.parser import parse as parse_datetime
+        return to_key_timestamp(parse_datetime(raw))
+    return _normalize(raw)
+
+
+def parse_key_timestamp(timestamp):
+    """Turn an S3-key timestamp (2025-07-08T05-13-21.622484Z) back into a datetime."""
+    layout = "%Y-%m-%dT%H-%M-%S.%fZ" if "." in timestamp else "%Y-%m-%dT%H-%M-%SZ"
+    return datetime.strptime(timestamp, layout).replace(tzinfo=timezone.utc)
+
+
+def key_timestamp_seconds(timestamp):
+    """Return an S3-key timestamp as seconds since the epoch.
+
+    Reads the fixed layout by position, which is much cheaper than
+    parse_key_timestamp() on the per-reading path.
+    """
+    seconds = calendar.timegm((
+        int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+        int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19])
+    ))
+    if timestamp[19:20] == ".":
+        seconds += float(timestamp[19:-1])
+    return seconds